@@ -0,0 +1,312 @@
+"""
+Name: asgi_service.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Asyncio version of the service as a plain ASGI application,
+serving POST /users, GET /users and POST /payments with the same checks,
+rate limits and responses as registration_payment_service.py. Idempotency
+keys, batches and the payment ledger are only provided by the Flask
+service. Requests waiting on the store no longer hold a thread each.
+
+Run with: python server.py serve --asgi (requires uvicorn)
+"""
+
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple
+from urllib.parse import parse_qs
+# Local imports
+from utils import check_page_params, ValidationResult, validate_user, \
+  validate_payment, PasswordHasher, TokenBucketLimiter, create_limiter, \
+  create_password_hasher, error_body, USERNAME_TAKEN, CCN_TAKEN, \
+  USERS_NOT_LISTED
+from utils.fast_json import dumps, loads
+from storage import AsyncUserStore, CardVault, UserConflictError, User, \
+  create_card_vault, create_store
+import config
+
+users: AsyncUserStore = AsyncUserStore(create_store(config))
+
+# Converts ccns into the fingerprints and masked numbers stored instead
+card_vault: CardVault = create_card_vault(config)
+
+# Hashes passwords on worker processes, awaited so the event loop carries on
+password_hasher: PasswordHasher = create_password_hasher(config)
+
+# Payment attempts allowed by card (keyed by fingerprint) and by client IP
+card_limiter: TokenBucketLimiter | None = create_limiter(
+  rate=config.RATE_LIMIT_CARD_PER_SECOND, burst=config.RATE_LIMIT_CARD_BURST,
+  capacity=config.RATE_LIMIT_BUCKETS)
+ip_limiter: TokenBucketLimiter | None = create_limiter(
+  rate=config.RATE_LIMIT_IP_PER_SECOND, burst=config.RATE_LIMIT_IP_BURST,
+  capacity=config.RATE_LIMIT_BUCKETS)
+
+# Page sizes for GET /users when paginated with limit/cursor
+DEFAULT_PAGE_LIMIT: int = 100
+MAX_PAGE_LIMIT: int = 1000
+
+# Users fetched from the store per chunk of a streamed user list
+STREAM_PAGE_SIZE: int = 500
+
+class Request(NamedTuple):
+  """Query parameters (first value of each) and body of a request, along
+  with the client's IP if known"""
+
+  query: dict[str, str]
+  body: bytes
+  client: str | None = None
+
+class Response(NamedTuple):
+  """Status of a response along with its JSON body, given as bytes or as
+  chunks to stream (or None for no body), and any extra headers"""
+
+  status: int
+  body: bytes | AsyncIterator[bytes] | None = None
+  headers: tuple[tuple[bytes, bytes], ...] = ()
+
+def json_response(status: int, body: dict | list) -> Response:
+  """Creates a response with a JSON encoded body"""
+
+  return Response(status=status, body=dumps(body))
+
+def error_response(result: ValidationResult) -> Response:
+  """Converts a failed check's result into a JSON error response, whose
+  body is encoded once per error message"""
+
+  return Response(status=result.status_code, body=error_body(result.error))
+
+NOT_FOUND: Response = Response(status=404, body=error_body("Not found."))
+METHOD_NOT_ALLOWED: Response = Response(
+  status=405, body=error_body("Method not allowed."))
+CCN_NOT_REGISTERED: Response = Response(
+  status=404,
+  body=error_body("Credit card number not registered with any user."))
+
+def rate_limited(wait: float) -> Response:
+  """Returns 429 Too Many Requests, with the whole seconds to wait before
+  retrying"""
+
+  return Response(
+    status=429,
+    body=error_body("Too many payment attempts, try again later."),
+    headers=((b"retry-after", str(math.ceil(wait)).encode()),))
+
+def parse_json(body: bytes) -> object:
+  """Decodes a JSON request body, or returns None if it isn't valid JSON
+  (which the schemas reject as not being an object)"""
+
+  try:
+    return loads(body)
+  except ValueError:
+    return None
+
+
+async def register(request: Request) -> Response:
+  """Creates a user based on users JSON input"""
+
+  user_input: object = parse_json(request.body)
+
+  # Checks the details against the user schema
+  input_status: ValidationResult = validate_user(user_input)
+  if input_status.status_code != 200:
+    return error_response(input_status)
+
+  new_user: User = card_vault.protect(User(
+    username=user_input["username"],
+    password=user_input["password"],
+    email=user_input["email"],
+    dob=user_input["dob"],
+    credit_card_number=user_input.get("credit_card_number")))
+
+  # Checks username and ccn aren't already registered
+  if await users.has_username(new_user.username):
+    return error_response(USERNAME_TAKEN)
+  if new_user.has_ccn and await users.has_ccn(new_user.credit_card_number):
+    return error_response(CCN_TAKEN)
+
+  new_user.password = await asyncio.wrap_future(
+    password_hasher.submit(new_user.password))
+
+  # The store's unique constraints catch a username or ccn registered
+  # since it was checked
+  try:
+    await users.add(new_user)
+  except UserConflictError as error:
+    return error_response(USERNAME_TAKEN if error.field == 'username'
+                          else CCN_TAKEN)
+
+  # Returns 201 Created along with details of the newly registered user
+  return json_response(201, {"message": "User successfully registered",
+                             "user": new_user.to_response()})
+
+
+async def stream_users(has_ccn: bool | None) -> AsyncIterator[bytes]:
+  """Encodes users as a JSON array a page of users at a time"""
+
+  yield b"["
+  cursor: int | None = 0
+  first: bool = True
+  while cursor is not None:
+    page, cursor = await users.page(has_ccn=has_ccn, cursor=cursor,
+                                    limit=STREAM_PAGE_SIZE)
+    if page:
+      chunk: bytes = b",".join(dumps(user.to_response()) for user in page)
+      yield chunk if first else b"," + chunk
+      first = False
+  yield b"]"
+
+
+async def get_users(request: Request) -> Response:
+  """Returns registered users, optionally filtered by credit card presence
+  and paginated with limit/cursor"""
+
+  # Refuses to list only this worker's users as if they were every user
+  if not users.store.lists_every_user:
+    return error_response(USERS_NOT_LISTED)
+
+  cc_filter: str | None = request.query.get('CreditCard')
+  limit: str | None = request.query.get('limit')
+  cursor: str | None = request.query.get('cursor')
+
+  page_status: ValidationResult = check_page_params(
+    limit=limit, cursor=cursor, max_limit=MAX_PAGE_LIMIT)
+  if page_status.status_code != 200:
+    return error_response(page_status)
+
+  has_ccn: bool | None = {"Yes": True, "No": False}.get(cc_filter)
+
+  # If there is no users for the given filter return 204 No Content
+  if await users.count(has_ccn=has_ccn) == 0:
+    return Response(status=204)
+
+  # If paginated, returns one page of users along with the next cursor
+  if limit is not None or cursor is not None:
+    page, next_cursor = await users.page(
+      has_ccn=has_ccn,
+      cursor=int(cursor) if cursor is not None else 0,
+      limit=int(limit) if limit is not None else DEFAULT_PAGE_LIMIT)
+
+    return json_response(200, {
+      "users": [user.to_response() for user in page],
+      "next_cursor": str(next_cursor) if next_cursor is not None else None
+    })
+
+  # Otherwise streams every matching user
+  return Response(status=200, body=stream_users(has_ccn))
+
+
+async def make_payment(request: Request) -> Response:
+  """Checks payment values are correct, if so returning 201 Created"""
+
+  # Turns away clients sending too many payments
+  if ip_limiter is not None and request.client is not None:
+    wait: float = ip_limiter.acquire(request.client)
+    if wait:
+      return rate_limited(wait)
+
+  user_input: object = parse_json(request.body)
+
+  # Turns away repeated attempts with the same card before checking them.
+  # Payments without a ccn to key on are left to fail their checks.
+  if card_limiter is not None and isinstance(user_input, dict) and \
+      isinstance(user_input.get("credit_card_number"), str):
+    wait = card_limiter.acquire(
+      card_vault.fingerprint(user_input["credit_card_number"]))
+    if wait:
+      return rate_limited(wait)
+
+  payment_status: ValidationResult = validate_payment(user_input)
+  if payment_status.status_code != 200:
+    return error_response(payment_status)
+
+  # Checks credit card number is registered to a user in system, looking it
+  # up by its fingerprint
+  ccn: str = card_vault.fingerprint(user_input["credit_card_number"])
+  if not (users.may_have_ccn(ccn) and await users.has_ccn(ccn)):
+    return CCN_NOT_REGISTERED
+
+  return json_response(201, {"message": "Payment of " \
+                             f"{user_input['amount']} made."})
+
+
+# Handlers by method and path
+ROUTES: dict[tuple[str, str], Callable[[Request], Awaitable[Response]]] = {
+  ("POST", "/users"): register,
+  ("GET", "/users"): get_users,
+  ("POST", "/payments"): make_payment
+}
+PATHS: frozenset[str] = frozenset(path for _, path in ROUTES)
+
+
+async def read_body(receive: Callable) -> bytes:
+  """Reads a request's body, which may arrive over several messages"""
+
+  chunks: list[bytes] = []
+  more_body: bool = True
+  while more_body:
+    message: dict = await receive()
+    chunks.append(message.get("body", b""))
+    more_body = message.get("more_body", False)
+  return b"".join(chunks)
+
+
+async def send_response(send: Callable, response: Response) -> None:
+  """Sends a response's status, headers and body"""
+
+  headers: list[tuple[bytes, bytes]] = list(response.headers)
+  if response.body is not None:
+    headers.append((b"content-type", b"application/json"))
+  if isinstance(response.body, bytes):
+    headers.append((b"content-length", str(len(response.body)).encode()))
+
+  await send({"type": "http.response.start", "status": response.status,
+              "headers": headers})
+
+  if isinstance(response.body, bytes):
+    await send({"type": "http.response.body", "body": response.body})
+    return
+
+  # Streams chunked bodies as they are produced
+  if response.body is not None:
+    async for chunk in response.body:
+      await send({"type": "http.response.body", "body": chunk,
+                  "more_body": True})
+  await send({"type": "http.response.body", "body": b""})
+
+
+async def lifespan(receive: Callable, send: Callable) -> None:
+  """Sizes the thread pool used for blocking store calls on startup"""
+
+  while True:
+    message: dict = await receive()
+    if message["type"] == "lifespan.startup":
+      asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=config.SERVER_THREADS))
+      await send({"type": "lifespan.startup.complete"})
+    elif message["type"] == "lifespan.shutdown":
+      await send({"type": "lifespan.shutdown.complete"})
+      return
+
+
+async def app(scope: dict, receive: Callable, send: Callable) -> None:
+  """ASGI entry point, routing HTTP requests to their handler"""
+
+  if scope["type"] == "lifespan":
+    await lifespan(receive, send)
+    return
+
+  handler = ROUTES.get((scope["method"], scope["path"]))
+  if handler is None:
+    response: Response = METHOD_NOT_ALLOWED if scope["path"] in PATHS \
+      else NOT_FOUND
+  else:
+    query: dict[str, list[str]] = parse_qs(
+      scope["query_string"].decode("latin-1"))
+    client: tuple[str, int] | None = scope.get("client")
+    response = await handler(Request(
+      query={name: values[0] for name, values in query.items()},
+      body=await read_body(receive),
+      client=client[0] if client is not None else None))
+
+  await send_response(send, response)
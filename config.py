@@ -0,0 +1,106 @@
+"""
+Name: config.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Service settings, read from environment variables with defaults
+for running locally.
+"""
+
+import os
+
+# Where registered users are stored: "memory" (lost on restart), "sqlite",
+# "journal" (in memory, recovered from a journal and snapshot on restart)
+# or "shared" (in memory, checked against an index shared by all workers)
+STORE_BACKEND: str = os.environ.get("STORE_BACKEND", "memory")
+
+# Database file used by the sqlite backend
+SQLITE_PATH: str = os.environ.get("SQLITE_PATH", "users.db")
+
+# How long the sqlite backend waits for more registrations to commit in the
+# same transaction as one that has just arrived
+SQLITE_COMMIT_WINDOW_MS: float = float(
+  os.environ.get("SQLITE_COMMIT_WINDOW_MS", "2"))
+
+# Whether the sqlite backend caches registered usernames and ccns in memory
+# as they are looked up
+SQLITE_READ_CACHE: bool = os.environ.get("SQLITE_READ_CACHE", "0") == "1"
+
+# Directory holding the journal backend's journal and snapshot
+JOURNAL_DIR: str = os.environ.get("JOURNAL_DIR", "data")
+
+# Number of registrations journaled before the journal backend takes a
+# snapshot and empties the journal
+JOURNAL_SNAPSHOT_EVERY: int = int(
+  os.environ.get("JOURNAL_SNAPSHOT_EVERY", "100000"))
+
+# Whether the journal backend syncs each registration to disk before
+# responding, rather than leaving it to the OS
+JOURNAL_FSYNC: bool = os.environ.get("JOURNAL_FSYNC", "0") == "1"
+
+# Index file shared by the workers of the shared backend, and the number of
+# usernames and ccns it has room for when created
+SHARED_INDEX_PATH: str = os.environ.get("SHARED_INDEX_PATH", "users.index")
+SHARED_INDEX_CAPACITY: int = int(
+  os.environ.get("SHARED_INDEX_CAPACITY", "1048576"))
+
+# Key ccns are fingerprinted with (hex encoded). If not given, backends
+# which persist users or share them between workers read it from (or
+# create it at) CARD_VAULT_KEY_PATH, and the memory backend uses a random
+# key, as fingerprints must stay the same for as long as users are kept.
+CARD_VAULT_KEY: str = os.environ.get("CARD_VAULT_KEY", "")
+CARD_VAULT_KEY_PATH: str = os.environ.get("CARD_VAULT_KEY_PATH",
+                                          "card_vault.key")
+
+# Number of ccns the memory and journal backends' filter of registered ccns
+# is sized for (0 to go without), and its false positive rate at that size
+CCN_FILTER_CAPACITY: int = int(
+  os.environ.get("CCN_FILTER_CAPACITY", "1000000"))
+CCN_FILTER_ERROR_RATE: float = float(
+  os.environ.get("CCN_FILTER_ERROR_RATE", "0.01"))
+
+# Number of POST /payments responses kept for replaying to requests retried
+# with the same Idempotency-Key, and how long each is kept for
+IDEMPOTENCY_CACHE_SIZE: int = int(
+  os.environ.get("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL_SECONDS: float = float(
+  os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# Address the serve command listens on
+SERVER_HOST: str = os.environ.get("SERVER_HOST", "localhost")
+SERVER_PORT: int = int(os.environ.get("SERVER_PORT", "3000"))
+
+# Payment attempts allowed per second with one card, and in a burst. A
+# rate of 0 turns the limit off.
+RATE_LIMIT_CARD_PER_SECOND: float = float(
+  os.environ.get("RATE_LIMIT_CARD_PER_SECOND", "1"))
+RATE_LIMIT_CARD_BURST: int = int(os.environ.get("RATE_LIMIT_CARD_BURST", "5"))
+
+# Payment requests allowed per second from one client IP, and in a burst
+# (off by default, as clients behind a proxy share its IP)
+RATE_LIMIT_IP_PER_SECOND: float = float(
+  os.environ.get("RATE_LIMIT_IP_PER_SECOND", "0"))
+RATE_LIMIT_IP_BURST: int = int(os.environ.get("RATE_LIMIT_IP_BURST", "50"))
+
+# Number of cards and of IPs whose rate limits are tracked at once
+RATE_LIMIT_BUCKETS: int = int(os.environ.get("RATE_LIMIT_BUCKETS", "100000"))
+
+# Worker processes hashing passwords for each service process (0 hashes on
+# the request's thread). Unless set, the serve command shares the CPU cores
+# between its worker processes.
+PASSWORD_HASH_WORKERS: int = int(
+  os.environ.get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# Password hashing algorithm ("scrypt" or "pbkdf2_sha256", empty for scrypt
+# or PBKDF2 where OpenSSL lacks scrypt) and its work factors. Raising them
+# slows each hash, and so any guessing, down.
+PASSWORD_HASH_ALGORITHM: str = os.environ.get("PASSWORD_HASH_ALGORITHM", "")
+PASSWORD_SCRYPT_N: int = int(os.environ.get("PASSWORD_SCRYPT_N", "16384"))
+PASSWORD_SCRYPT_R: int = int(os.environ.get("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P: int = int(os.environ.get("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_PBKDF2_ITERATIONS: int = int(
+  os.environ.get("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+
+# Worker processes started by the serve command, and threads handling
+# requests in each one
+SERVER_WORKERS: int = int(os.environ.get("SERVER_WORKERS", "1"))
+SERVER_THREADS: int = int(os.environ.get("SERVER_THREADS", "8"))
@@ -5,13 +5,111 @@ Author: Ryan Gascoigne-Jones
 Purpose: Service handling user registrations and payments
 """
 
+import math
+from datetime import date
+from typing import Iterator, NamedTuple
 from flask import Flask, Response, request, json
-from utils import check_username, check_password, check_email, check_dob, \
-  check_number, check_ccn_registered, check_input_present
+from utils import check_ccn_registered, check_page_params, \
+  check_age_params, ResponseCache, TokenBucketLimiter, TTLCache, \
+  ValidationResult, VALID, to_response, validate_user, validate_payment, \
+  PasswordHasher, create_limiter, create_password_hasher, FastJSONProvider, \
+  error_body, USERNAME_TAKEN, CCN_TAKEN, USERS_NOT_LISTED
+from utils.fast_json import encode
+from storage import BaseUserStore, CardVault, PaymentLedger, \
+  UserConflictError, User, create_card_vault, create_store, dob_days_for_ages
+import config
 
 app: Flask = Flask(__name__)
+# Encodes and decodes JSON with orjson or msgspec when installed
+app.json = FastJSONProvider(app)
+
+users: BaseUserStore = create_store(config)
+
+# Converts ccns into the fingerprints and masked numbers stored instead
+card_vault: CardVault = create_card_vault(config)
+
+# Payments made through this process, with running totals
+ledger: PaymentLedger = PaymentLedger()
+
+# Hashes passwords on worker processes
+password_hasher: PasswordHasher = create_password_hasher(config)
+
+# Encoded GET /users bodies keyed by cc filter, cleared on registration
+user_list_cache: ResponseCache = ResponseCache()
+
+# POST /payments responses by Idempotency-Key, replayed to retries
+payment_responses: TTLCache = TTLCache(capacity=config.IDEMPOTENCY_CACHE_SIZE,
+                                       ttl=config.IDEMPOTENCY_TTL_SECONDS)
+
+# Longest Idempotency-Key accepted
+MAX_IDEMPOTENCY_KEY_LENGTH: int = 255
+
+# Payment attempts allowed by card (keyed by fingerprint) and by client IP
+card_limiter: TokenBucketLimiter | None = create_limiter(
+  rate=config.RATE_LIMIT_CARD_PER_SECOND, burst=config.RATE_LIMIT_CARD_BURST,
+  capacity=config.RATE_LIMIT_BUCKETS)
+ip_limiter: TokenBucketLimiter | None = create_limiter(
+  rate=config.RATE_LIMIT_IP_PER_SECOND, burst=config.RATE_LIMIT_IP_BURST,
+  capacity=config.RATE_LIMIT_BUCKETS)
+
+# Error given to rate limited payments
+RATE_LIMITED_ERROR: str = "Too many payment attempts, try again later."
+
+# Page sizes for GET /users when paginated with limit/cursor
+DEFAULT_PAGE_LIMIT: int = 100
+MAX_PAGE_LIMIT: int = 1000
+
+# Maximum number of users or payments in one batch request
+MAX_BATCH_SIZE: int = 1000
+
+# Errors for request bodies and headers the checks in utils don't cover
+USER_BATCH_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="Request body must be a list of between 1 and " \
+  f"{MAX_BATCH_SIZE} users.")
+PAYMENT_BATCH_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="Request body must be a list of between 1 and " \
+  f"{MAX_BATCH_SIZE} payments.")
+IDEMPOTENCY_KEY_TOO_LONG: ValidationResult = ValidationResult(
+  status_code=400, error="Idempotency-Key must be at most " \
+  f"{MAX_IDEMPOTENCY_KEY_LENGTH} characters.")
+IDEMPOTENCY_KEY_REUSED: ValidationResult = ValidationResult(
+  status_code=422, error="Idempotency-Key has already been used for a " \
+  "different payment.")
+
+def check_registration(
+    user_input: dict,
+    existing_users: BaseUserStore) -> tuple[ValidationResult, User | None]:
+  """Checks a user's registration details, returning the result of the
+  first failing check, or 200 OK along with the new user to create"""
+
+  # Checks the details against the user schema
+  input_status: ValidationResult = validate_user(user_input)
+  if input_status.status_code != 200:
+    return input_status, None
+
+  # Creates new_user to add to the store, holding its ccn's fingerprint and
+  # masked number
+  new_user: User = card_vault.protect(User(
+    username=user_input["username"],
+    password=user_input["password"],
+    email=user_input["email"],
+    dob=user_input["dob"],
+    credit_card_number=user_input.get("credit_card_number")))
+
+  # Checks username and ccn aren't already registered
+  if existing_users.has_username(new_user.username):
+    return USERNAME_TAKEN, None
+  if new_user.has_ccn and existing_users.has_ccn(new_user.credit_card_number):
+    return CCN_TAKEN, None
+
+  return VALID, new_user
+
+
+def conflict_result(error: UserConflictError) -> ValidationResult:
+  """Returns the result for a user clashing with a registered user"""
+
+  return USERNAME_TAKEN if error.field == 'username' else CCN_TAKEN
 
-users: list[dict] = []
 
 @app.route("/users", methods=["POST"])
 def register() -> Response:
@@ -20,139 +118,558 @@ def register() -> Response:
   # Gets json object passed through POST request
   user_input: dict = request.get_json()
 
-  # Checks if there are any absent values (except ccn)
-  input_check_response: Response = check_input_present(
-    user_input=user_input.copy(),
-    expected=["username", "password", "email", "dob"])
-  if input_check_response.status_code != 200:
-    return input_check_response
-
-  # Checks username
-  username: str = user_input["username"]
-  username_status: Response = check_username(username=username,
-                                             existing_users=users)
-  # Returns error status if an invalid username has been entered
-  if username_status.status_code != 200:
-    return username_status
-  
-  # Checks password
-  password: str = user_input["password"]
-  password_status: Response = check_password(password=password)
-  if password_status.status_code != 200:
-    return password_status
-  
-  # Checks email
-  email: str = user_input["email"]
-  email_status: Response = check_email(email=email)
-  if email_status.status_code != 200:
-    return email_status
-  
-  # Checks DoB
-  dob: str = user_input["dob"]
-  dob_status: Response = check_dob(dob=dob)
-  if dob_status.status_code != 200:
-    return dob_status
-
-  # Checks credit card number
-  # Try statement in case the ccn hasn't been input (as it is optional)
+  # Checks the user's details, returning the error status if any are invalid
+  registration_status, new_user = check_registration(user_input=user_input,
+                                                     existing_users=users)
+  if registration_status.status_code != 200:
+    return to_response(registration_status)
+
+  # Stores a hash of the password, hashed by a worker process
+  new_user.password = password_hasher.hash(new_user.password)
+
+  # Creates user (adds to store) and discards stale cached user lists. The
+  # store's unique constraints catch a username or ccn registered since it
+  # was checked.
   try:
-    ccn: str = user_input["credit_card_number"]
-    ccn_status: Response = check_number(num=ccn, digits=16)
-    if ccn_status.status_code != 200:
-      return ccn_status
-    
-    # Creates new_user dict to add to users list
-    new_user: dict = {
-      'username': username,
-      'password': password,
-      'email': email,
-      'dob': dob,
-      'credit_card_number': ccn
-    }
-
-  # Creates new_user dict with no ccn
-  except:
-    new_user: dict = {
-      'username': username,
-      'password': password,
-      'email': email,
-      'dob': dob
-    }
-
-  # Creates user (adds to store)
-  users.append(new_user)
+    users.add(new_user)
+  except UserConflictError as error:
+    return to_response(conflict_result(error))
+  user_list_cache.invalidate()
   
   # Returns 201 Created along with details of the newly registered user
   return Response(response=json.dumps({
                     "message": "User successfully registered",
-                    "user": new_user
+                    "user": new_user.to_response()
                   }),
                   status=201,
                   content_type="application/json")
 
 
+@app.route("/users/batch", methods=["POST"])
+def register_batch() -> Response:
+  """Creates every valid user in a JSON array of users, returning the
+  outcome of each one"""
+
+  # Gets json array passed through POST request
+  batch_input: list = request.get_json()
+
+  # Checks a non-empty array of at most MAX_BATCH_SIZE users was given
+  if not isinstance(batch_input, list) or \
+      not 1 <= len(batch_input) <= MAX_BATCH_SIZE:
+    return to_response(USER_BATCH_INVALID)
+
+  results: list[dict] = []
+  new_users: list[User] = []
+  # Usernames and ccns claimed by earlier users in this batch
+  batch_usernames: set[str] = set()
+  batch_ccns: set[str] = set()
+
+  for user_input in batch_input:
+    # Runs the same checks as a single registration
+    registration_status, new_user = check_registration(
+      user_input=user_input, existing_users=users)
+    if registration_status.status_code != 200:
+      results.append({"status": registration_status.status_code,
+                      "error": registration_status.error})
+      continue
+
+    # Checks username and ccn aren't taken by an earlier user in this batch
+    conflict: ValidationResult | None = None
+    if new_user.username in batch_usernames:
+      conflict = USERNAME_TAKEN
+    elif new_user.credit_card_number in batch_ccns:
+      conflict = CCN_TAKEN
+    if conflict is not None:
+      results.append({"status": conflict.status_code,
+                      "error": conflict.error})
+      continue
+
+    batch_usernames.add(new_user.username)
+    if new_user.has_ccn:
+      batch_ccns.add(new_user.credit_card_number)
+    new_users.append(new_user)
+    results.append({"status": 201, "user": new_user.to_response()})
+
+  # Creates all valid users at once (hashing their passwords across the
+  # workers) and discards stale cached user lists. If another request
+  # registered one of them in the meantime, none are created.
+  if new_users:
+    for new_user, password_hash in zip(new_users, password_hasher.hash_many(
+        [new_user.password for new_user in new_users])):
+      new_user.password = password_hash
+    try:
+      users.add_many(new_users)
+    except UserConflictError as error:
+      return to_response(conflict_result(error))
+    user_list_cache.invalidate()
+
+  # Returns 200 OK along with the outcome for each user in request order
+  return Response(response=json.dumps({
+                    "created": len(new_users),
+                    "results": results
+                  }),
+                  status=200,
+                  content_type="application/json")
+
+
+def stream_users(user_iter: Iterator[User],
+                 sort_keys: bool) -> Iterator[bytes]:
+  """Encodes users as a JSON array one user at a time. Streaming carries
+  on after the request's app context has gone, so users are encoded with
+  the fast encoder directly rather than through the app's provider, with
+  the provider's sort_keys taken beforehand so their keys match."""
+
+  yield b"["
+  for index, user in enumerate(user_iter):
+    if index:
+      yield b","
+    yield encode(user.to_response(), sort_keys=sort_keys)
+  yield b"]"
+
+
+def cache_stream(chunks: Iterator[bytes], key: str | None,
+                 etag: str) -> Iterator[bytes]:
+  """Passes through a streamed body, caching it once fully sent"""
+
+  sent: list[bytes] = []
+  for chunk in chunks:
+    sent.append(chunk)
+    yield chunk
+
+  # Only caches the body if no users were registered while streaming
+  if etag == make_users_etag(key):
+    user_list_cache.set(key=key, etag=etag, body=b"".join(sent))
+
+
+def make_users_etag(key: str | None) -> str:
+  """Creates the ETag for a user list from the store version and filter"""
+
+  return f"{users.version}-{key or 'All'}"
+
+
+def age_days(min_age: str | None,
+             max_age: str | None) -> tuple[int | None, int | None]:
+  """Converts checked MinAge/MaxAge query parameters into the range of
+  dates of birth (as day numbers) they cover today, or Nones if neither
+  was given"""
+
+  if min_age is None and max_age is None:
+    return None, None
+
+  return dob_days_for_ages(
+    min_age=int(min_age) if min_age is not None else None,
+    max_age=int(max_age) if max_age is not None else None,
+    today=date.today())
+
+
+def get_users_by_age(has_ccn: bool | None, first_day: int, last_day: int,
+                     limit: str | None, cursor: str | None) -> Response:
+  """Returns users born between two day numbers, selected from the store's
+  columnar table. These lists aren't cached as ages change daily."""
+
+  matched: list[User] = users.table().select(
+    has_ccn=has_ccn, first_day=first_day, last_day=last_day)
+
+  # If there is no users for the given filters return 204 No Content
+  if not matched:
+    return Response(status=204)
+
+  # If paginated, cursors are positions in the filtered list
+  if limit is not None or cursor is not None:
+    start: int = int(cursor) if cursor is not None else 0
+    end: int = start + (int(limit) if limit is not None
+                        else DEFAULT_PAGE_LIMIT)
+    return Response(response=json.dumps({
+                      "users": [user.to_response()
+                                for user in matched[start:end]],
+                      "next_cursor": str(end) if end < len(matched)
+                                     else None
+                    }),
+                    status=200,
+                    content_type="application/json")
+
+  return Response(response=json.dumps([user.to_response()
+                                        for user in matched]),
+                  status=200,
+                  content_type="application/json")
+
+
 @app.route("/users", methods=["GET"])
 def get_users() -> Response:
+  """Returns registered users, optionally filtered by credit card presence
+  and age, and paginated with limit/cursor"""
 
-  # Gets credit card filter from query parameter
-  cc_filter = request.args.get('CreditCard')
-  filtered_users: list[dict] = []
+  # Refuses to list only this worker's users as if they were every user
+  if not users.lists_every_user:
+    return to_response(USERS_NOT_LISTED)
 
-  # If cc filter is "Yes" return all users with a ccn
-  if cc_filter == "Yes":
-    for user in users:
-      # Checks if each user has a ccn
-      if user.get('credit_card_number'):
-        filtered_users.append(user)
+  # Gets credit card and age filters and pagination from query parameters
+  cc_filter: str | None = request.args.get('CreditCard')
+  min_age: str | None = request.args.get('MinAge')
+  max_age: str | None = request.args.get('MaxAge')
+  limit: str | None = request.args.get('limit')
+  cursor: str | None = request.args.get('cursor')
 
-  # If cc filter is "No" return all users without a ccn
-  elif cc_filter == "No":
-    for user in users:
-      if not user.get('credit_card_number'):
-        filtered_users.append(user)
+  page_status: ValidationResult = check_page_params(
+    limit=limit, cursor=cursor, max_limit=MAX_PAGE_LIMIT)
+  if page_status.status_code != 200:
+    return to_response(page_status)
 
-  # If a cc filter was not given, return all users
-  else:
-    filtered_users = users
+  age_status: ValidationResult = check_age_params(min_age=min_age,
+                                                  max_age=max_age)
+  if age_status.status_code != 200:
+    return to_response(age_status)
+
+  # If cc filter is "Yes" return all users with a ccn, if "No" return all
+  # users without a ccn, and if a cc filter was not given, return all users
+  has_ccn: bool | None = {"Yes": True, "No": False}.get(cc_filter)
+
+  # Age filters are applied over the store's columnar table
+  first_day, last_day = age_days(min_age=min_age, max_age=max_age)
+  if first_day is not None:
+    return get_users_by_age(has_ccn=has_ccn, first_day=first_day,
+                            last_day=last_day, limit=limit, cursor=cursor)
 
   # If there is no users for the given filter return 204 No Content
-  if filtered_users == []:
+  if users.count(has_ccn=has_ccn) == 0:
     return Response(status=204)
 
-  # Returns list of users for chosen filter along with 200 OK
-  return Response(response=json.dumps(filtered_users),
+  # If paginated, returns one page of users along with the cursor for the
+  # next page (null once the last page has been reached)
+  if limit is not None or cursor is not None:
+    page, next_cursor = users.page(
+      has_ccn=has_ccn,
+      cursor=int(cursor) if cursor is not None else 0,
+      limit=int(limit) if limit is not None else DEFAULT_PAGE_LIMIT)
+    if next_cursor is not None:
+      next_cursor = str(next_cursor)
+
+    return Response(response=json.dumps({
+                      "users": [user.to_response() for user in page],
+                      "next_cursor": next_cursor
+                    }),
+                    status=200,
+                    content_type="application/json")
+
+  # Returns 304 Not Modified if the client already has this user list
+  cache_key: str | None = cc_filter if cc_filter in ("Yes", "No") else None
+  etag: str = make_users_etag(cache_key)
+  if request.if_none_match.contains(etag):
+    response: Response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+  # Returns the cached list of users for the chosen filter if nothing has
+  # changed since it was encoded, otherwise streams it (caching it as it is
+  # sent) along with 200 OK
+  body: bytes | None = user_list_cache.get(key=cache_key, etag=etag)
+  if body is None:
+    response = Response(response=cache_stream(
+                          stream_users(users.iter_users(has_ccn=has_ccn),
+                                       sort_keys=app.json.sort_keys),
+                          key=cache_key, etag=etag),
+                        status=200,
+                        content_type="application/json")
+  else:
+    response = Response(response=body,
+                        status=200,
+                        content_type="application/json")
+
+  response.set_etag(etag)
+  return response
+
+
+@app.route("/users/stats", methods=["GET"])
+def get_user_stats() -> Response:
+  """Returns counts and ages of registered users, optionally filtered by
+  credit card presence and age"""
+
+  # Refuses to summarise only this worker's users as if they were every
+  # user
+  if not users.lists_every_user:
+    return to_response(USERS_NOT_LISTED)
+
+  # Gets credit card and age filters from query parameters
+  cc_filter: str | None = request.args.get('CreditCard')
+  min_age: str | None = request.args.get('MinAge')
+  max_age: str | None = request.args.get('MaxAge')
+
+  age_status: ValidationResult = check_age_params(min_age=min_age,
+                                                  max_age=max_age)
+  if age_status.status_code != 200:
+    return to_response(age_status)
+
+  has_ccn: bool | None = {"Yes": True, "No": False}.get(cc_filter)
+  first_day, last_day = age_days(min_age=min_age, max_age=max_age)
+
+  # Returns 200 OK along with the summary of the matching users
+  return Response(response=json.dumps(users.table().stats(
+                    today=date.today(), has_ccn=has_ccn,
+                    first_day=first_day, last_day=last_day)),
                   status=200,
                   content_type="application/json")
 
 
+class CachedPayment(NamedTuple):
+  """Response to a payment request, kept for replaying to retries along with
+  the body of the request it answered"""
+
+  request_body: bytes
+  status: int
+  body: bytes
+
+
+def card_wait(payment_input: object) -> float:
+  """Takes a token from the bucket of a payment's card, returning 0 if
+  there was one or otherwise the seconds until there will be. Payments
+  without a ccn to key on are left to fail their checks."""
+
+  if card_limiter is None or not isinstance(payment_input, dict):
+    return 0
+
+  ccn: object = payment_input.get("credit_card_number")
+  if not isinstance(ccn, str):
+    return 0
+  return card_limiter.acquire(card_vault.fingerprint(ccn))
+
+
+def ip_wait() -> float:
+  """Takes a token from the bucket of the request's client IP, returning 0
+  if there was one or otherwise the seconds until there will be"""
+
+  if ip_limiter is None or request.remote_addr is None:
+    return 0
+  return ip_limiter.acquire(request.remote_addr)
+
+
+def rate_limited(wait: float) -> Response:
+  """Returns 429 Too Many Requests, with the whole seconds to wait before
+  retrying"""
+
+  response: Response = Response(response=error_body(RATE_LIMITED_ERROR),
+                                status=429,
+                                content_type="application/json")
+  response.headers["Retry-After"] = str(math.ceil(wait))
+  return response
+
+
+def check_payment(user_input: dict) -> Response:
+  """Checks payment values are correct, if so returning 201 Created"""
+
+  # Turns away repeated attempts with the same card before checking them
+  wait: float = card_wait(user_input)
+  if wait:
+    return rate_limited(wait)
+
+  # Checks the payment's details, returning the error status if any are
+  # invalid
+  payment_status: ValidationResult = validate_payment(user_input)
+  if payment_status.status_code != 200:
+    return to_response(payment_status)
+
+  # Parses the checked amount before the payment is made, so recording it
+  # can't fail afterwards
+  amount: int = int(user_input["amount"])
+
+  # Checks credit card number is registered to a user in system, looking it
+  # up by its fingerprint
+  ccn: str = card_vault.fingerprint(user_input["credit_card_number"])
+  response: Response = check_ccn_registered(ccn=ccn, users=users,
+                                            amount=user_input["amount"])
+
+  # Records the payment once made
+  if response.status_code == 201:
+    ledger.record(ccn=ccn, amount=amount, find_user=users.get_by_ccn)
+
+  return response
+
+
 @app.route("/payments", methods=["POST"])
 def make_payment() -> Response:
-  """Checks payment values are correct, if so returning 201 Created"""
+  """Checks payment values are correct, if so returning 201 Created. A
+  request retried with the same Idempotency-Key header gets the first
+  response replayed without the payment being checked again."""
 
-  # Gets json object passed through POST request
-  user_input: dict = request.get_json()
+  # Turns away clients sending too many payments
+  wait: float = ip_wait()
+  if wait:
+    return rate_limited(wait)
 
-  # Checks if there are any absent values
-  input_check_response: Response = check_input_present(
-    user_input=user_input.copy(),
-    expected=["credit_card_number", "amount"])
-  if input_check_response.status_code != 200:
-    return input_check_response
-  
-  # Checks credit card number is valid
-  ccn: str = user_input["credit_card_number"]
-  ccn_status: Response = check_number(num=ccn, digits=16)
-  if ccn_status.status_code != 200:
-    return ccn_status
-
-  # Checks amount is valid
-  amount: str = user_input["amount"]
-  amount_status: Response = check_number(num=amount, digits=3)
-  if amount_status.status_code != 200:
-    return amount_status
-  
-  # Checks credit card number is registered to a user in system
-  return check_ccn_registered(ccn=ccn, users=users, amount=amount)
+  idempotency_key: str | None = request.headers.get("Idempotency-Key")
+  if idempotency_key is None:
+    return check_payment(request.get_json())
+
+  if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+    return to_response(IDEMPOTENCY_KEY_TOO_LONG)
+
+  request_body: bytes = request.get_data()
+
+  # Retries with the same key wait for the first request to finish
+  with payment_responses.lock_for(idempotency_key):
+    cached: CachedPayment | None = payment_responses.get(idempotency_key)
+
+    if cached is None:
+      response: Response = check_payment(request.get_json())
+      # Rate limited payments aren't kept, so a retry once the limit has
+      # passed is checked afresh
+      if response.status_code != 429:
+        payment_responses.set(idempotency_key, CachedPayment(
+          request_body=request_body, status=response.status_code,
+          body=response.get_data()))
+      return response
+
+  # A key can't be reused for a different payment
+  if cached.request_body != request_body:
+    return to_response(IDEMPOTENCY_KEY_REUSED)
+
+  # Returns the response given to the first request
+  response = Response(response=cached.body,
+                      status=cached.status,
+                      content_type="application/json")
+  response.headers["Idempotent-Replayed"] = "true"
+  return response
+
+
+@app.route("/payments", methods=["GET"])
+def get_payments() -> Response:
+  """Returns payments made in the order they were made, paginated with
+  limit/cursor"""
+
+  limit: str | None = request.args.get('limit')
+  cursor: str | None = request.args.get('cursor')
+
+  page_status: ValidationResult = check_page_params(
+    limit=limit, cursor=cursor, max_limit=MAX_PAGE_LIMIT)
+  if page_status.status_code != 200:
+    return to_response(page_status)
+
+  # If no payments have been made return 204 No Content
+  if len(ledger) == 0:
+    return Response(status=204)
+
+  # Returns one page of payments along with the cursor for the next page
+  # (null once the last page has been reached)
+  page, next_cursor = ledger.page(
+    cursor=int(cursor) if cursor is not None else 0,
+    limit=int(limit) if limit is not None else DEFAULT_PAGE_LIMIT)
+
+  return Response(response=json.dumps({
+                    "payments": page,
+                    "next_cursor": str(next_cursor)
+                                   if next_cursor is not None else None
+                  }),
+                  status=200,
+                  content_type="application/json")
+
+
+@app.route("/payments/summary", methods=["GET"])
+def get_payment_summary() -> Response:
+  """Returns the number and total of payments made, overall or by one
+  user, from the ledger's running totals"""
+
+  username: str | None = request.args.get('username')
+  if username is None:
+    return Response(response=json.dumps(ledger.summary()),
+                    status=200,
+                    content_type="application/json")
+
+  # If the user hasn't made any payments return 204 No Content
+  user_summary: dict | None = ledger.user_summary(username)
+  if user_summary is None:
+    return Response(status=204)
+
+  return Response(response=json.dumps(user_summary),
+                  status=200,
+                  content_type="application/json")
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics() -> Response:
+  """Returns the service's cache, filter and rate limit counters"""
+
+  return Response(response=json.dumps({
+                    "idempotency_cache": payment_responses.stats(),
+                    "ccn_filter": users.ccn_filter.stats()
+                                  if users.ccn_filter is not None else None,
+                    "card_rate_limit": card_limiter.stats()
+                                       if card_limiter is not None else None,
+                    "ip_rate_limit": ip_limiter.stats()
+                                     if ip_limiter is not None else None
+                  }),
+                  status=200,
+                  content_type="application/json")
+
+
+@app.route("/payments/batch", methods=["POST"])
+def make_payment_batch() -> Response:
+  """Checks a JSON array of payments, returning the outcome of each one"""
+
+  # Turns away clients sending too many payments
+  wait: float = ip_wait()
+  if wait:
+    return rate_limited(wait)
+
+  # Gets json array passed through POST request
+  batch_input: list = request.get_json()
+
+  # Checks a non-empty array of at most MAX_BATCH_SIZE payments was given
+  if not isinstance(batch_input, list) or \
+      not 1 <= len(batch_input) <= MAX_BATCH_SIZE:
+    return to_response(PAYMENT_BATCH_INVALID)
+
+  results: list[dict | None] = []
+  # Indexes of the payments which passed their checks, and the fingerprint
+  # of each one's ccn and its parsed amount
+  valid_indexes: list[int] = []
+  fingerprints: dict[int, str] = {}
+  amounts: dict[int, int] = {}
+
+  for index, payment_input in enumerate(batch_input):
+    # Runs the same checks as a single payment, starting with the card's
+    # rate limit
+    wait = card_wait(payment_input)
+    if wait:
+      results.append({"status": 429, "error": RATE_LIMITED_ERROR,
+                      "retry_after": math.ceil(wait)})
+      continue
+
+    payment_status: ValidationResult = validate_payment(payment_input)
+    if payment_status.status_code != 200:
+      results.append({"status": payment_status.status_code,
+                      "error": payment_status.error})
+      continue
+
+    # Outcome is filled in once the card numbers have been looked up
+    results.append(None)
+    valid_indexes.append(index)
+    fingerprints[index] = card_vault.fingerprint(
+      payment_input["credit_card_number"])
+    amounts[index] = int(payment_input["amount"])
+
+  # Looks up every valid payment's ccn against the store in one pass,
+  # leaving out ccns the store's filter rules out
+  registered_ccns: set[str] = users.registered_ccns(
+    ccn for ccn in fingerprints.values() if users.may_have_ccn(ccn))
+
+  for index in valid_indexes:
+    payment_input: dict = batch_input[index]
+    if fingerprints[index] in registered_ccns:
+      ledger.record(ccn=fingerprints[index], amount=amounts[index],
+                    find_user=users.get_by_ccn)
+      results[index] = {
+        "status": 201,
+        "message": f"Payment of {payment_input['amount']} made."
+      }
+    else:
+      results[index] = {
+        "status": 404,
+        "error": "Credit card number not registered with any user."
+      }
+
+  # Returns 200 OK along with the outcome for each payment in request order
+  return Response(response=json.dumps({"results": results}),
+                  status=200,
+                  content_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""
+Name: server.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Production entry point, serving the API from several worker
+processes each handling requests on a pool of threads.
+
+Run with: python server.py serve [--workers N] [--threads N] [--host HOST]
+[--port PORT]
+"""
+
+import argparse
+import os
+import signal
+import socket
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer
+# Local imports
+import config
+from storage import SharedUserIndex
+
+# Gunicorn is optional, workers are pre-forked by serve_prefork() without it
+try:
+  from gunicorn.app.base import BaseApplication
+except ImportError:
+  BaseApplication = None
+
+# Uvicorn is optional, only needed to serve the ASGI version of the service
+try:
+  import uvicorn
+except ImportError:
+  uvicorn = None
+
+# Store backends whose registrations are visible to every worker process
+SHARED_BACKENDS: frozenset[str] = frozenset({"sqlite", "shared"})
+
+class PooledWSGIServer(BaseWSGIServer):
+  """WSGI server handling each connection on a fixed pool of threads,
+  rather than starting a thread per connection"""
+
+  multithread: bool = True
+
+  def __init__(self, host: str, port: int, app, threads: int,
+               fd: int | None = None) -> None:
+    """Binds to host and port, or listens on an already bound socket fd"""
+
+    super().__init__(host, port, app, fd=fd)
+    self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+      max_workers=threads, thread_name_prefix="request")
+
+  def process_request(self, request: socket.socket,
+                      client_address: tuple) -> None:
+    """Hands a connection to the thread pool"""
+
+    self.executor.submit(self.handle_connection, request, client_address)
+
+  def handle_connection(self, request: socket.socket,
+                        client_address: tuple) -> None:
+    """Serves the requests on a connection, then closes it"""
+
+    try:
+      self.finish_request(request, client_address)
+    except Exception:
+      self.handle_error(request, client_address)
+    finally:
+      self.shutdown_request(request)
+
+  def serve_forever(self, poll_interval: float = 0.5) -> None:
+    """Serves until shut down or interrupted, then waits for in-flight
+    requests to finish"""
+
+    try:
+      super().serve_forever(poll_interval)
+    finally:
+      self.executor.shutdown(wait=True)
+
+
+def serve_gunicorn(host: str, port: int, workers: int, threads: int) -> None:
+  """Serves the API with Gunicorn's threaded workers, each importing the
+  service (and so opening the store) itself"""
+
+  class ServiceApplication(BaseApplication):
+    """Gunicorn application configured from the serve command"""
+
+    def load_config(self) -> None:
+      settings: dict = {"bind": f"{host}:{port}", "workers": workers,
+                        "threads": threads, "worker_class": "gthread"}
+      for key, value in settings.items():
+        self.cfg.set(key, value)
+
+    def load(self):
+      from registration_payment_service import app
+      return app
+
+  ServiceApplication().run()
+
+
+def stop_workers(signum: int, frame) -> None:
+  """Handles SIGTERM in the parent process as an interrupt, so the workers
+  are stopped along with it"""
+
+  raise KeyboardInterrupt
+
+
+def stop_serving(signum: int, frame) -> None:
+  """Handles SIGTERM or SIGINT in a worker as an interrupt, so it stops
+  serving and waits for its in-flight requests. Further signals are
+  ignored, as they would cut that wait short."""
+
+  signal.signal(signal.SIGTERM, signal.SIG_IGN)
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  raise KeyboardInterrupt
+
+
+def serve_worker(host: str, port: int, app, threads: int, fd: int) -> None:
+  """Serves from a worker process until it is interrupted or terminated"""
+
+  signal.signal(signal.SIGTERM, stop_serving)
+  signal.signal(signal.SIGINT, stop_serving)
+  PooledWSGIServer(host, port, app, threads=threads, fd=fd).serve_forever()
+
+
+def serve_prefork(host: str, port: int, workers: int, threads: int) -> None:
+  """Serves the API from worker processes forked after binding the port, so
+  they all accept connections from the same socket"""
+
+  # Imports the service before forking, so each worker inherits the app
+  # (stores reopen their connections in a forked process)
+  from registration_payment_service import app
+
+  listener: socket.socket = socket.create_server((host, port))
+
+  if workers == 1:
+    serve_worker(host, port, app, threads=threads, fd=listener.fileno())
+    return
+
+  children: list[int] = []
+  for _ in range(workers):
+    pid: int = os.fork()
+    if pid == 0:
+      # Workers exit without returning into the parent's code
+      status: int = 0
+      try:
+        serve_worker(host, port, app, threads=threads, fd=listener.fileno())
+      except KeyboardInterrupt:
+        pass
+      except Exception:
+        traceback.print_exc()
+        status = 1
+      finally:
+        os._exit(status)
+    children.append(pid)
+
+  # Waits on the workers, stopping them all if interrupted or terminated
+  signal.signal(signal.SIGTERM, stop_workers)
+  try:
+    for pid in children:
+      os.waitpid(pid, 0)
+  except KeyboardInterrupt:
+    for pid in children:
+      os.kill(pid, signal.SIGTERM)
+    # Waits for the workers to finish their in-flight requests
+    for pid in children:
+      try:
+        os.waitpid(pid, 0)
+      except ChildProcessError:
+        pass
+
+
+def serve_asgi(host: str, port: int, workers: int, threads: int) -> None:
+  """Serves the asyncio version of the service with Uvicorn. Threads sizes
+  each worker's pool for blocking store calls (via config)."""
+
+  uvicorn.run("asgi_service:app", host=host, port=port, workers=workers)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+  """Parses the command line, with defaults taken from config"""
+
+  parser: argparse.ArgumentParser = argparse.ArgumentParser(
+    description="Registration and payment API server")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  serve: argparse.ArgumentParser = commands.add_parser(
+    "serve", help="serve the API from worker processes and threads")
+  serve.add_argument("--host", default=config.SERVER_HOST)
+  serve.add_argument("--port", type=int, default=config.SERVER_PORT)
+  serve.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                     help="worker processes")
+  serve.add_argument("--threads", type=int, default=config.SERVER_THREADS,
+                     help="request threads per worker")
+  serve.add_argument("--asgi", action="store_true",
+                     help="serve the asyncio version of the service")
+
+  args: argparse.Namespace = parser.parse_args(argv)
+
+  # Checks workers and threads are positive
+  if args.workers < 1 or args.threads < 1:
+    parser.error("--workers and --threads must be at least 1")
+
+  # Checks every worker would see the same users
+  if args.workers > 1 and config.STORE_BACKEND not in SHARED_BACKENDS:
+    parser.error(f"STORE_BACKEND={config.STORE_BACKEND} keeps users in " \
+                 "each worker's memory, use one of " \
+                 f"{', '.join(sorted(SHARED_BACKENDS))} with --workers")
+
+  # Checks the ASGI version can be served
+  if args.asgi and uvicorn is None:
+    parser.error("--asgi requires uvicorn")
+
+  # Checks workers can be started without Gunicorn (e.g. on Windows)
+  if args.workers > 1 and not args.asgi and BaseApplication is None and \
+      not hasattr(os, "fork"):
+    parser.error("--workers requires gunicorn on this platform")
+
+  return args
+
+
+def reset_shared_index() -> None:
+  """Empties the shared backend's index before any worker maps it, as the
+  users it indexed were lost when the previous workers stopped"""
+
+  if config.STORE_BACKEND == "shared":
+    SharedUserIndex.create(path=config.SHARED_INDEX_PATH,
+                           capacity=config.SHARED_INDEX_CAPACITY)
+
+
+def record_workers(workers: int) -> None:
+  """Passes the number of workers on to the service through config, as the
+  shared backend can't list users with more than one"""
+
+  config.SERVER_WORKERS = workers
+  # Passed to workers which import config afresh (e.g. Uvicorn's)
+  os.environ["SERVER_WORKERS"] = str(workers)
+
+
+def share_hash_workers(workers: int) -> None:
+  """Divides the password hashing processes each worker starts by the
+  number of workers, unless set in the environment, so together they start
+  one per CPU core rather than one per core each"""
+
+  if "PASSWORD_HASH_WORKERS" in os.environ:
+    return
+  config.PASSWORD_HASH_WORKERS = max(config.PASSWORD_HASH_WORKERS // workers,
+                                     1)
+  # Passed to workers which import config afresh (e.g. Uvicorn's)
+  os.environ["PASSWORD_HASH_WORKERS"] = str(config.PASSWORD_HASH_WORKERS)
+
+
+if __name__ == "__main__":
+  args: argparse.Namespace = parse_args()
+  reset_shared_index()
+  record_workers(args.workers)
+  share_hash_workers(args.workers)
+
+  if args.asgi:
+    # Passed to the workers through the environment, as each imports config
+    os.environ["SERVER_THREADS"] = str(args.threads)
+    serve_with = serve_asgi
+  elif BaseApplication is not None:
+    serve_with = serve_gunicorn
+  else:
+    serve_with = serve_prefork
+  serve_with(host=args.host, port=args.port, workers=args.workers,
+             threads=args.threads)
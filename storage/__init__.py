@@ -0,0 +1,64 @@
+import os
+# Local Imports
+from .base import BaseUserStore, UserConflictError
+from .records import User
+from .columns import UserTable, dob_days_for_ages
+from .bloom import BloomFilter
+from .ledger import PaymentLedger
+from .card_vault import CardVault, load_key, KEY_BYTES
+from .user_store import UserStore
+from .sqlite_store import SQLiteUserStore
+from .sqlite_pool import ConnectionPool, GroupCommitWriter
+from .journal import JournaledUserStore
+from .async_store import AsyncUserStore
+from .shared_index import SharedUserIndex, SharedIndexUserStore, \
+  SharedIndexFullError
+
+def create_store(settings) -> BaseUserStore:
+  """Creates the user store for settings.STORE_BACKEND ("memory", "sqlite",
+  "journal" or "shared"), configured from the other settings (e.g.
+  config)"""
+
+  # Per-process filter of registered ccns. Backends shared between worker
+  # processes go without, as it wouldn't see other workers' registrations.
+  ccn_filter: BloomFilter | None = BloomFilter(
+    capacity=settings.CCN_FILTER_CAPACITY,
+    error_rate=settings.CCN_FILTER_ERROR_RATE) \
+    if settings.CCN_FILTER_CAPACITY > 0 else None
+
+  if settings.STORE_BACKEND == "memory":
+    return UserStore(ccn_filter=ccn_filter)
+
+  if settings.STORE_BACKEND == "sqlite":
+    return SQLiteUserStore(path=settings.SQLITE_PATH,
+                           commit_window_ms=settings.SQLITE_COMMIT_WINDOW_MS,
+                           read_cache=settings.SQLITE_READ_CACHE)
+
+  if settings.STORE_BACKEND == "journal":
+    return JournaledUserStore(directory=settings.JOURNAL_DIR,
+                              snapshot_every=settings.JOURNAL_SNAPSHOT_EVERY,
+                              fsync=settings.JOURNAL_FSYNC,
+                              ccn_filter=ccn_filter)
+
+  if settings.STORE_BACKEND == "shared":
+    return SharedIndexUserStore(index=SharedUserIndex(
+      path=settings.SHARED_INDEX_PATH,
+      capacity=settings.SHARED_INDEX_CAPACITY),
+      workers=settings.SERVER_WORKERS)
+
+  raise ValueError(f"Unknown store backend: {settings.STORE_BACKEND}")
+
+def create_card_vault(settings) -> CardVault:
+  """Creates the card vault for settings.CARD_VAULT_KEY, or if it isn't
+  given a key which lasts as long as settings.STORE_BACKEND keeps users"""
+
+  if settings.CARD_VAULT_KEY:
+    return CardVault(key=bytes.fromhex(settings.CARD_VAULT_KEY))
+
+  if settings.STORE_BACKEND == "memory":
+    return CardVault(key=os.urandom(KEY_BYTES))
+
+  return CardVault(key=load_key(settings.CARD_VAULT_KEY_PATH))
+
+if __name__ == "__main__":
+  pass
@@ -0,0 +1,88 @@
+"""
+Name: async_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Async interface over the user store backends, for the asyncio
+version of the service.
+"""
+
+import asyncio
+from typing import Any, Callable, Iterable
+# Local Imports
+from .base import BaseUserStore
+from .records import User
+
+class AsyncUserStore:
+  """Awaitable version of a BaseUserStore's methods.
+
+  Calls to a backend which blocks on I/O or other processes (e.g. SQLite,
+  or the journal and shared index backends) are run on the event loop's
+  thread pool, so other requests carry on while they wait. Calls to a
+  purely in-memory store take microseconds, so are run inline rather than
+  paying for a thread hand-off. A backend with its own async client
+  would subclass this and await it directly."""
+
+  def __init__(self, store: BaseUserStore,
+               offload: bool | None = None) -> None:
+    """Wraps a store, offloading its calls to threads if the backend blocks
+    (or offload says otherwise)"""
+
+    self.store: BaseUserStore = store
+    self.offload: bool = store.blocking if offload is None else offload
+
+  async def _call(self, method: Callable, *args: Any) -> Any:
+    """Runs one of the store's methods, on a thread if offloading"""
+
+    if self.offload:
+      return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+  async def add(self, user: User) -> None:
+    """Adds a user, raising UserConflictError if its username or ccn is
+    already registered"""
+
+    await self._call(self.store.add, user)
+
+  async def add_many(self, users: list[User]) -> None:
+    """Adds users in one step, adding none of them and raising
+    UserConflictError if any username or ccn is already registered"""
+
+    await self._call(self.store.add_many, users)
+
+  async def has_username(self, username: str) -> bool:
+    """Checks if a username is already registered"""
+
+    return await self._call(self.store.has_username, username)
+
+  async def has_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn is already registered"""
+
+    return await self._call(self.store.has_ccn, ccn)
+
+  def may_have_ccn(self, ccn: str) -> bool:
+    """Checks the store's filter of registered ccns, which is held in
+    memory so isn't awaited"""
+
+    return self.store.may_have_ccn(ccn)
+
+  async def get_by_ccn(self, ccn: str) -> User | None:
+    """Returns the user registered with a ccn, or None if there isn't one"""
+
+    return await self._call(self.store.get_by_ccn, ccn)
+
+  async def registered_ccns(self, ccns: Iterable[str]) -> set[str]:
+    """Returns which of the given ccns are registered to a user"""
+
+    return await self._call(self.store.registered_ccns, list(ccns))
+
+  async def count(self, has_ccn: bool | None = None) -> int:
+    """Returns the number of users matching the ccn filter"""
+
+    return await self._call(self.store.count, has_ccn)
+
+  async def page(self, has_ccn: bool | None, cursor: int,
+                 limit: int) -> tuple[list[User], int | None]:
+    """Returns up to limit users after cursor, along with the cursor of the
+    next page or None if there are no more users"""
+
+    return await self._call(self.store.page, has_ccn, cursor, limit)
@@ -0,0 +1,120 @@
+"""
+Name: base.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Interface shared by the user store backends.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
+# Local Imports
+from .records import User
+from .columns import UserTable
+from .bloom import BloomFilter
+
+class UserConflictError(Exception):
+  """Raised when adding a user whose username or ccn is already registered"""
+
+  def __init__(self, field: str) -> None:
+    """Records which unique detail ('username' or 'credit_card_number')
+    clashed"""
+
+    super().__init__(f"{field} already registered")
+    self.field: str = field
+
+class BaseUserStore(ABC):
+  """Store of registered users, kept in registration order. Usernames and
+  ccns are unique.
+
+  Users can be read a page at a time with an opaque cursor, optionally
+  filtered by whether they registered a ccn (has_ccn of True or False, or
+  None for every user)."""
+
+  # Filter of registered ccns, for backends which keep one
+  ccn_filter: BloomFilter | None = None
+
+  # Whether calls may wait on I/O or other processes, so async callers
+  # should run them on a thread
+  blocking: bool = True
+
+  # Whether counts, listings and statistics cover every registered user,
+  # rather than only those registered through this process
+  lists_every_user: bool = True
+
+  def __init__(self) -> None:
+    """Assigns the store a random id, so versions of different stores never
+    match, including stores in other processes or from before a restart"""
+
+    self.store_id: str = os.urandom(8).hex()
+
+  @property
+  def version(self) -> str:
+    """Changes whenever users are added to the store"""
+
+    return f"{self.store_id}.{self.count()}"
+
+  def add(self, user: User) -> None:
+    """Adds a user, raising UserConflictError if its username or ccn is
+    already registered"""
+
+    self.add_many([user])
+
+  @abstractmethod
+  def add_many(self, users: list[User]) -> None:
+    """Adds users in one step, adding none of them and raising
+    UserConflictError if any username or ccn is already registered"""
+
+  @abstractmethod
+  def has_username(self, username: str) -> bool:
+    """Checks if a username is already registered"""
+
+  @abstractmethod
+  def get_by_ccn(self, ccn: str) -> User | None:
+    """Returns the user registered with a ccn, or None if there isn't one"""
+
+  def has_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn is already registered"""
+
+    return self.get_by_ccn(ccn) is not None
+
+  def may_have_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn could be registered, answering False without a
+    lookup for ccns the store's filter knows were never registered"""
+
+    return self.ccn_filter is None or ccn in self.ccn_filter
+
+  @abstractmethod
+  def registered_ccns(self, ccns: Iterable[str]) -> set[str]:
+    """Returns which of the given ccns are registered to a user"""
+
+  @abstractmethod
+  def count(self, has_ccn: bool | None = None) -> int:
+    """Returns the number of users matching the ccn filter"""
+
+  @abstractmethod
+  def page(self, has_ccn: bool | None, cursor: int,
+           limit: int) -> tuple[list[User], int | None]:
+    """Returns up to limit users after cursor (0 for the first page), along
+    with the cursor of the next page or None if there are no more users"""
+
+  @abstractmethod
+  def table(self) -> UserTable:
+    """Returns a columnar table of every registered user, used to filter
+    users by age and summarise them"""
+
+  def iter_users(self, has_ccn: bool | None = None,
+                 page_size: int = 500) -> Iterator[User]:
+    """Yields every user matching the ccn filter a page at a time"""
+
+    cursor: int | None = 0
+    while cursor is not None:
+      page, cursor = self.page(has_ccn=has_ccn, cursor=cursor,
+                               limit=page_size)
+      yield from page
+
+  def __len__(self) -> int:
+    return self.count()
+
+  def __iter__(self) -> Iterator[User]:
+    return self.iter_users()
@@ -0,0 +1,92 @@
+"""
+Name: bloom.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Bloom filter of registered ccns, so payments with a ccn which was
+never registered are turned away without a store lookup.
+"""
+
+import math
+import threading
+
+class BloomFilter:
+  """Set of strings which can answer "definitely absent" or "possibly
+  present" in a fixed number of bits, sized for capacity items at a false
+  positive rate of error_rate.
+
+  Bit positions come from the strings' built-in hash, so a filter is only
+  valid within the process which built it."""
+
+  def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+    """Creates an empty filter with the number of bits and hashes giving
+    error_rate once capacity items have been added"""
+
+    self.capacity: int = capacity
+    self.error_rate: float = error_rate
+
+    self.size: int = max(8, math.ceil(
+      -capacity * math.log(error_rate) / math.log(2) ** 2))
+    self.hashes: int = max(1, round(self.size / capacity * math.log(2)))
+    self._bits: bytearray = bytearray((self.size + 7) // 8)
+
+    # Setting a bit rewrites its whole byte, so adds are serialized to not
+    # lose each other's bits
+    self._lock: threading.Lock = threading.Lock()
+
+    self.items: int = 0
+    self.lookups: int = 0
+    self.definite_misses: int = 0
+
+  def _positions(self, key: str) -> list[int]:
+    """Returns the bit positions of a key, derived from two halves of its
+    hash (Kirsch-Mitzenmacher double hashing)"""
+
+    key_hash: int = hash(key) & 0xFFFFFFFFFFFFFFFF
+    first: int = key_hash & 0xFFFFFFFF
+    # Odd, so every step moves to a new position
+    step: int = (key_hash >> 32) | 1
+
+    return [(first + index * step) % self.size
+            for index in range(self.hashes)]
+
+  def add(self, key: str) -> None:
+    """Adds a key to the filter"""
+
+    positions: list[int] = self._positions(key)
+    bits: bytearray = self._bits
+
+    with self._lock:
+      for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+      self.items += 1
+
+  def __contains__(self, key: str) -> bool:
+    """Checks if a key might have been added (False means it definitely
+    wasn't)"""
+
+    self.lookups += 1
+    bits: bytearray = self._bits
+    for position in self._positions(key):
+      if not bits[position >> 3] & (1 << (position & 7)):
+        self.definite_misses += 1
+        return False
+
+    return True
+
+  def false_positive_rate(self) -> float:
+    """Returns the expected chance of an absent key being reported as
+    possibly present, given the items added so far"""
+
+    return (1 - math.exp(-self.hashes * self.items / self.size)) \
+      ** self.hashes
+
+  def stats(self) -> dict:
+    """Returns the filter's sizing and counters"""
+
+    return {"items": self.items,
+            "capacity": self.capacity,
+            "bits": self.size,
+            "hashes": self.hashes,
+            "false_positive_rate": self.false_positive_rate(),
+            "lookups": self.lookups,
+            "definite_misses": self.definite_misses}
@@ -0,0 +1,80 @@
+"""
+Name: card_vault.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tokenizes ccns into a keyed fingerprint, which the stores index
+and payments look up, and a masked number shown in responses, so full
+ccns are never stored or returned.
+"""
+
+import dataclasses
+import hashlib
+import hmac
+import os
+# Local Imports
+from .records import User
+
+# Size of a vault key, and of the part of each HMAC kept as a fingerprint
+KEY_BYTES: int = 32
+FINGERPRINT_BYTES: int = 16
+
+# Trailing digits of a ccn left visible when masked
+VISIBLE_DIGITS: int = 4
+
+def load_key(path: str) -> bytes:
+  """Reads the vault key at path, creating it with a random key if it
+  doesn't exist. The key is linked into place whole, so processes starting
+  together all end up reading the same key."""
+
+  if not os.path.exists(path):
+    temp_path: str = f"{path}.{os.getpid()}.tmp"
+    key_fd: int = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                          0o600)
+    with os.fdopen(key_fd, "wb") as key_file:
+      key_file.write(os.urandom(KEY_BYTES))
+
+    try:
+      os.link(temp_path, path)
+    except FileExistsError:
+      pass
+    finally:
+      os.remove(temp_path)
+
+  with open(path, "rb") as key_file:
+    return key_file.read()
+
+class CardVault:
+  """Converts ccns into the fingerprint and masked number stored in their
+  place. Fingerprints are HMAC-SHA256s under the vault's key, so they
+  can't be reversed or recomputed without it, and equal ccns always give
+  equal fingerprints."""
+
+  def __init__(self, key: bytes) -> None:
+    """Creates a vault fingerprinting with key"""
+
+    self._key: bytes = key
+
+  def fingerprint(self, ccn: str) -> str:
+    """Returns the fingerprint a ccn is stored and looked up by"""
+
+    return hmac.digest(self._key, ccn.encode(),
+                       hashlib.sha256)[:FINGERPRINT_BYTES].hex()
+
+  @staticmethod
+  def mask(ccn: str) -> str:
+    """Returns a ccn with all but its last digits masked"""
+
+    return "*" * (len(ccn) - VISIBLE_DIGITS) + ccn[-VISIBLE_DIGITS:]
+
+  def protect(self, user: User | dict) -> User:
+    """Returns a copy of a user given with its full ccn (as a User or
+    dict), holding the ccn's fingerprint and masked number instead"""
+
+    if isinstance(user, dict):
+      user = User.from_dict(user)
+    if not user.has_ccn:
+      return user
+
+    return dataclasses.replace(
+      user, credit_card_number=self.fingerprint(user.credit_card_number),
+      card_mask=self.mask(user.credit_card_number))
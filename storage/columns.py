@@ -0,0 +1,187 @@
+"""
+Name: columns.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Columnar table of registered users, so filters and statistics run
+over packed arrays rather than visiting each user.
+"""
+
+from array import array
+from datetime import date, datetime
+from itertools import compress
+from threading import Lock
+from typing import Iterable
+from dateutil.relativedelta import relativedelta
+# Local Imports
+from .records import User
+
+# NumPy is optional, filters fall back to the array module's C loops
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# Swaps the 0/1 ccn flags, to select users without a ccn
+INVERT_FLAGS: bytes = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+# Average days per year, used for mean ages
+DAYS_PER_YEAR: float = 365.2425
+
+def dob_day(dob: str | None) -> int:
+  """Converts a YYYY-MM-DD date of birth into its day number (ordinal), or
+  0 if it isn't a valid date. Parsed as check_dob() does, so dates without
+  zero padding (e.g. 2000-1-1) which registration accepts are read too."""
+
+  try:
+    return datetime.strptime(dob, "%Y-%m-%d").toordinal()
+  except (TypeError, ValueError):
+    return 0
+
+def age_on(dob: date, today: date) -> int:
+  """Returns the age in whole years of someone born on dob"""
+
+  return today.year - dob.year - \
+    ((today.month, today.day) < (dob.month, dob.day))
+
+def dob_days_for_ages(min_age: int | None, max_age: int | None,
+                      today: date) -> tuple[int, int]:
+  """Returns the first and last day numbers a date of birth can have for
+  an age between min_age and max_age (inclusive) today"""
+
+  # Born after the day someone turning max_age + 1 today was born
+  first_day: int = 1 if max_age is None else \
+    (today - relativedelta(years=max_age + 1)).toordinal() + 1
+
+  # Born on or before the day someone turning min_age today was born
+  last_day: int = date.max.toordinal() if min_age is None else \
+    (today - relativedelta(years=min_age)).toordinal()
+
+  return first_day, last_day
+
+class UserTable:
+  """Registered users with their ccn flags and dates of birth packed into
+  columns alongside them, in registration order.
+
+  A user's position in the table serves as its id. Columns only ever
+  grow, so readers work on a copy of the rows present when they started."""
+
+  def __init__(self) -> None:
+    """Creates an empty table"""
+
+    # One byte per user, 1 if they registered a ccn
+    self.ccn_flags: bytearray = bytearray()
+    # Date of birth as a day number, 0 if it isn't known
+    self.dob_days: array = array('q')
+    self.users: list[User] = []
+
+    # Taken while appending and while copying columns, as arrays can't grow
+    # while a copy is being taken from them
+    self._lock: Lock = Lock()
+
+  def append(self, user: User) -> None:
+    """Adds a user to the end of the table"""
+
+    self.extend([user])
+
+  def extend(self, users: Iterable[User]) -> None:
+    """Adds users to the end of the table"""
+
+    with self._lock:
+      for user in users:
+        self.ccn_flags.append(user.has_ccn)
+        self.dob_days.append(dob_day(user.dob))
+        self.users.append(user)
+
+  def __len__(self) -> int:
+    return len(self.users)
+
+  def _columns(self) -> tuple[bytearray, array]:
+    """Returns a copy of the ccn flags and dates of birth columns"""
+
+    with self._lock:
+      return self.ccn_flags[:], self.dob_days[:]
+
+  def _rows(self, ccn_flags: bytearray, dob_days: array,
+            has_ccn: bool | None, first_day: int | None,
+            last_day: int | None):
+    """Returns the positions of the users matching the filters, as a NumPy
+    array if NumPy is available or an iterable of ints otherwise"""
+
+    dated: bool = first_day is not None or last_day is not None
+    first_day = first_day or 1
+    last_day = last_day or date.max.toordinal()
+
+    if numpy is not None:
+      mask = numpy.ones(len(ccn_flags), dtype=bool)
+      if has_ccn is not None:
+        mask &= numpy.frombuffer(ccn_flags, dtype=numpy.uint8) == has_ccn
+      if dated:
+        days = numpy.frombuffer(dob_days, dtype=numpy.int64)
+        mask &= (days >= first_day) & (days <= last_day)
+      return numpy.flatnonzero(mask)
+
+    selected: Iterable[int] = range(len(ccn_flags))
+    if has_ccn is not None:
+      selected = compress(selected, ccn_flags if has_ccn
+                          else ccn_flags.translate(INVERT_FLAGS))
+    if dated:
+      selected = [row for row in selected
+                  if first_day <= dob_days[row] <= last_day]
+    return selected
+
+  def select(self, has_ccn: bool | None = None,
+             first_day: int | None = None,
+             last_day: int | None = None) -> list[User]:
+    """Returns users matching the ccn filter (as for BaseUserStore.count())
+    born between the first and last day numbers (inclusive)"""
+
+    ccn_flags, dob_days = self._columns()
+    rows = self._rows(ccn_flags, dob_days, has_ccn, first_day, last_day)
+    if numpy is not None:
+      rows = rows.tolist()
+
+    users: list[User] = self.users
+    return [users[row] for row in rows]
+
+  def stats(self, today: date, has_ccn: bool | None = None,
+            first_day: int | None = None,
+            last_day: int | None = None) -> dict:
+    """Summarises the users matching the filters: how many there are, how
+    many registered a ccn, and the youngest, oldest and mean ages of those
+    with a known date of birth (None if there are none)"""
+
+    ccn_flags, dob_days = self._columns()
+    rows = self._rows(ccn_flags, dob_days, has_ccn, first_day, last_day)
+
+    # Totals the ccn flags and known dates of birth of the matching users
+    if numpy is not None:
+      matched: int = len(rows)
+      with_ccn: int = int(numpy.frombuffer(
+        ccn_flags, dtype=numpy.uint8)[rows].sum())
+      days = numpy.frombuffer(dob_days, dtype=numpy.int64)[rows]
+      days = days[days > 0]
+      known: tuple | None = (int(days.min()), int(days.max()),
+                             int(days.sum()), len(days)) \
+        if len(days) else None
+    else:
+      rows = list(rows)
+      matched = len(rows)
+      with_ccn = sum(ccn_flags[row] for row in rows)
+      days = [day for row in rows if (day := dob_days[row])]
+      known = (min(days), max(days), sum(days), len(days)) if days else None
+
+    summary: dict = {"users": matched,
+                     "with_credit_card": with_ccn,
+                     "without_credit_card": matched - with_ccn,
+                     "youngest_age": None,
+                     "oldest_age": None,
+                     "mean_age": None}
+
+    if known is not None:
+      earliest, latest, total, dated = known
+      summary["youngest_age"] = age_on(date.fromordinal(latest), today)
+      summary["oldest_age"] = age_on(date.fromordinal(earliest), today)
+      summary["mean_age"] = round(
+        (today.toordinal() - total / dated) / DAYS_PER_YEAR, 1)
+
+    return summary
@@ -0,0 +1,154 @@
+"""
+Name: journal.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: In-memory user store made durable with an append-only journal and
+periodic snapshots, recovered on startup.
+"""
+
+import json
+import mmap
+import os
+import threading
+from typing import Iterator
+# Local Imports
+from .user_store import UserStore
+from .records import User
+from .bloom import BloomFilter
+
+SNAPSHOT_FILE: str = "snapshot.jsonl"
+JOURNAL_FILE: str = "journal.jsonl"
+
+# Decoder shared by every line read, skipping the encoding detection and
+# whitespace checks json.loads() makes each call
+DECODER: json.JSONDecoder = json.JSONDecoder()
+
+def decode_user(line: bytes) -> User:
+  """Decodes one line of a snapshot or journal into a user"""
+
+  return User.from_dict(DECODER.raw_decode(line.decode())[0])
+
+def encode_user(user: User) -> bytes:
+  """Encodes a user as one line of a snapshot or journal"""
+
+  return json.dumps(user.to_dict()).encode() + b"\n"
+
+def read_lines(path: str) -> Iterator[tuple[int, bytes]]:
+  """Yields each line of a file (without its newline) along with the offset
+  just after it, reading the file through a memory map"""
+
+  if not os.path.exists(path) or os.path.getsize(path) == 0:
+    return
+
+  with open(path, "rb") as file, \
+      mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+    for line in iter(mapped.readline, b""):
+      yield mapped.tell(), line.rstrip(b"\n")
+
+class JournaledUserStore(UserStore):
+  """Keeps users in memory like UserStore, but appends every registration
+  to a journal (one JSON user per line) before adding it.
+
+  Once snapshot_every users have been journaled, every user is written to a
+  snapshot and the journal is emptied. On startup the snapshot is loaded
+  and the journal replayed on top of it."""
+
+  # Adding users writes to the journal, and sometimes a snapshot
+  blocking: bool = True
+
+  def __init__(self, directory: str, snapshot_every: int = 100000,
+               fsync: bool = False,
+               ccn_filter: BloomFilter | None = None) -> None:
+    """Recovers the users held in directory, creating it if needed"""
+
+    super().__init__(ccn_filter=ccn_filter)
+
+    self.directory: str = directory
+    self.snapshot_every: int = snapshot_every
+    # Whether each append waits for the journal to reach the disk, rather
+    # than just the OS (which survives the process crashing)
+    self.fsync: bool = fsync
+
+    os.makedirs(directory, exist_ok=True)
+    self.snapshot_path: str = os.path.join(directory, SNAPSHOT_FILE)
+    self.journal_path: str = os.path.join(directory, JOURNAL_FILE)
+
+    # Number of users journaled since the last snapshot
+    self._journaled: int = 0
+    # Serializes appends to the journal and snapshots
+    self._journal_lock: threading.Lock = threading.Lock()
+    self._recover()
+
+    self._journal = open(self.journal_path, "ab")
+
+  def _recover(self) -> None:
+    """Loads the snapshot then replays the journal"""
+
+    for _, line in read_lines(self.snapshot_path):
+      self._insert(decode_user(line))
+
+    # Replays the journal up to the last complete line, discarding a line
+    # torn by a crash part way through an append
+    valid_end: int = 0
+    for end, line in read_lines(self.journal_path):
+      try:
+        user: User = decode_user(line)
+      except ValueError:
+        break
+      valid_end = end
+
+      # Users already in the snapshot are skipped, in case the service
+      # stopped between writing a snapshot and emptying the journal
+      if not self.has_username(user.username):
+        self._insert(user)
+        self._journaled += 1
+
+    if os.path.exists(self.journal_path) and \
+        os.path.getsize(self.journal_path) != valid_end:
+      os.truncate(self.journal_path, valid_end)
+
+  def add_many(self, users: list[User]) -> None:
+    """Journals users and then adds them, taking a snapshot once enough
+    users have been journaled"""
+
+    with self._locked(users):
+      self._check_conflicts(users)
+
+      # Appends and inserts happen together, so a snapshot never misses a
+      # user whose journal entry it empties
+      with self._journal_lock:
+        self._journal.write(b"".join(encode_user(user) for user in users))
+        self._journal.flush()
+        if self.fsync:
+          os.fsync(self._journal.fileno())
+
+        for user in users:
+          self._insert(user)
+
+        self._journaled += len(users)
+        if self._journaled >= self.snapshot_every:
+          self.snapshot()
+
+  def snapshot(self) -> None:
+    """Writes every user to a new snapshot, replacing the old one, then
+    empties the journal"""
+
+    temp_path: str = self.snapshot_path + ".tmp"
+    with open(temp_path, "wb") as file:
+      for user in self._users:
+        file.write(encode_user(user))
+      file.flush()
+      os.fsync(file.fileno())
+
+    # Swaps the snapshot in atomically, so a crash leaves either the old
+    # or new snapshot in place
+    os.replace(temp_path, self.snapshot_path)
+
+    self._journal.truncate(0)
+    self._journal.seek(0)
+    self._journaled = 0
+
+  def close(self) -> None:
+    """Closes the journal"""
+
+    self._journal.close()
@@ -0,0 +1,142 @@
+"""
+Name: ledger.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Append-only ledger of payments made, held in packed arrays, with
+running totals overall and per card (and so per user) kept as payments are
+recorded.
+"""
+
+import time
+from array import array
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Callable
+# Local Imports
+from .records import User
+
+class PaymentLedger:
+  """Payments in the order they were made, one entry per payment across
+  three arrays: amount, card number (an index into the ledger's table of
+  cards) and time made. Each card is stored once, with its owner's
+  username, masked number and running count and total.
+
+  Totals are updated as each payment is recorded, so summaries never
+  visit the payments. Payments are only ever appended, so a position in
+  the ledger stays valid as a pagination cursor."""
+
+  def __init__(self, clock: Callable[[], float] = time.time) -> None:
+    """Creates an empty ledger, timing payments with clock"""
+
+    self._clock: Callable[[], float] = clock
+    self._lock: Lock = Lock()
+
+    # One entry per payment
+    self._amounts: array = array('q')
+    self._cards: array = array('l')
+    self._times: array = array('d')
+
+    # One entry per card paid with, indexed by the numbers in _cards
+    self._card_ids: dict[str, int] = {}
+    self._usernames: list[str | None] = []
+    self._masks: list[str | None] = []
+    self._card_counts: array = array('q')
+    self._card_totals: array = array('q')
+    # Card of each user paid for (a user registers at most one card)
+    self._user_cards: dict[str, int] = {}
+
+    self.total_amount: int = 0
+
+  def __len__(self) -> int:
+    return len(self._amounts)
+
+  def _add_card(self, ccn: str, user: User | None) -> int:
+    """Returns the number of a card, adding it along with its owner (who
+    may be unknown to a store only holding its own worker's users) if it
+    hasn't been paid with before. Must be called while holding the
+    ledger's lock."""
+
+    card_id: int | None = self._card_ids.get(ccn)
+    if card_id is not None:
+      return card_id
+
+    card_id = len(self._usernames)
+    self._usernames.append(user.username if user is not None else None)
+    self._masks.append(user.card_mask if user is not None else None)
+    self._card_counts.append(0)
+    self._card_totals.append(0)
+
+    self._card_ids[ccn] = card_id
+    if user is not None:
+      self._user_cards[user.username] = card_id
+    return card_id
+
+  def record(self, ccn: str, amount: int,
+             find_user: Callable[[str], User | None]) -> int:
+    """Records a payment of amount with a registered ccn, returning its
+    position in the ledger. find_user returns the user registered with a
+    ccn, and is only called for a card's first payment."""
+
+    with self._lock:
+      card_id: int | None = self._card_ids.get(ccn)
+
+    # Looks up a new card's owner without holding the lock, as the store
+    # may have to query a database
+    user: User | None = find_user(ccn) if card_id is None else None
+
+    with self._lock:
+      if card_id is None:
+        card_id = self._add_card(ccn, user)
+
+      self._amounts.append(amount)
+      self._cards.append(card_id)
+      self._times.append(self._clock())
+
+      self._card_counts[card_id] += 1
+      self._card_totals[card_id] += amount
+      self.total_amount += amount
+
+      return len(self._amounts) - 1
+
+  def page(self, cursor: int, limit: int) -> tuple[list[dict], int | None]:
+    """Returns up to limit payments from position cursor, along with the
+    cursor of the next page or None if there are no more payments"""
+
+    with self._lock:
+      end: int = min(cursor + limit, len(self._amounts))
+      payments: list[dict] = [{
+        "id": position,
+        "username": self._usernames[card_id],
+        "credit_card_number": self._masks[card_id],
+        "amount": amount,
+        "made_at": datetime.fromtimestamp(made_at, timezone.utc).isoformat()
+      } for position, amount, card_id, made_at in zip(
+        range(cursor, end), self._amounts[cursor:end],
+        self._cards[cursor:end], self._times[cursor:end])]
+
+      return payments, end if end < len(self._amounts) else None
+
+  def summary(self) -> dict:
+    """Returns the number and total of payments, the mean payment and the
+    number of cards paid with"""
+
+    with self._lock:
+      count: int = len(self._amounts)
+      return {"payments": count,
+              "total_amount": self.total_amount,
+              "mean_amount": self.total_amount / count if count else None,
+              "cards": len(self._card_ids)}
+
+  def user_summary(self, username: str) -> dict | None:
+    """Returns the number and total of a user's payments, or None if there
+    are none"""
+
+    with self._lock:
+      card_id: int | None = self._user_cards.get(username)
+      if card_id is None:
+        return None
+
+      return {"username": username,
+              "credit_card_number": self._masks[card_id],
+              "payments": self._card_counts[card_id],
+              "total_amount": self._card_totals[card_id]}
@@ -0,0 +1,62 @@
+"""
+Name: records.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Compact record type for registered users.
+"""
+
+from dataclasses import dataclass, field
+
+# Details of a user, in the order they are serialized
+USER_FIELDS: tuple[str, ...] = ("username", "password", "email", "dob",
+                                "credit_card_number", "card_mask")
+
+# Details returned in responses along with the attribute holding each,
+# leaving out the password hash and showing the ccn masked
+RESPONSE_FIELDS: tuple[tuple[str, str], ...] = (
+  ("username", "username"), ("email", "email"), ("dob", "dob"),
+  ("credit_card_number", "card_mask"))
+
+@dataclass(slots=True)
+class User:
+  """A registered user. Slots avoid a per-user attribute dict, and details
+  which weren't given (e.g. an absent ccn) are None.
+
+  Users registered through the service hold their ccn's vault fingerprint
+  as credit_card_number, along with its masked number (see CardVault)."""
+
+  username: str
+  password: str | None = None
+  email: str | None = None
+  dob: str | None = None
+  credit_card_number: str | None = None
+  card_mask: str | None = None
+  # Whether a ccn was registered, used to partition users
+  has_ccn: bool = field(init=False)
+
+  def __post_init__(self) -> None:
+    """Sets the ccn flag, treating an empty ccn as absent"""
+
+    if not self.credit_card_number:
+      self.credit_card_number = None
+    self.has_ccn = self.credit_card_number is not None
+
+  @classmethod
+  def from_dict(cls, details: dict) -> "User":
+    """Creates a user from a dict in the shape returned by to_dict()"""
+
+    return cls(**{name: details.get(name) for name in USER_FIELDS})
+
+  def to_dict(self) -> dict:
+    """Serializes every detail of the user (as stored), leaving out details
+    which weren't given"""
+
+    return {name: value for name in USER_FIELDS
+            if (value := getattr(self, name)) is not None}
+
+  def to_response(self) -> dict:
+    """Serializes the user into the dict returned in responses, which never
+    includes the password and only includes the masked ccn"""
+
+    return {name: value for name, attribute in RESPONSE_FIELDS
+            if (value := getattr(self, attribute)) is not None}
@@ -0,0 +1,234 @@
+"""
+Name: shared_index.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Hash index of registered usernames and ccns in a memory-mapped
+file shared by every worker process, and an in-memory store which checks
+it, so duplicates and payments are detected across workers.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+# Local Imports
+from .records import User
+from .user_store import UserStore
+
+# File locks serialize writers across processes where available (Unix),
+# elsewhere only threads of one process are serialized
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+# Header: magic, slots per table, usernames and ccns indexed
+HEADER: struct.Struct = struct.Struct("<8sQQQ")
+MAGIC: bytes = b"RPAINDX1"
+
+# Each slot holds a key's digest, all zero while empty
+SLOT_SIZE: int = 16
+EMPTY_SLOT: bytes = bytes(SLOT_SIZE)
+
+# Share of a table's slots which can be filled before it refuses inserts,
+# keeping probe sequences short
+MAX_LOAD: float = 0.75
+
+class SharedIndexFullError(Exception):
+  """Raised when adding more keys than the shared index has room for"""
+
+def key_digest(key: str, table: bytes) -> bytes:
+  """Hashes a username or ccn into the digest stored in its table"""
+
+  return hashlib.blake2b(key.encode(), digest_size=SLOT_SIZE,
+                         person=table).digest()
+
+class SharedUserIndex:
+  """Open-addressing hash sets of usernames and ccns in a memory-mapped
+  file. Every process mapping the file sees the same sets.
+
+  Keys are stored as 16-byte digests, so a slot is written in one copy and
+  a reader either sees the whole digest or an empty slot. Lookups therefore
+  take no lock, while inserts are serialized by write_lock()."""
+
+  def __init__(self, path: str, capacity: int = 1 << 20) -> None:
+    """Maps the index file at path, creating it with room for capacity keys
+    per table (rounded up to a power of two) if it doesn't exist. An
+    existing file keeps its own capacity."""
+
+    self.path: str = path
+
+    if not os.path.exists(path):
+      self.create(path, capacity)
+
+    self._file = open(path, "r+b")
+    self._mm: mmap.mmap = mmap.mmap(self._file.fileno(), 0)
+
+    magic, self.capacity, _, _ = HEADER.unpack_from(self._mm, 0)
+    if magic != MAGIC:
+      raise ValueError(f"{path} is not a shared user index")
+    self._mask: int = self.capacity - 1
+
+    # Start of each table
+    self._offsets: dict[bytes, int] = {
+      b"username": HEADER.size,
+      b"ccn": HEADER.size + self.capacity * SLOT_SIZE
+    }
+
+    # Serializes writers in this process, and (through a lock on the file,
+    # reopened after a fork) across processes
+    self._lock: threading.Lock = threading.Lock()
+    self._lock_file = None
+    self._pid: int | None = None
+
+  @staticmethod
+  def create(path: str, capacity: int = 1 << 20) -> None:
+    """Creates (or empties) the index file at path"""
+
+    capacity = 1 << max(capacity - 1, 1).bit_length()
+
+    with open(path, "wb") as index_file:
+      index_file.write(HEADER.pack(MAGIC, capacity, 0, 0))
+      index_file.truncate(HEADER.size + 2 * capacity * SLOT_SIZE)
+
+  def close(self) -> None:
+    """Unmaps the index file"""
+
+    self._mm.close()
+    self._file.close()
+    if self._lock_file is not None:
+      self._lock_file.close()
+
+  @contextmanager
+  def write_lock(self) -> Iterator[None]:
+    """Holds the index's write lock, shared by every process"""
+
+    with self._lock:
+      if fcntl is None:
+        yield
+        return
+
+      # A forked process needs its own open file to hold its own lock
+      if self._pid != os.getpid():
+        self._lock_file = open(self.path, "rb")
+        self._pid = os.getpid()
+
+      fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+  def _find(self, table: bytes, digest: bytes) -> tuple[int, bool]:
+    """Returns the offset of the slot holding digest and True, or of the
+    empty slot ending its probe sequence and False"""
+
+    mm: mmap.mmap = self._mm
+    start: int = self._offsets[table]
+    slot: int = int.from_bytes(digest[:8], "little") & self._mask
+
+    while True:
+      offset: int = start + slot * SLOT_SIZE
+      found: bytes = mm[offset:offset + SLOT_SIZE]
+      if found == digest:
+        return offset, True
+      if found == EMPTY_SLOT:
+        return offset, False
+      slot = (slot + 1) & self._mask
+
+  def contains(self, table: bytes, key: str) -> bool:
+    """Checks if a key is in a table (b"username" or b"ccn")"""
+
+    return self._find(table, key_digest(key, table))[1]
+
+  def has_username(self, username: str) -> bool:
+    """Checks if a username is registered in any process"""
+
+    return self.contains(b"username", username)
+
+  def has_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn is registered in any process"""
+
+    return self.contains(b"ccn", ccn)
+
+  def counts(self) -> tuple[int, int]:
+    """Returns the number of usernames and ccns indexed"""
+
+    return HEADER.unpack_from(self._mm, 0)[2:]
+
+  def add(self, usernames: Iterable[str], ccns: Iterable[str]) -> None:
+    """Adds usernames and ccns, which must not already be indexed. Must be
+    called while holding write_lock()."""
+
+    usernames = list(usernames)
+    ccns = list(ccns)
+    username_count, ccn_count = self.counts()
+
+    if max(username_count + len(usernames), ccn_count + len(ccns)) > \
+        self.capacity * MAX_LOAD:
+      raise SharedIndexFullError(
+        f"shared index {self.path} is full, recreate it with a larger " \
+        "capacity")
+
+    for table, keys in ((b"username", usernames), (b"ccn", ccns)):
+      for key in keys:
+        digest: bytes = key_digest(key, table)
+        offset, found = self._find(table, digest)
+        if not found:
+          self._mm[offset:offset + SLOT_SIZE] = digest
+
+    HEADER.pack_into(self._mm, 0, MAGIC, self.capacity,
+                     username_count + len(usernames), ccn_count + len(ccns))
+
+class SharedIndexUserStore(UserStore):
+  """In-memory store whose duplicate and ccn checks go through a shared
+  index, so every worker process sees every registration.
+
+  Users themselves are still held by the worker which registered them:
+  get_by_ccn(), counts and listings only cover this worker's users, so
+  with more than one worker they don't list every user."""
+
+  # Adding users waits on the index's lock, which other processes hold
+  blocking: bool = True
+
+  def __init__(self, index: SharedUserIndex,
+               users: list[User | dict] | None = None,
+               workers: int = 1) -> None:
+    """Creates a store checking against index, optionally populated with
+    existing users, for one of workers worker processes"""
+
+    self.index: SharedUserIndex = index
+    self.lists_every_user = workers == 1
+    super().__init__(users)
+
+  def add_many(self, users: list[User]) -> None:
+    """Adds users to the shared index and this worker's store in one step,
+    holding the index's write lock so no other worker can claim the same
+    username or ccn in between"""
+
+    with self.index.write_lock():
+      self._check_conflicts(users)
+      self.index.add(usernames=(user.username for user in users),
+                     ccns=(user.credit_card_number for user in users
+                           if user.has_ccn))
+
+      for user in users:
+        self._insert(user)
+
+  def has_username(self, username: str) -> bool:
+    """Checks if a username is registered with any worker"""
+
+    return self.index.has_username(username)
+
+  def has_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn is registered with any worker"""
+
+    return self.index.has_ccn(ccn)
+
+  def registered_ccns(self, ccns: Iterable[str]) -> set[str]:
+    """Returns which of the given ccns are registered with any worker"""
+
+    return {ccn for ccn in ccns if self.index.has_ccn(ccn)}
@@ -0,0 +1,215 @@
+"""
+Name: sqlite_pool.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Per-thread SQLite connections and a group-commit writer which
+batches inserts from concurrent requests into shared transactions.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Callable
+
+def connect(path: str) -> sqlite3.Connection:
+  """Opens a connection to the database in WAL mode, in autocommit mode so
+  transactions are only begun explicitly"""
+
+  connection: sqlite3.Connection = sqlite3.connect(
+    path, check_same_thread=False, isolation_level=None,
+    cached_statements=64)
+
+  # WAL lets readers carry on while registrations are being written, and
+  # only needs a full sync on checkpoints
+  connection.execute("PRAGMA journal_mode=WAL")
+  connection.execute("PRAGMA synchronous=NORMAL")
+  connection.execute("PRAGMA busy_timeout=5000")
+
+  return connection
+
+class ConnectionPool:
+  """Hands each thread its own connection to a database, reused for every
+  query the thread makes. A thread's connection is closed once the thread
+  has finished."""
+
+  def __init__(self, path: str) -> None:
+    """Creates an empty pool for the database at path"""
+
+    self.path: str = path
+    self._local: threading.local = threading.local()
+    # Every open connection, dropped along with its thread
+    self._connections: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+    self._lock: threading.Lock = threading.Lock()
+
+  def get(self) -> sqlite3.Connection:
+    """Returns the calling thread's connection, opening it if needed"""
+
+    connection: sqlite3.Connection | None = getattr(self._local,
+                                                    "connection", None)
+
+    # Connections aren't shared with a forked worker process
+    if connection is None or self._local.pid != os.getpid():
+      connection = connect(self.path)
+      self._local.connection = connection
+      self._local.pid = os.getpid()
+
+      with self._lock:
+        self._connections[threading.current_thread()] = connection
+
+    return connection
+
+  def close(self) -> None:
+    """Closes every connection in the pool"""
+
+    with self._lock:
+      for connection in self._connections.values():
+        connection.close()
+      self._connections.clear()
+
+    self._local = threading.local()
+
+class GroupCommitWriter:
+  """Writes inserts on a background thread, committing every insert
+  submitted within a short window of each other in one transaction, so
+  bursts of registrations share one sync to disk.
+
+  Each submission runs in its own savepoint, so one failing (e.g. on a
+  unique index) doesn't affect the others in its transaction."""
+
+  def __init__(self, path: str, statement: str, window_ms: float,
+               max_batch: int = 256,
+               on_error: Callable[[sqlite3.Error], Exception] | None = None
+               ) -> None:
+    """Creates a writer inserting rows with statement, waiting up to
+    window_ms for more submissions once one arrives"""
+
+    self.path: str = path
+    self.statement: str = statement
+    self.window: float = window_ms / 1000
+    self.max_batch: int = max_batch
+    # Converts an error from a submission's insert into the exception
+    # raised to its submitter
+    self.on_error: Callable[[sqlite3.Error], Exception] = \
+      on_error or (lambda error: error)
+
+    # Number of transactions and submissions committed, for monitoring
+    self.commits: int = 0
+    self.submissions: int = 0
+
+    self._queue: queue.Queue = queue.Queue()
+    self._thread: threading.Thread | None = None
+    self._pid: int | None = None
+    self._lock: threading.Lock = threading.Lock()
+
+  def submit(self, rows: list[tuple]) -> Future:
+    """Queues rows to be inserted together, returning a future resolved once
+    they have been committed (or failed)"""
+
+    self._ensure_started()
+
+    future: Future = Future()
+    self._queue.put((rows, future))
+    return future
+
+  def _ensure_started(self) -> None:
+    """Starts the writer thread, restarting it in a forked process"""
+
+    if self._pid == os.getpid():
+      return
+
+    with self._lock:
+      if self._pid != os.getpid():
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="sqlite-group-commit")
+        self._thread.start()
+        self._pid = os.getpid()
+
+  def close(self) -> None:
+    """Commits any queued submissions and stops the writer thread"""
+
+    if self._thread is not None and self._pid == os.getpid():
+      self._queue.put(None)
+      self._thread.join()
+    self._thread = None
+    self._pid = None
+
+  def _run(self) -> None:
+    """Collects submissions into groups and commits them until closed"""
+
+    connection: sqlite3.Connection = connect(self.path)
+
+    while True:
+      first: tuple | None = self._queue.get()
+      if first is None:
+        break
+
+      group: list[tuple] = [first]
+      closing: bool = False
+      deadline: float = time.monotonic() + self.window
+
+      # Waits out the window for more submissions to join the group, then
+      # takes any still queued
+      while len(group) < self.max_batch:
+        remaining: float = deadline - time.monotonic()
+        try:
+          if remaining > 0:
+            submission: tuple | None = self._queue.get(timeout=remaining)
+          else:
+            submission = self._queue.get_nowait()
+        except queue.Empty:
+          break
+
+        if submission is None:
+          closing = True
+          break
+        group.append(submission)
+
+      self._commit(connection, group)
+      if closing:
+        break
+
+    connection.close()
+
+  def _commit(self, connection: sqlite3.Connection,
+              group: list[tuple]) -> None:
+    """Inserts a group of submissions in one transaction, then resolves
+    their futures"""
+
+    outcomes: list[Exception | None] = []
+
+    try:
+      connection.execute("BEGIN IMMEDIATE")
+
+      for rows, _ in group:
+        connection.execute("SAVEPOINT submission")
+        try:
+          connection.executemany(self.statement, rows)
+          outcomes.append(None)
+        except sqlite3.Error as error:
+          connection.execute("ROLLBACK TO submission")
+          outcomes.append(self.on_error(error))
+        connection.execute("RELEASE submission")
+
+      connection.execute("COMMIT")
+
+    # If the transaction itself fails, every submission in it fails
+    except sqlite3.Error as error:
+      if connection.in_transaction:
+        connection.execute("ROLLBACK")
+      outcomes = [error] * len(group)
+
+    else:
+      self.commits += 1
+      self.submissions += len(group)
+
+    # Submitters only hear back once their rows are committed
+    for (_, future), outcome in zip(group, outcomes):
+      if outcome is None:
+        future.set_result(None)
+      else:
+        future.set_exception(outcome)
@@ -0,0 +1,218 @@
+"""
+Name: sqlite_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: SQLite backed store of registered users, persisting users across
+restarts.
+"""
+
+import sqlite3
+from threading import Lock
+from typing import Iterable
+# Local Imports
+from .base import BaseUserStore, UserConflictError
+from .sqlite_pool import ConnectionPool, GroupCommitWriter
+from .records import User
+from .columns import UserTable
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY,
+  username TEXT NOT NULL,
+  password TEXT NOT NULL,
+  email TEXT NOT NULL,
+  dob TEXT NOT NULL,
+  credit_card_number TEXT,
+  card_mask TEXT,
+  has_ccn INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_username ON users (username);
+CREATE UNIQUE INDEX IF NOT EXISTS users_ccn ON users (credit_card_number);
+CREATE INDEX IF NOT EXISTS users_has_ccn ON users (has_ccn, id);
+"""
+
+# Statements are kept constant so sqlite3's statement cache prepares each
+# one only once per pooled connection
+INSERT_USER: str = "INSERT INTO users (username, password, email, dob, " \
+  "credit_card_number, card_mask, has_ccn) VALUES (?, ?, ?, ?, ?, ?, ?)"
+SELECT_USERNAME: str = "SELECT 1 FROM users WHERE username = ?"
+SELECT_BY_CCN: str = "SELECT id, username, password, email, dob, " \
+  "credit_card_number, card_mask FROM users WHERE credit_card_number = ?"
+SELECT_MAX_ID: str = "SELECT COALESCE(MAX(id), 0) FROM users"
+COUNT_ALL: str = "SELECT COUNT(*) FROM users"
+COUNT_FILTERED: str = "SELECT COUNT(*) FROM users WHERE has_ccn = ?"
+PAGE_ALL: str = "SELECT id, username, password, email, dob, " \
+  "credit_card_number, card_mask FROM users WHERE id > ? ORDER BY id LIMIT ?"
+PAGE_FILTERED: str = "SELECT id, username, password, email, dob, " \
+  "credit_card_number, card_mask FROM users WHERE has_ccn = ? AND id > ? " \
+  "ORDER BY id LIMIT ?"
+SELECT_AFTER: str = "SELECT id, username, password, email, dob, " \
+  "credit_card_number, card_mask FROM users WHERE id > ? ORDER BY id"
+
+# Number of ccns looked up per query by registered_ccns(), kept under
+# SQLite's limit on query parameters
+CCN_CHUNK_SIZE: int = 500
+
+def row_to_user(row: tuple) -> User:
+  """Converts a users row (starting with its id) into a User"""
+
+  return User(*row[1:])
+
+def user_to_row(user: User) -> tuple:
+  """Converts a User into the parameters of INSERT_USER"""
+
+  return (user.username, user.password, user.email, user.dob,
+          user.credit_card_number, user.card_mask, user.has_ccn)
+
+def conflict_error(error: sqlite3.Error) -> Exception:
+  """Converts a unique index violation into a UserConflictError"""
+
+  if not isinstance(error, sqlite3.IntegrityError):
+    return error
+
+  return UserConflictError(
+    'username' if 'username' in str(error) else 'credit_card_number')
+
+class SQLiteUserStore(BaseUserStore):
+  """Holds registered users in an SQLite database in WAL mode, relying on
+  its unique indexes for duplicate detection and ccn lookups.
+
+  Each thread reads through its own pooled connection, and registrations
+  are written by a group-commit writer. Registered usernames and ccns can
+  optionally be cached in memory as they are read, as a registered user is
+  never removed."""
+
+  def __init__(self, path: str, commit_window_ms: float = 2,
+               read_cache: bool = False) -> None:
+    """Opens (creating if needed) the database at path"""
+
+    super().__init__()
+
+    self.path: str = path
+    self._pool: ConnectionPool = ConnectionPool(path=path)
+    self._writer: GroupCommitWriter = GroupCommitWriter(
+      path=path, statement=INSERT_USER, window_ms=commit_window_ms,
+      on_error=conflict_error)
+
+    # Read-through cache of registered usernames and users by ccn
+    self.read_cache: bool = read_cache
+    self._cached_usernames: set[str] = set()
+    self._cached_ccns: dict[str, User] = {}
+
+    # Columnar copy of the users table, along with the id of the last row
+    # copied into it
+    self._table: UserTable = UserTable()
+    self._table_id: int = 0
+    self._table_lock: Lock = Lock()
+
+    self._pool.get().executescript(SCHEMA)
+
+  def close(self) -> None:
+    """Finishes any pending writes and closes the connections"""
+
+    self._writer.close()
+    self._pool.close()
+
+  @property
+  def version(self) -> str:
+    """Changes whenever users are added, including by other processes"""
+
+    max_id: int = self._pool.get().execute(SELECT_MAX_ID).fetchone()[0]
+    return f"{self.store_id}.{max_id}"
+
+  def add_many(self, users: list[User]) -> None:
+    """Adds users in one savepoint of a group commit, rolling back if any
+    clash with the unique indexes"""
+
+    # Waits until the users are committed, raising a UserConflictError
+    self._writer.submit([user_to_row(user) for user in users]).result()
+
+  def has_username(self, username: str) -> bool:
+    """Checks if a username is already registered"""
+
+    if username in self._cached_usernames:
+      return True
+
+    found: bool = self._pool.get().execute(
+      SELECT_USERNAME, (username,)).fetchone() is not None
+
+    if found and self.read_cache:
+      self._cached_usernames.add(username)
+    return found
+
+  def get_by_ccn(self, ccn: str) -> User | None:
+    """Returns the user registered with a ccn, or None if there isn't one"""
+
+    user: User | None = self._cached_ccns.get(ccn)
+    if user is not None:
+      return user
+
+    row: tuple | None = self._pool.get().execute(SELECT_BY_CCN,
+                                                 (ccn,)).fetchone()
+    if row is None:
+      return None
+
+    user = row_to_user(row)
+    if self.read_cache:
+      self._cached_ccns[ccn] = user
+    return user
+
+  def registered_ccns(self, ccns: Iterable[str]) -> set[str]:
+    """Returns which of the given ccns are registered to a user, looking
+    them up a chunk at a time"""
+
+    ccn_list: list[str] = list(set(ccns))
+    registered: set[str] = set()
+    connection: sqlite3.Connection = self._pool.get()
+
+    for start in range(0, len(ccn_list), CCN_CHUNK_SIZE):
+      chunk: list[str] = ccn_list[start:start + CCN_CHUNK_SIZE]
+      placeholders: str = ", ".join("?" * len(chunk))
+      registered.update(row[0] for row in connection.execute(
+        "SELECT credit_card_number FROM users WHERE credit_card_number " \
+        f"IN ({placeholders})", chunk))
+
+    return registered
+
+  def count(self, has_ccn: bool | None = None) -> int:
+    """Returns the number of users matching the ccn filter"""
+
+    connection: sqlite3.Connection = self._pool.get()
+
+    if has_ccn is None:
+      return connection.execute(COUNT_ALL).fetchone()[0]
+
+    return connection.execute(COUNT_FILTERED, (has_ccn,)).fetchone()[0]
+
+  def page(self, has_ccn: bool | None, cursor: int,
+           limit: int) -> tuple[list[User], int | None]:
+    """Returns up to limit users with an id above cursor, along with the id
+    of the last one returned as the next cursor"""
+
+    connection: sqlite3.Connection = self._pool.get()
+
+    # Fetches one extra row to find out if there is a next page
+    if has_ccn is None:
+      rows: list[tuple] = connection.execute(
+        PAGE_ALL, (cursor, limit + 1)).fetchall()
+    else:
+      rows = connection.execute(
+        PAGE_FILTERED, (has_ccn, cursor, limit + 1)).fetchall()
+
+    next_cursor: int | None = rows[limit - 1][0] if len(rows) > limit \
+      else None
+
+    return [row_to_user(row) for row in rows[:limit]], next_cursor
+
+  def table(self) -> UserTable:
+    """Returns a columnar copy of the users table, first copying in rows
+    added since the last call (including by other processes)"""
+
+    with self._table_lock:
+      rows: list[tuple] = self._pool.get().execute(
+        SELECT_AFTER, (self._table_id,)).fetchall()
+      if rows:
+        self._table.extend(row_to_user(row) for row in rows)
+        self._table_id = rows[-1][0]
+
+    return self._table
@@ -0,0 +1,183 @@
+"""
+Name: user_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: In-memory store of registered users with hash indexes for fast
+lookups.
+"""
+
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator
+# Local Imports
+from .base import BaseUserStore, UserConflictError
+from .records import User
+from .columns import UserTable
+from .bloom import BloomFilter
+
+# Number of locks registrations are striped over
+LOCK_STRIPES: int = 64
+
+class UserStore(BaseUserStore):
+  """Holds registered users in registration order, indexed by username and
+  credit card number so duplicate checks and card lookups are O(1)"""
+
+  # Calls only touch memory, taking microseconds
+  blocking: bool = False
+
+  def __init__(self, users: list[User | dict] | None = None,
+               ccn_filter: BloomFilter | None = None) -> None:
+    """Creates an empty store, optionally populated with existing users
+    (given as Users or dicts of their details), and optionally keeping a
+    filter of registered ccns"""
+
+    super().__init__()
+    self.ccn_filter = ccn_filter
+
+    # Users in the order they were registered
+    self._users: list[User] = []
+
+    # Hash indexes over the users list
+    self._by_username: dict[str, User] = {}
+    self._by_ccn: dict[str, User] = {}
+
+    # Partitions of the users list by whether a ccn was registered, kept up
+    # to date on each add so filtered reads don't need to scan
+    self._with_ccn: list[User] = []
+    self._without_ccn: list[User] = []
+
+    # Columns of the users list, for filtering by age and statistics
+    self._table: UserTable = UserTable()
+
+    # Locks taken by registrations, chosen by the hash of each username and
+    # ccn, so only registrations which could clash wait on each other
+    self._stripes: list[threading.Lock] = [threading.Lock()
+                                           for _ in range(LOCK_STRIPES)]
+
+    if users:
+      self.add_many([user if isinstance(user, User) else User.from_dict(user)
+                     for user in users])
+
+  def add_many(self, users: list[User]) -> None:
+    """Adds users to the store and its indexes in one step"""
+
+    with self._locked(users):
+      self._check_conflicts(users)
+
+      for user in users:
+        self._insert(user)
+
+  @contextmanager
+  def _locked(self, users: list[User]) -> Iterator[None]:
+    """Holds the lock stripes covering the users' usernames and ccns, so no
+    other registration can claim them between checking and inserting.
+    Stripes are taken in index order so concurrent batches can't
+    deadlock."""
+
+    stripes: set[int] = {hash(user.username) % LOCK_STRIPES
+                         for user in users}
+    stripes.update(hash(user.credit_card_number) % LOCK_STRIPES
+                   for user in users if user.has_ccn)
+
+    with ExitStack() as stack:
+      for stripe in sorted(stripes):
+        stack.enter_context(self._stripes[stripe])
+      yield
+
+  def _check_conflicts(self, users: list[User]) -> None:
+    """Raises UserConflictError if any of the users clash with each other
+    or with a registered user"""
+
+    usernames: set[str] = set()
+    ccns: set[str] = set()
+
+    for user in users:
+      username: str = user.username
+      if username in usernames or self.has_username(username):
+        raise UserConflictError('username')
+      usernames.add(username)
+
+      if user.has_ccn:
+        ccn: str = user.credit_card_number
+        if ccn in ccns or self.has_ccn(ccn):
+          raise UserConflictError('credit_card_number')
+        ccns.add(ccn)
+
+  def _insert(self, user: User) -> None:
+    """Adds a user to the users list, indexes and partitions"""
+
+    self._users.append(user)
+    self._by_username[user.username] = user
+
+    if user.has_ccn:
+      # Added to the filter first, so it never rules out an indexed ccn
+      if self.ccn_filter is not None:
+        self.ccn_filter.add(user.credit_card_number)
+      self._by_ccn[user.credit_card_number] = user
+      self._with_ccn.append(user)
+    else:
+      self._without_ccn.append(user)
+
+    self._table.append(user)
+
+  def has_username(self, username: str) -> bool:
+    """Checks if a username is already registered"""
+
+    return username in self._by_username
+
+  def has_ccn(self, ccn: str) -> bool:
+    """Checks if a ccn is already registered"""
+
+    return ccn in self._by_ccn
+
+  def get_by_ccn(self, ccn: str) -> User | None:
+    """Returns the user registered with a ccn, or None if there isn't one"""
+
+    return self._by_ccn.get(ccn)
+
+  def registered_ccns(self, ccns: Iterable[str]) -> set[str]:
+    """Returns which of the given ccns are registered to a user"""
+
+    return {ccn for ccn in ccns if ccn in self._by_ccn}
+
+  def table(self) -> UserTable:
+    """Returns the columnar table kept up to date as users are added"""
+
+    return self._table
+
+  def _partition(self, has_ccn: bool | None) -> list[User]:
+    """Returns the list of users matching the ccn filter"""
+
+    if has_ccn is None:
+      return self._users
+
+    return self._with_ccn if has_ccn else self._without_ccn
+
+  def count(self, has_ccn: bool | None = None) -> int:
+    """Returns the number of users matching the ccn filter"""
+
+    return len(self._partition(has_ccn))
+
+  def page(self, has_ccn: bool | None, cursor: int,
+           limit: int) -> tuple[list[User], int | None]:
+    """Returns up to limit users from position cursor of the matching
+    partition, along with the position of the next page"""
+
+    partition: list[User] = self._partition(has_ccn)
+    end: int = cursor + limit
+
+    return partition[cursor:end], end if end < len(partition) else None
+
+  def iter_users(self, has_ccn: bool | None = None,
+                 page_size: int = 500) -> Iterator[User]:
+    """Yields every user matching the ccn filter"""
+
+    partition: list[User] = self._partition(has_ccn)
+
+    # Only users present when iteration started are yielded, as later
+    # registrations are appended to the end of the list
+    for index in range(len(partition)):
+      yield partition[index]
+
+  def __getitem__(self, index: int) -> User:
+    return self._users[index]
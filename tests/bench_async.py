@@ -0,0 +1,143 @@
+"""
+Name: bench_async.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Load test of POST /payments against a store which takes a few
+milliseconds per lookup (as a remote store would), comparing the Flask
+service on a fixed pool of request threads with the asyncio service as
+the number of concurrent clients grows.
+
+The asyncio service is measured as shipped, with a blocking store's calls
+run on a pool of THREADS threads, and again over a store which awaits its
+lookups. No shipped backend awaits, so the last column is the upper bound
+for a future backend with its own async client.
+
+Run from the repository root with: python -m tests.bench_async [requests]
+(2,000 requests per run by default).
+"""
+
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+# Local imports
+import asgi_service
+import registration_payment_service
+from storage import AsyncUserStore, CardVault, UserStore, User
+
+# Time taken by each store lookup
+LATENCY: float = 0.005
+
+# Request threads of the Flask service (the serve command's default)
+THREADS: int = 8
+
+CONCURRENCY: tuple[int, ...] = (8, 32, 128, 512)
+
+PAYMENT: bytes = json.dumps({"credit_card_number": "1234567812345678",
+                             "amount": "100"}).encode()
+
+class SlowUserStore(UserStore):
+  """In-memory store whose ccn lookups block for LATENCY"""
+
+  # Offloaded to threads by AsyncUserStore, as the blocking backends are
+  blocking: bool = True
+
+  def has_ccn(self, ccn: str) -> bool:
+    time.sleep(LATENCY)
+    return super().has_ccn(ccn)
+
+class SlowAsyncUserStore(AsyncUserStore):
+  """Async store whose ccn lookups await for LATENCY, as a store with an
+  async client would (none of the shipped backends do)"""
+
+  async def has_ccn(self, ccn: str) -> bool:
+    await asyncio.sleep(LATENCY)
+    return self.store.has_ccn(ccn)
+
+def make_store(store_type: type, card_vault: CardVault) -> UserStore:
+  """Creates a store holding the card paid with, fingerprinted by the
+  service's card_vault"""
+
+  return store_type([card_vault.protect(
+    User(username="user1", credit_card_number="1234567812345678"))])
+
+def run_sync(requests: int, concurrency: int) -> float:
+  """Sends payments to the Flask service from concurrency clients, served
+  by at most THREADS threads, returning requests per second"""
+
+  flask_app = registration_payment_service.app
+
+  def pay(_) -> int:
+    return flask_app.test_client().post(
+      "/payments", data=PAYMENT, content_type="application/json").status_code
+
+  # Every payment uses the same card, so its rate limits are lifted
+  with patch('registration_payment_service.users',
+             make_store(SlowUserStore,
+                        registration_payment_service.card_vault)), \
+      patch('registration_payment_service.card_limiter', None), \
+      patch('registration_payment_service.ip_limiter', None), \
+      ThreadPoolExecutor(max_workers=min(concurrency, THREADS)) as pool:
+    start: float = time.perf_counter()
+    statuses: list[int] = list(pool.map(pay, range(requests)))
+    seconds: float = time.perf_counter() - start
+
+  assert set(statuses) == {201}
+  return requests / seconds
+
+async def run_async(requests: int, concurrency: int,
+                    native: bool = False) -> float:
+  """Sends payments to the ASGI service from concurrency clients,
+  returning requests per second. Lookups block on one of THREADS threads
+  as with the shipped backends, or are awaited if native."""
+
+  # Sizes the pool for blocking store calls as the app's startup does
+  asyncio.get_running_loop().set_default_executor(
+    ThreadPoolExecutor(max_workers=THREADS))
+
+  limit: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+  statuses: list[int] = []
+
+  async def pay() -> None:
+    async def receive() -> dict:
+      return {"type": "http.request", "body": PAYMENT}
+
+    async def send(message: dict) -> None:
+      if message["type"] == "http.response.start":
+        statuses.append(message["status"])
+
+    async with limit:
+      await asgi_service.app({"type": "http", "method": "POST",
+                              "path": "/payments", "query_string": b""},
+                             receive, send)
+
+  # Every payment uses the same card, so its rate limits are lifted
+  store: AsyncUserStore = \
+    SlowAsyncUserStore(make_store(UserStore, asgi_service.card_vault)) \
+    if native else \
+    AsyncUserStore(make_store(SlowUserStore, asgi_service.card_vault))
+
+  with patch('asgi_service.users', store), \
+      patch('asgi_service.card_limiter', None), \
+      patch('asgi_service.ip_limiter', None):
+    start: float = time.perf_counter()
+    await asyncio.gather(*(pay() for _ in range(requests)))
+    seconds: float = time.perf_counter() - start
+
+  assert set(statuses) == {201}
+  return requests / seconds
+
+if __name__ == "__main__":
+  requests: int = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+  print(f"{'clients':>8}{'flask req/s':>14}{'asyncio req/s':>16}"
+        f"{'native async req/s':>21}")
+  for concurrency in CONCURRENCY:
+    sync_rate: float = run_sync(requests, concurrency)
+    async_rate: float = asyncio.run(run_async(requests, concurrency))
+    native_rate: float = asyncio.run(run_async(requests, concurrency,
+                                               native=True))
+    print(f"{concurrency:>8}{sync_rate:>14,.0f}{async_rate:>16,.0f}"
+          f"{native_rate:>21,.0f}")
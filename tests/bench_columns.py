@@ -0,0 +1,56 @@
+"""
+Name: bench_columns.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Benchmark of filtering users by age and credit card presence
+through the columnar user table, against checking each user in turn.
+
+Run from the repository root with: python -m tests.bench_columns [users]
+(1,000,000 users by default). Uses NumPy if it is installed.
+"""
+
+import sys
+import timeit
+from datetime import date
+# Local imports
+from storage import UserTable, User, dob_days_for_ages
+from storage import columns
+
+TODAY: date = date(2024, 6, 1)
+
+def make_user(index: int) -> User:
+  """Returns a registered user born in 1950-2005, giving every other user
+  a ccn"""
+
+  return User(username=f"user{index}",
+              dob=f"{1950 + index % 56}-{index % 12 + 1:02d}-01",
+              credit_card_number=f"{index:016d}" if index % 2 else None)
+
+def select_each(users: list[User], first_day: int,
+                last_day: int) -> list[User]:
+  """Filters users by checking the ccn and date of birth of each one"""
+
+  return [user for user in users if user.has_ccn and
+          first_day <= date.fromisoformat(user.dob).toordinal() <= last_day]
+
+def bench(label: str, statement) -> float:
+  """Times a statement, printing and returning the seconds taken"""
+
+  seconds: float = min(timeit.repeat(statement, number=1, repeat=3))
+  print(f"{label:<28}{seconds * 1000:10,.1f} ms")
+  return seconds
+
+if __name__ == "__main__":
+  user_count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+  users: list[User] = [make_user(index) for index in range(user_count)]
+  table: UserTable = UserTable()
+  table.extend(users)
+  first_day, last_day = dob_days_for_ages(min_age=25, max_age=40,
+                                          today=TODAY)
+
+  before: float = bench("per user (before)",
+                        lambda: select_each(users, first_day, last_day))
+  after: float = bench("columnar (after)", lambda: table.select(
+    has_ccn=True, first_day=first_day, last_day=last_day))
+  print(f"Speedup: {before / after:.2f}x " \
+        f"({'NumPy' if columns.numpy else 'array'} columns)")
@@ -0,0 +1,63 @@
+"""
+Name: bench_json.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Benchmark of the app's JSON provider against Flask's default
+provider (the standard library's json), encoding a page of users and an
+error body and decoding a payment body.
+
+Run from the repository root with: python -m tests.bench_json
+"""
+
+import timeit
+from flask.json.provider import DefaultJSONProvider
+# Local imports
+from registration_payment_service import app
+from utils import FastJSONProvider, error_body
+from utils.fast_json import BACKEND
+
+ITERATIONS: int = 2000
+
+# A page of users as GET /users returns them
+PAGE: dict = {"users": [{"username": f"user{number}",
+                         "email": "user@example.com",
+                         "dob": "2000-01-01",
+                         "credit_card_number": "************5678"}
+                        for number in range(100)],
+              "next_cursor": "100"}
+
+PAYMENT: bytes = b'{"credit_card_number": "1234567812345678", ' \
+  b'"amount": "100"}'
+
+ERROR: dict = {"error": "Username already taken."}
+
+def bench(label: str, statement) -> float:
+  """Times a statement, printing and returning calls per second"""
+
+  seconds: float = min(timeit.repeat(statement, number=ITERATIONS, repeat=3))
+  per_second: float = ITERATIONS / seconds
+  print(f"{label:<32}{per_second:12,.0f} calls/s")
+  return per_second
+
+if __name__ == "__main__":
+  default: DefaultJSONProvider = DefaultJSONProvider(app)
+  fast: FastJSONProvider = FastJSONProvider(app)
+  print(f"Fast provider backend: {BACKEND}\n")
+
+  with app.app_context():
+    before: float = bench("encode page (default)",
+                          lambda: default.dumps(PAGE).encode())
+    after: float = bench("encode page (fast)",
+                         lambda: fast.dumps(PAGE).encode())
+    print(f"Speedup: {after / before:.2f}x\n")
+
+    before = bench("decode payment (default)",
+                   lambda: default.loads(PAYMENT))
+    after = bench("decode payment (fast)", lambda: fast.loads(PAYMENT))
+    print(f"Speedup: {after / before:.2f}x\n")
+
+    before = bench("encode error (default)",
+                   lambda: default.dumps(ERROR).encode())
+    after = bench("encode error (pre-encoded)",
+                  lambda: error_body(ERROR["error"]))
+    print(f"Speedup: {after / before:.2f}x")
@@ -0,0 +1,52 @@
+"""
+Name: bench_memory.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Benchmark of the memory taken to hold registered users, comparing
+slotted User records against the dicts users used to be stored as.
+
+Run from the repository root with: python -m tests.bench_memory [users]
+(100,000 users by default).
+"""
+
+import sys
+import tracemalloc
+# Local imports
+from storage import User
+
+def make_details(index: int) -> dict:
+  """Returns the details of a user, giving every other user a ccn"""
+
+  details: dict = {
+    "username": f"user{index}",
+    "password": "Pass1234",
+    "email": f"user{index}@example.com",
+    "dob": "2000-01-01"
+  }
+  if index % 2:
+    details["credit_card_number"] = f"{index:016d}"
+  return details
+
+def measure(label: str, user_count: int, as_record: bool) -> int:
+  """Builds the users and prints and returns the bytes they take, leaving
+  out the strings shared by both layouts"""
+
+  details: list[dict] = [make_details(index) for index in range(user_count)]
+
+  tracemalloc.start()
+  if as_record:
+    users: list = [User.from_dict(user) for user in details]
+  else:
+    # Copies each dict, as the store used to hold a dict per user
+    users = [dict(user) for user in details]
+  size: int = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  print(f"{label:<16}{size / user_count:8,.0f} bytes/user")
+  return size
+
+if __name__ == "__main__":
+  user_count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  before: int = measure("dict (before)", user_count, as_record=False)
+  after: int = measure("User (after)", user_count, as_record=True)
+  print(f"Reduction: {1 - after / before:.0%}")
@@ -0,0 +1,73 @@
+"""
+Name: bench_passwords.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Load test of POST /users with passwords hashed at the configured
+work factors, on the request threads and on pools of hashing processes,
+reporting registrations per second overall and per core used.
+
+Run from the repository root with: python -m tests.bench_passwords
+[registrations] (200 per run by default).
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+# Local imports
+import config
+import registration_payment_service
+from storage import UserStore
+from utils import PasswordHasher, create_password_hasher
+
+# Request threads of the Flask service (the serve command's default)
+THREADS: int = 8
+
+CORES: int = os.cpu_count() or 1
+
+def run(registrations: int, workers: int) -> float:
+  """Registers users from THREADS clients with passwords hashed by workers
+  processes (0 for the request threads), returning registrations per
+  second"""
+
+  flask_app = registration_payment_service.app
+
+  def register(number: int) -> int:
+    return flask_app.test_client().post("/users", json={
+      "username": f"user{number}",
+      "password": "Pass1234",
+      "email": "user@example.com",
+      "dob": "2000-01-01"
+    }).status_code
+
+  with patch.object(config, "PASSWORD_HASH_WORKERS", workers):
+    hasher: PasswordHasher = create_password_hasher(config)
+
+  # Starts the pool before timing
+  hasher.hash_many(["Pass1234"] * workers)
+
+  try:
+    with patch('registration_payment_service.users', UserStore()), \
+        patch('registration_payment_service.password_hasher', hasher), \
+        ThreadPoolExecutor(max_workers=THREADS) as pool:
+      start: float = time.perf_counter()
+      statuses: list[int] = list(pool.map(register, range(registrations)))
+      seconds: float = time.perf_counter() - start
+  finally:
+    hasher.close()
+
+  assert set(statuses) == {201}
+  return registrations / seconds
+
+if __name__ == "__main__":
+  registrations: int = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+  print(f"{config.PASSWORD_HASH_ALGORITHM} (n={config.PASSWORD_SCRYPT_N}, " \
+        f"r={config.PASSWORD_SCRYPT_R}, p={config.PASSWORD_SCRYPT_P}) " \
+        f"on {CORES} cores")
+  print(f"{'workers':>8}{'reg/s':>10}{'reg/s/core':>12}")
+  for workers in sorted({0, 1, max(CORES // 2, 1), CORES}):
+    rate: float = run(registrations, workers)
+    cores_used: int = min(max(workers, 1), CORES)
+    print(f"{workers:>8}{rate:>10,.1f}{rate / cores_used:>12,.1f}")
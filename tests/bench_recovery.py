@@ -0,0 +1,51 @@
+"""
+Name: bench_recovery.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Benchmark of how long the journal backend takes to recover its
+users on startup, from a snapshot plus a journal tail.
+
+Run from the repository root with: python -m tests.bench_recovery [users]
+(1,000,000 users by default).
+"""
+
+import sys
+import tempfile
+import time
+# Local imports
+from storage import JournaledUserStore, User
+
+# Share of users left in the journal rather than the snapshot
+JOURNAL_SHARE: float = 0.01
+
+def make_user(index: int) -> User:
+  """Returns a registered user, giving every other user a ccn"""
+
+  return User(username=f"user{index}", password="Pass1234",
+              email=f"user{index}@example.com", dob="2000-01-01",
+              credit_card_number=f"{index:016d}" if index % 2 else None)
+
+if __name__ == "__main__":
+  user_count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+  journal_count: int = int(user_count * JOURNAL_SHARE)
+
+  with tempfile.TemporaryDirectory() as directory:
+    # Writes the snapshot, then journals the rest of the users
+    store: JournaledUserStore = JournaledUserStore(
+      directory=directory, snapshot_every=user_count + 1)
+    store.add_many([make_user(index)
+                    for index in range(user_count - journal_count)])
+    store.snapshot()
+    for index in range(user_count - journal_count, user_count):
+      store.add(make_user(index))
+    store.close()
+
+    start: float = time.perf_counter()
+    store = JournaledUserStore(directory=directory,
+                               snapshot_every=user_count + 1)
+    seconds: float = time.perf_counter() - start
+    store.close()
+
+  print(f"Recovered {len(store):,} users ({journal_count:,} from the " \
+        f"journal) in {seconds:.2f}s")
+  print(f"{len(store) / seconds:,.0f} users/s")
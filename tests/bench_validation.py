@@ -0,0 +1,68 @@
+"""
+Name: bench_validation.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Microbenchmark of the registration checks, comparing returning
+ValidationResults against allocating a Response per check as the checks
+used to.
+
+Run from the repository root with: python -m tests.bench_validation
+"""
+
+import timeit
+from flask import Response
+# Local imports
+from registration_payment_service import check_registration
+from storage import UserStore
+from utils import check_input_present, check_username, check_password, \
+  check_email, check_dob, check_number
+
+ITERATIONS: int = 20000
+
+USER_INPUT: dict = {
+  "username": "user123",
+  "password": "Pass1234",
+  "email": "user@example.com",
+  "dob": "2000-01-01",
+  "credit_card_number": "1234567891234567"
+}
+
+EXISTING_USERS: UserStore = UserStore()
+
+def check_registration_with_responses(user_input: dict) -> Response:
+  """Runs the same checks, but wraps each outcome in a Response and reads
+  its status code as register() did before ValidationResults"""
+
+  checks = (
+    lambda: check_input_present(user_input=user_input.copy(),
+      expected=["username", "password", "email", "dob"]),
+    lambda: check_username(username=user_input["username"],
+                           existing_users=EXISTING_USERS),
+    lambda: check_password(password=user_input["password"]),
+    lambda: check_email(email=user_input["email"]),
+    lambda: check_dob(dob=user_input["dob"]),
+    lambda: check_number(num=user_input["credit_card_number"], digits=16)
+  )
+
+  for check in checks:
+    response: Response = Response(status=check().status_code)
+    if response.status_code != 200:
+      return response
+
+  return Response(status=200)
+
+def bench(label: str, statement) -> float:
+  """Times a statement, printing and returning microseconds per call"""
+
+  seconds: float = min(timeit.repeat(statement, number=ITERATIONS, repeat=3))
+  per_call: float = seconds / ITERATIONS * 1e6
+  print(f"{label:<28}{per_call:8.2f} us/registration")
+  return per_call
+
+if __name__ == "__main__":
+  before: float = bench("Response per check",
+    lambda: check_registration_with_responses(USER_INPUT))
+  after: float = bench("ValidationResult",
+    lambda: check_registration(user_input=USER_INPUT,
+                               existing_users=EXISTING_USERS))
+  print(f"Reduction: {(1 - after / before) * 100:.1f}%")
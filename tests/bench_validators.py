@@ -0,0 +1,52 @@
+"""
+Name: bench_validators.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Benchmark of check_email() and check_dob(), comparing the
+precompiled email regex and cached age cutoff of the validator registry
+against rebuilding them on every call as the checks used to.
+
+Run from the repository root with: python -m tests.bench_validators
+"""
+
+import re
+import timeit
+from datetime import datetime, date
+from dateutil.relativedelta import relativedelta
+# Local imports
+from utils import check_email, check_dob
+
+ITERATIONS: int = 50000
+
+EMAIL: str = "user@example.com"
+DOB: str = "2000-01-01"
+
+def check_email_uncompiled(email: str) -> bool:
+  """Checks an email by passing the raw pattern to re.match"""
+
+  regex_email = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+  return re.match(regex_email, email) is not None
+
+def check_dob_uncached(dob: str) -> bool:
+  """Checks a DoB by recalculating the age cutoff"""
+
+  dob_obj: date = datetime.strptime(dob, "%Y-%m-%d").date()
+  return dob_obj <= date.today() - relativedelta(years=18)
+
+def bench(label: str, statement) -> float:
+  """Times a statement, printing and returning calls per second"""
+
+  seconds: float = min(timeit.repeat(statement, number=ITERATIONS, repeat=3))
+  per_second: float = ITERATIONS / seconds
+  print(f"{label:<28}{per_second:12,.0f} validations/s")
+  return per_second
+
+if __name__ == "__main__":
+  before: float = bench("check_email (before)",
+                        lambda: check_email_uncompiled(EMAIL))
+  after: float = bench("check_email (after)", lambda: check_email(EMAIL))
+  print(f"Speedup: {after / before:.2f}x\n")
+
+  before = bench("check_dob (before)", lambda: check_dob_uncached(DOB))
+  after = bench("check_dob (after)", lambda: check_dob(DOB))
+  print(f"Speedup: {after / before:.2f}x")
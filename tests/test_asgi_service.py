@@ -0,0 +1,195 @@
+"""
+Name: test_asgi_service.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the asyncio version of the service in asgi_service.py.
+"""
+
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+# Local imports
+from asgi_service import app, card_vault
+from storage import AsyncUserStore, UserStore
+from utils import TokenBucketLimiter
+
+def call(method: str, path: str, body: object = None, query: str = "",
+         client: str | None = None) -> tuple[int, dict, bytes]:
+  """Sends a request to the ASGI app, returning the response's status,
+  headers and body"""
+
+  encoded: bytes = json.dumps(body).encode() if body is not None else b""
+  sent: list[dict] = []
+
+  async def receive() -> dict:
+    return {"type": "http.request", "body": encoded, "more_body": False}
+
+  async def send(message: dict) -> None:
+    sent.append(message)
+
+  scope: dict = {"type": "http", "method": method, "path": path,
+                 "query_string": query.encode()}
+  if client is not None:
+    scope["client"] = (client, 50000)
+  asyncio.run(app(scope, receive, send))
+
+  return sent[0]["status"], dict(sent[0]["headers"]), \
+    b"".join(message.get("body", b"") for message in sent[1:])
+
+class AsgiServiceTest(unittest.TestCase):
+  """Tests the routes of the ASGI app"""
+
+  def setUp(self):
+    """Set up mock data, along with a valid user and payment"""
+
+    self.users = [
+      {"username": "user1", "credit_card_number": "1234567812345678"},
+      {"username": "user2"},
+      {"username": "user3", "credit_card_number": "8765432187654321"}
+    ]
+    # Users as returned in responses, with ccns masked
+    self.responses = [
+      {"username": "user1", "credit_card_number": "************5678"},
+      {"username": "user2"},
+      {"username": "user3", "credit_card_number": "************4321"}
+    ]
+    self.new_user: dict = {"username": "user4", "password": "Pass1234",
+                           "email": "user@example.com", "dob": "2000-01-01"}
+    self.patches = [
+      patch('asgi_service.users',
+            AsyncUserStore(UserStore(
+              [card_vault.protect(user) for user in self.users]))),
+      patch('asgi_service.card_limiter',
+            TokenBucketLimiter(rate=1, burst=5, capacity=100))
+    ]
+    for mock in self.patches:
+      mock.start()
+
+  def tearDown(self):
+    """Restores the app's store and card rate limiter"""
+
+    for mock in self.patches:
+      mock.stop()
+
+  ## register() Tests ##
+
+  def test_register(self):
+    """Tests registering a valid user"""
+
+    status, _, body = call("POST", "/users", self.new_user)
+
+    self.assertEqual(status, 201)
+    # The password is never returned
+    expected: dict = self.new_user.copy()
+    expected.pop('password')
+    self.assertEqual(json.loads(body)['user'], expected)
+
+  def test_register_username_taken(self):
+    """Tests registering a username which is already registered"""
+
+    status, _, body = call("POST", "/users",
+                           {**self.new_user, "username": "user1"})
+
+    self.assertEqual(status, 409)
+    self.assertEqual(json.loads(body)['error'], "Username already taken.")
+
+  def test_register_invalid_json(self):
+    """Tests registering with a body which isn't a JSON object"""
+
+    status, _, _ = call("POST", "/users", [self.new_user])
+    self.assertEqual(status, 400)
+
+  ## get_users() Tests ##
+
+  def test_get_users_streamed(self):
+    """Tests every user is streamed as a JSON array"""
+
+    status, headers, body = call("GET", "/users")
+
+    self.assertEqual(status, 200)
+    self.assertNotIn(b"content-length", headers)
+    self.assertEqual(json.loads(body), self.responses)
+
+  def test_get_users_paginated_cc_filter(self):
+    """Tests paginating users filtered by cc presence"""
+
+    status, _, body = call("GET", "/users",
+                           query="CreditCard=Yes&limit=1&cursor=1")
+
+    self.assertEqual(status, 200)
+    self.assertEqual(json.loads(body),
+                     {"users": [self.responses[2]], "next_cursor": None})
+
+  def test_get_users_no_users(self):
+    """Tests no matching users returns 204 No Content"""
+
+    with patch('asgi_service.users', AsyncUserStore(UserStore())):
+      status, _, body = call("GET", "/users")
+
+    self.assertEqual(status, 204)
+    self.assertEqual(body, b"")
+
+  ## make_payment() Tests ##
+
+  def test_make_payment(self):
+    """Tests a payment with a registered ccn"""
+
+    status, _, body = call("POST", "/payments",
+                           {"credit_card_number": "1234567812345678",
+                            "amount": "100"})
+
+    self.assertEqual(status, 201)
+    self.assertEqual(json.loads(body)['message'], "Payment of 100 made.")
+
+  def test_make_payment_unregistered(self):
+    """Tests a payment with a ccn not registered to any user"""
+
+    status, _, _ = call("POST", "/payments",
+                        {"credit_card_number": "1111222233334444",
+                         "amount": "100"})
+    self.assertEqual(status, 404)
+
+  def test_make_payment_card_rate_limited(self):
+    """Tests payments with one card beyond its burst are turned away with
+    the seconds to wait"""
+
+    payment: dict = {"credit_card_number": "1234567812345678",
+                     "amount": "100"}
+    statuses: list[int] = [call("POST", "/payments", payment)[0]
+                           for _ in range(5)]
+    self.assertEqual(statuses, [201] * 5)
+
+    status, headers, body = call("POST", "/payments", payment)
+    self.assertEqual(status, 429)
+    self.assertEqual(headers[b"retry-after"], b"1")
+    self.assertEqual(json.loads(body)['error'],
+                     "Too many payment attempts, try again later.")
+
+  def test_make_payment_ip_rate_limited(self):
+    """Tests payments from one client beyond its burst are turned away"""
+
+    payment: dict = {"credit_card_number": "1111222233334444",
+                     "amount": "100"}
+    with patch('asgi_service.ip_limiter',
+               TokenBucketLimiter(rate=1, burst=2, capacity=100)):
+      statuses: list[int] = [
+        call("POST", "/payments", payment, client="10.0.0.1")[0]
+        for _ in range(3)]
+      self.assertEqual(statuses, [404, 404, 429])
+
+      # Other clients have their own limit
+      self.assertEqual(
+        call("POST", "/payments", payment, client="10.0.0.2")[0], 404)
+
+  ## Routing Tests ##
+
+  def test_unknown_route(self):
+    """Tests unknown paths and methods"""
+
+    self.assertEqual(call("GET", "/unknown")[0], 404)
+    self.assertEqual(call("DELETE", "/users")[0], 405)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,70 @@
+"""
+Name: test_async_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the async store interface in async_store.py.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+# Local imports
+from storage import AsyncUserStore, JournaledUserStore, SQLiteUserStore, \
+  SharedIndexUserStore, SharedUserIndex, UserConflictError, UserStore, User
+
+class AsyncUserStoreTest(unittest.TestCase):
+  """Tests the AsyncUserStore class"""
+
+  def setUp(self):
+    """Sets up a user to register"""
+
+    self.user: User = User(username="user1", password="Pass1234",
+                           email="user@example.com", dob="2000-01-01",
+                           credit_card_number="1234567812345678")
+
+  def test_memory_store_inline(self):
+    """Tests in-memory stores are called inline rather than on a thread"""
+
+    self.assertFalse(AsyncUserStore(UserStore()).offload)
+
+  def test_blocking_memory_stores_offloaded(self):
+    """Tests in-memory stores which write files or take a cross-process lock
+    when adding users are called on threads"""
+
+    with tempfile.TemporaryDirectory() as directory:
+      journaled: JournaledUserStore = JournaledUserStore(
+        directory=os.path.join(directory, "journal"))
+      self.assertTrue(AsyncUserStore(journaled).offload)
+      journaled.close()
+
+      path: str = os.path.join(directory, "users.index")
+      SharedUserIndex.create(path, capacity=64)
+      index: SharedUserIndex = SharedUserIndex(path)
+      self.assertTrue(AsyncUserStore(SharedIndexUserStore(index)).offload)
+      index.close()
+
+  def test_sqlite_store_offloaded(self):
+    """Tests awaiting an SQLite store, whose calls run on threads"""
+
+    with tempfile.TemporaryDirectory() as directory:
+      sqlite_store: SQLiteUserStore = SQLiteUserStore(
+        path=os.path.join(directory, "users.db"))
+      store: AsyncUserStore = AsyncUserStore(sqlite_store)
+      self.assertTrue(store.offload)
+
+      async def register_and_read() -> None:
+        await store.add(self.user)
+        self.assertTrue(await store.has_username("user1"))
+        self.assertEqual(await store.get_by_ccn("1234567812345678"),
+                         self.user)
+        self.assertEqual(await store.count(has_ccn=False), 0)
+        with self.assertRaises(UserConflictError):
+          await store.add(self.user)
+
+      asyncio.run(register_and_read())
+      sqlite_store.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
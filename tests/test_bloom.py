@@ -0,0 +1,65 @@
+"""
+Name: test_bloom.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the Bloom filter of registered ccns in bloom.py, and its use
+by the in-memory store.
+"""
+
+import unittest
+# Local imports
+from storage import BloomFilter, User, UserStore
+
+class BloomFilterTest(unittest.TestCase):
+  """Tests the BloomFilter class"""
+
+  def setUp(self):
+    """Sets up a filter sized for 1000 ccns, holding 1000 of them"""
+
+    self.bloom: BloomFilter = BloomFilter(capacity=1000, error_rate=0.01)
+    self.added: list[str] = [f"{number:016d}" for number in range(1000)]
+    for ccn in self.added:
+      self.bloom.add(ccn)
+
+  def test_sizing(self):
+    """Tests the filter is given about 9.6 bits and 7 hashes per item for
+    a 1% false positive rate"""
+
+    self.assertEqual(self.bloom.size, 9586)
+    self.assertEqual(self.bloom.hashes, 7)
+    self.assertAlmostEqual(self.bloom.false_positive_rate(), 0.01,
+                           places=3)
+
+  def test_no_false_negatives(self):
+    """Tests every added ccn is reported as possibly present"""
+
+    for ccn in self.added:
+      self.assertIn(ccn, self.bloom)
+
+  def test_false_positive_rate(self):
+    """Tests ccns which weren't added are mostly reported as absent, near
+    the expected rate"""
+
+    absent: list[str] = [f"{number:016d}" for number in range(1000, 11000)]
+    false_positives: int = sum(ccn in self.bloom for ccn in absent)
+
+    self.assertLess(false_positives / len(absent), 0.03)
+    self.assertEqual(self.bloom.stats()['definite_misses'],
+                     len(absent) - false_positives)
+
+  def test_store_filter(self):
+    """Tests a store's filter tracks the ccns of users added to it, and
+    that a store without one can't rule any ccn out"""
+
+    store: UserStore = UserStore(ccn_filter=BloomFilter(capacity=100))
+    store.add(User(username="user123", password="Pass1234",
+                   email="user@example.com", dob="2000-01-01",
+                   credit_card_number="1234567891234567"))
+
+    self.assertTrue(store.may_have_ccn("1234567891234567"))
+    self.assertFalse(store.may_have_ccn("1234567891234568"))
+    self.assertTrue(UserStore().may_have_ccn("1234567891234568"))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,83 @@
+"""
+Name: test_card_vault.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the card vault in card_vault.py.
+"""
+
+import os
+import tempfile
+import unittest
+# Local imports
+from storage import CardVault, User, load_key
+
+class CardVaultTest(unittest.TestCase):
+  """Tests the CardVault class and load_key()"""
+
+  def setUp(self):
+    """Sets up a vault with a fixed key"""
+
+    self.vault: CardVault = CardVault(key=b"k" * 32)
+
+  ## Fingerprint and mask tests ##
+
+  def test_fingerprint(self):
+    """Tests a ccn always gets the same fingerprint under a key, and a
+    different one under another key"""
+
+    fingerprint: str = self.vault.fingerprint("1234567812345678")
+
+    self.assertEqual(len(fingerprint), 32)
+    self.assertNotIn("1234567812345678", fingerprint)
+    self.assertEqual(self.vault.fingerprint("1234567812345678"), fingerprint)
+    self.assertNotEqual(self.vault.fingerprint("1234567812345679"),
+                        fingerprint)
+    self.assertNotEqual(
+      CardVault(key=b"j" * 32).fingerprint("1234567812345678"), fingerprint)
+
+  def test_mask(self):
+    """Tests all but the last four digits are masked"""
+
+    self.assertEqual(CardVault.mask("1234567812345678"), "************5678")
+
+  def test_protect(self):
+    """Tests a user's ccn is replaced by its fingerprint and mask, leaving
+    the given user as it was"""
+
+    user: User = User(username="user1",
+                      credit_card_number="1234567812345678")
+    protected: User = self.vault.protect(user)
+
+    self.assertEqual(protected.credit_card_number,
+                     self.vault.fingerprint("1234567812345678"))
+    self.assertEqual(protected.card_mask, "************5678")
+    self.assertEqual(protected.to_response(),
+                     {"username": "user1",
+                      "credit_card_number": "************5678"})
+    self.assertEqual(user.credit_card_number, "1234567812345678")
+
+  def test_protect_without_ccn(self):
+    """Tests a user without a ccn is left without one"""
+
+    protected: User = self.vault.protect({"username": "user1"})
+
+    self.assertFalse(protected.has_ccn)
+    self.assertIsNone(protected.card_mask)
+
+
+  ## load_key() tests ##
+
+  def test_load_key(self):
+    """Tests a key is created on first use and read back afterwards"""
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+      path: str = os.path.join(temp_dir, "card_vault.key")
+
+      key: bytes = load_key(path)
+      self.assertEqual(len(key), 32)
+      self.assertEqual(load_key(path), key)
+      self.assertEqual(os.listdir(temp_dir), ["card_vault.key"])
+
+
+if __name__ == "__main__":
+  unittest.main()
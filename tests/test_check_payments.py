@@ -10,6 +10,7 @@ from flask import Response
 import json
 # Local imports
 from utils import check_ccn_registered
+from storage import UserStore
 
 class CheckPaymentsTest(unittest.TestCase):
   """Tests the check functions in check_payments.py"""
@@ -40,7 +41,7 @@ class CheckPaymentsTest(unittest.TestCase):
     # matching ccn
     response: Response = check_ccn_registered(
       ccn=self.valid_data['credit_card_number'],
-      users=self.existing_users,
+      users=UserStore(self.existing_users),
       amount=self.valid_data['amount'])
     
     # Checks the response is 200 OK
@@ -57,7 +58,7 @@ class CheckPaymentsTest(unittest.TestCase):
     # matching ccn
     response: Response = check_ccn_registered(
       ccn=self.valid_data['credit_card_number'],
-      users=new_existing_users,
+      users=UserStore(new_existing_users),
       amount=self.valid_data['amount'])
     
     # Checks the response is as expected
@@ -6,12 +6,13 @@ Purpose: Tests the checking functions in check_user_input.py.
 """
 
 import unittest
+from unittest.mock import patch
 from datetime import date
-from flask import Response
-import json
 # Local imports
 from utils import check_username, check_password, check_email, check_dob, \
-  check_number, check_input_present
+  check_number, check_input_present, check_page_params, check_age_params, \
+  ValidationResult, ValidatorRegistry
+from storage import UserStore
 
 class CheckInputsTest(unittest.TestCase):
   """Tests the check functions in check_user_input.py"""
@@ -38,11 +39,11 @@ class CheckInputsTest(unittest.TestCase):
     set"""
 
     # Passes valid data and expected arguments
-    response: Response = check_input_present(user_input=self.valid_data,
-      expected=self.expected)
+    result: ValidationResult = check_input_present(
+      user_input=self.valid_data, expected=self.expected)
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_input_present_valid_ccn_absent(self):
     """Tests checking all input arguments are present with a valid set
@@ -53,11 +54,11 @@ class CheckInputsTest(unittest.TestCase):
     valid_data_copy.pop('credit_card_number')
 
     # Passes valid data and expected arguments
-    response: Response = check_input_present(user_input=valid_data_copy,
-      expected=self.expected)
+    result: ValidationResult = check_input_present(
+      user_input=valid_data_copy, expected=self.expected)
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_input_present_invalid_absent(self):
     """Tests checking all input arguments are present with a valid set
@@ -68,13 +69,13 @@ class CheckInputsTest(unittest.TestCase):
     invalid_data.pop('email')
 
     # Passes invalid data and expected arguments
-    response: Response = check_input_present(user_input=invalid_data,
-      expected=self.expected)
+    result: ValidationResult = check_input_present(
+      user_input=invalid_data, expected=self.expected)
     
-    # Checks the response is 400 Bad Request and the error message is
+    # Checks the result is 400 Bad Request and the error message is
     # correct.
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                      "email must be provided.")
     
 
@@ -84,11 +85,11 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking of valid username"""
 
     # Passes valid data and empty list of existing users
-    response: Response = check_username(username=self.valid_data['username'],
-                                        existing_users=[])
+    result: ValidationResult = check_username(
+      username=self.valid_data['username'], existing_users=UserStore())
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_username_valid_existing_users_populated(self):
     """Tests checking of valid username"""
@@ -97,35 +98,36 @@ class CheckInputsTest(unittest.TestCase):
     valid_data_copy['username'] = "user456"
 
     # Passes valid data and empty list of existing users
-    response: Response = check_username(username=self.valid_data['username'],
-                                        existing_users=[valid_data_copy])
+    result: ValidationResult = check_username(
+      username=self.valid_data['username'],
+      existing_users=UserStore([valid_data_copy]))
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_username_invalid_non_alphanumeric(self):
     """Tests checking an invalid username with non alphanumeric
     characters in it."""
 
     # Passes valid data and empty list of existing users
-    response: Response = check_username(username='user123?',
-                                        existing_users=[])
+    result: ValidationResult = check_username(
+      username='user123?', existing_users=UserStore())
     
-    # Checks the response is as expected
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                      "Username must contain only letters and numbers.")
 
   def test_check_username_invalid_space(self):
     """Tests checking an invalid username with a space in it."""
 
     # Passes valid data and empty list of existing users
-    response: Response = check_username(username='user 123',
-                                        existing_users=[])
+    result: ValidationResult = check_username(
+      username='user 123', existing_users=UserStore())
     
-    # Checks the response is as expected
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                      "Username cannot contain spaces.")
 
   def test_check_username_invalid_taken(self):
@@ -133,12 +135,13 @@ class CheckInputsTest(unittest.TestCase):
     another user"""
 
     # Passes valid data and empty list of existing users
-    response: Response = check_username(username=self.valid_data['username'],
-                                        existing_users=[self.valid_data])
+    result: ValidationResult = check_username(
+      username=self.valid_data['username'],
+      existing_users=UserStore([self.valid_data]))
     
-    # Checks the response is as expected
-    self.assertEqual(response.status_code, 409)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    self.assertEqual(result.status_code, 409)
+    self.assertEqual(result.error, 
                     "Username already taken.")
     
     
@@ -148,28 +151,29 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking a valid password"""
 
     # Passes valid password
-    response: Response = check_password(password=self.valid_data['password'])
+    result: ValidationResult = check_password(
+      password=self.valid_data['password'])
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_password_invalid_length(self):
     """Tests checking an invalid password that is too short"""
 
-    # Checks the response is as expected
-    response: Response = check_password(password="Pass123")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    result: ValidationResult = check_password(password="Pass123")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                     "Password must contain a minimum of 8 characters.")
 
   def test_check_password_invalid_upper(self):
     """Tests checking an invalid password that doesn't contain an upper
     case character."""
 
-    # Checks the response is as expected
-    response: Response = check_password(password="pass1234")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'],
+    # Checks the result is as expected
+    result: ValidationResult = check_password(password="pass1234")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
                      "Password must contain at least one of both uppercase " \
                      "characters and numbers.")
 
@@ -177,10 +181,10 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking an invalid password that doesn't contain a
     number."""
 
-    # Checks the response is as expected
-    response: Response = check_password(password="Password")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'],
+    # Checks the result is as expected
+    result: ValidationResult = check_password(password="Password")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
                      "Password must contain at least one of both uppercase " \
                      "characters and numbers.")
 
@@ -191,28 +195,28 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking a valid email"""
 
     # Passes valid email
-    response: Response = check_email(email=self.valid_data['email'])
+    result: ValidationResult = check_email(email=self.valid_data['email'])
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_email_invalid_nodomain(self):
     """Tests an invalid email that is not a valid domain"""
 
-    # Checks the response is as expected
-    response: Response = check_email(email="user@example")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'],
+    # Checks the result is as expected
+    result: ValidationResult = check_email(email="user@example")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
                      "Email must be in correct email format. e.g. "\
                      "user@example.com")
 
   def test_check_email_invalid_noat(self):
     """Tests an invalid password that doesn't contain an @ symbol"""
 
-    # Checks the response is as expected
-    response: Response = check_email(email="user.example.com")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'],
+    # Checks the result is as expected
+    result: ValidationResult = check_email(email="user.example.com")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
                      "Email must be in correct email format. e.g. "\
                      "user@example.com")
 
@@ -223,37 +227,37 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking a valid dob"""
 
     # Passes valid DoB
-    response: Response = check_dob(dob=self.valid_data['dob'])
+    result: ValidationResult = check_dob(dob=self.valid_data['dob'])
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_invalid_dob_format(self):
     """Tests checking an invalid DoB that is not in the ISO 8601 format"""
 
-    # Checks the response is as expected
-    response: Response = check_dob(dob="01-01-2020")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    result: ValidationResult = check_dob(dob="01-01-2020")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                     "Date of Birth must be in format: YYYY-MM-DD")
 
   def test_invalid_dob_nodate(self):
     """Tests checking an invalid DoB that is not a date"""
 
-    # Checks the response is as expected
-    response: Response = check_dob(dob="2001")
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    result: ValidationResult = check_dob(dob="2001")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                     "Date of Birth must be in format: YYYY-MM-DD")
 
   def test_invalid_dob_age(self):
     """Tests checking a DoB that would mean the user is under 18"""
 
-    # Checks the response is as expected
+    # Checks the result is as expected
     # Sets DoB to today's date
-    response: Response = check_dob(dob=date.today().strftime("%Y-%m-%d"))
-    self.assertEqual(response.status_code, 403)
-    self.assertEqual(json.loads(response.data)['error'], 
+    result: ValidationResult = check_dob(dob=date.today().strftime("%Y-%m-%d"))
+    self.assertEqual(result.status_code, 403)
+    self.assertEqual(result.error, 
                     "User must be at least 18 years old")
 
 
@@ -263,23 +267,20 @@ class CheckInputsTest(unittest.TestCase):
     """Tests checking a valid number"""
 
     # Passes valid ccn and number of digits in it
-    response: Response = check_number(
-      num=self.valid_data['credit_card_number'],
-      digits=16)
+    result: ValidationResult = check_number(
+      num=self.valid_data['credit_card_number'], digits=16)
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_number_valid_other(self):
     """Tests checking a valid number"""
 
     # Passes valid number and number of digits in it
-    response: Response = check_number(
-      num="12345",
-      digits=5)
+    result: ValidationResult = check_number(num="12345", digits=5)
     
-    # Checks the response is 200 OK
-    self.assertEqual(response.status_code, 200)
+    # Checks the result is 200 OK
+    self.assertEqual(result.status_code, 200)
 
   def test_check_number_invalid_length(self):
     """Tests an invalid number which is not the number of digits passed"""
@@ -288,13 +289,11 @@ class CheckInputsTest(unittest.TestCase):
     invalid_data['credit_card_number'] = "123456789123456"
 
     # Passes valid number and number of digits in it
-    response: Response = check_number(
-      num="1234",
-      digits=5)
+    result: ValidationResult = check_number(num="1234", digits=5)
 
-    # Checks the response is as expected
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                      "Number must contain 5 numerical digits.")
 
   def test_check_number_invalid_not_numeric(self):
@@ -304,15 +303,141 @@ class CheckInputsTest(unittest.TestCase):
     invalid_data['credit_card_number'] = "123456789a234567"
 
     # Passes valid number and number of digits in it
-    response: Response = check_number(
-      num="12a45",
-      digits=5)
+    result: ValidationResult = check_number(num="12a45", digits=5)
 
-    # Checks the response is as expected
-    self.assertEqual(response.status_code, 400)
-    self.assertEqual(json.loads(response.data)['error'], 
+    # Checks the result is as expected
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, 
                      "Number must contain 5 numerical digits.")
 
+  def test_check_number_invalid_not_ascii(self):
+    """Tests an invalid value of numeric characters which aren't the ASCII
+    digits 0-9"""
+
+    # Passes fractions and superscripts, which str.isnumeric() accepts
+    for num in ("½½½", "²²²", "١٢٣"):
+      result: ValidationResult = check_number(num=num, digits=3)
+      self.assertEqual(result.status_code, 400)
+
+
+  ## check_page_params() Tests ##
+
+  def test_check_page_params_valid(self):
+    """Tests checking valid pagination parameters"""
+
+    # Passes a limit and cursor as well as neither
+    result: ValidationResult = check_page_params(
+      limit="10", cursor="20", max_limit=100)
+    self.assertEqual(result.status_code, 200)
+    result = check_page_params(limit=None, cursor=None, max_limit=100)
+    self.assertEqual(result.status_code, 200)
+
+  def test_check_page_params_invalid_limit(self):
+    """Tests checking a limit above the maximum page size"""
+
+    # Checks the result is as expected
+    result: ValidationResult = check_page_params(
+      limit="101", cursor=None, max_limit=100)
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
+                     "limit must be a whole number between 1 and 100.")
+
+  def test_check_page_params_invalid_cursor(self):
+    """Tests checking a cursor which is not a whole number"""
+
+    # Checks the result is as expected
+    result: ValidationResult = check_page_params(
+      limit=None, cursor="-1", max_limit=100)
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error,
+                     "cursor must be a value returned as next_cursor.")
+
+  def test_check_page_params_out_of_range(self):
+    """Tests checking a limit of non-ASCII digits and a cursor too large to
+    page from"""
+
+    # Checks the results are as expected
+    result: ValidationResult = check_page_params(
+      limit="²", cursor=None, max_limit=100)
+    self.assertEqual(result.error,
+                     "limit must be a whole number between 1 and 100.")
+    result = check_page_params(limit=None, cursor=str(2**63), max_limit=100)
+    self.assertEqual(result.error,
+                     "cursor must be a value returned as next_cursor.")
+    result = check_page_params(limit=None, cursor=str(2**63 - 1),
+                               max_limit=100)
+    self.assertEqual(result.status_code, 200)
+
+
+  ## check_age_params() Tests ##
+
+  def test_check_age_params_valid(self):
+    """Tests checking valid age filters"""
+
+    # Passes both ages as well as neither
+    result: ValidationResult = check_age_params(min_age="18", max_age="30")
+    self.assertEqual(result.status_code, 200)
+    result = check_age_params(min_age=None, max_age=None)
+    self.assertEqual(result.status_code, 200)
+
+  def test_check_age_params_invalid_age(self):
+    """Tests checking an age which is not a whole number"""
+
+    # Checks the result is as expected
+    result: ValidationResult = check_age_params(min_age=None, max_age="3a")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, "MinAge and MaxAge must be whole numbers.")
+
+    # Numeric characters other than the ASCII digits are invalid too
+    result = check_age_params(min_age="²", max_age=None)
+    self.assertEqual(result.error, "MinAge and MaxAge must be whole numbers.")
+
+  def test_check_age_params_too_large(self):
+    """Tests checking an age above the maximum, which has no date of birth
+    to filter by"""
+
+    # Checks the result is as expected for either age, but not the maximum
+    for min_age, max_age in (("3000", None), (None, "5000")):
+      result: ValidationResult = check_age_params(min_age=min_age,
+                                                  max_age=max_age)
+      self.assertEqual(result.status_code, 400)
+      self.assertEqual(result.error,
+                       "MinAge and MaxAge cannot be greater than 150.")
+    result = check_age_params(min_age="0", max_age="150")
+    self.assertEqual(result.status_code, 200)
+
+  def test_check_age_params_empty_range(self):
+    """Tests checking a minimum age above the maximum age"""
+
+    # Checks the result is as expected
+    result: ValidationResult = check_age_params(min_age="40", max_age="30")
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, "MinAge cannot be greater than MaxAge.")
+
+
+  ## ValidatorRegistry Tests ##
+
+  def test_adult_cutoff_cached(self):
+    """Tests the adult cutoff is only calculated once a day"""
+
+    registry: ValidatorRegistry = ValidatorRegistry()
+
+    # Checks the same cutoff object is returned for repeat calls
+    self.assertIs(registry.adult_cutoff(), registry.adult_cutoff())
+
+  def test_adult_cutoff_next_day(self):
+    """Tests the adult cutoff is recalculated once the day changes"""
+
+    registry: ValidatorRegistry = ValidatorRegistry()
+
+    # Mocks today's date, moving it on by a day between calls
+    with patch('utils.check_user_input.date') as mock_date:
+      mock_date.today.return_value = date(2024, 2, 29)
+      self.assertEqual(registry.adult_cutoff(), date(2006, 2, 28))
+
+      mock_date.today.return_value = date(2024, 3, 1)
+      self.assertEqual(registry.adult_cutoff(), date(2006, 3, 1))
+
 
 if __name__ == "__main__":
   unittest.main()
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Name: test_columns.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the columnar user table in columns.py.
+"""
+
+import unittest
+from datetime import date
+# Local imports
+from storage import UserTable, User, dob_days_for_ages
+
+class UserTableTest(unittest.TestCase):
+  """Tests the UserTable class"""
+
+  def setUp(self):
+    """Sets up a table of users on a fixed day"""
+
+    self.today: date = date(2024, 6, 1)
+    self.users: list[User] = [
+      User(username="user1", dob="2000-06-01",
+           credit_card_number="1234567812345678"),
+      User(username="user2", dob="1980-01-01"),
+      User(username="user3", dob="1990-06-02",
+           credit_card_number="8765432187654321"),
+      User(username="user4")
+    ]
+    self.table: UserTable = UserTable()
+    self.table.extend(self.users)
+
+  ## dob_days_for_ages() Tests ##
+
+  def test_dob_days_for_ages(self):
+    """Tests the date of birth range covers whole years of age"""
+
+    first_day, last_day = dob_days_for_ages(min_age=18, max_age=18,
+                                            today=self.today)
+    self.assertEqual(date.fromordinal(first_day), date(2005, 6, 2))
+    self.assertEqual(date.fromordinal(last_day), date(2006, 6, 1))
+
+  ## select() Tests ##
+
+  def test_select_all(self):
+    """Tests selecting without filters returns every user in order"""
+
+    self.assertEqual(self.table.select(), self.users)
+
+  def test_select_ccn(self):
+    """Tests selecting users by ccn presence"""
+
+    self.assertEqual(self.table.select(has_ccn=True),
+                     [self.users[0], self.users[2]])
+    self.assertEqual(self.table.select(has_ccn=False),
+                     [self.users[1], self.users[3]])
+
+  def test_select_age(self):
+    """Tests selecting users by age leaves out unknown dates of birth"""
+
+    first_day, last_day = dob_days_for_ages(min_age=24, max_age=33,
+                                            today=self.today)
+    self.assertEqual(self.table.select(first_day=first_day,
+                                       last_day=last_day),
+                     [self.users[0], self.users[2]])
+    self.assertEqual(self.table.select(has_ccn=False, first_day=first_day,
+                                       last_day=last_day), [])
+
+  def test_select_age_unpadded_dob(self):
+    """Tests dates of birth without zero padding, which registration
+    accepts, are filtered by age like padded ones"""
+
+    table: UserTable = UserTable()
+    table.extend([User(username="user5", dob="1998-1-1")])
+
+    first_day, last_day = dob_days_for_ages(min_age=18, max_age=None,
+                                            today=self.today)
+    self.assertEqual(table.select(first_day=first_day, last_day=last_day),
+                     [User(username="user5", dob="1998-1-1")])
+    self.assertEqual(table.stats(today=self.today)["youngest_age"], 26)
+
+  ## stats() Tests ##
+
+  def test_stats(self):
+    """Tests summarising users with and without known dates of birth"""
+
+    stats: dict = self.table.stats(today=self.today)
+
+    self.assertEqual(stats['users'], 4)
+    self.assertEqual(stats['with_credit_card'], 2)
+    self.assertEqual(stats['without_credit_card'], 2)
+    self.assertEqual(stats['youngest_age'], 24)
+    self.assertEqual(stats['oldest_age'], 44)
+    self.assertAlmostEqual(stats['mean_age'], 34.1, delta=0.1)
+
+  def test_stats_no_match(self):
+    """Tests summarising no users leaves the ages empty"""
+
+    stats: dict = self.table.stats(today=self.today, has_ccn=False,
+                                   first_day=1, last_day=1)
+
+    self.assertEqual(stats['users'], 0)
+    self.assertIsNone(stats['youngest_age'])
+    self.assertIsNone(stats['mean_age'])
+
+
+if __name__ == "__main__":
+  unittest.main()
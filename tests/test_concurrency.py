@@ -0,0 +1,113 @@
+"""
+Name: test_concurrency.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Stress tests registering users from many threads at once.
+"""
+
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+# Local imports
+from registration_payment_service import app
+from storage import UserStore, UserConflictError, User
+from storage.user_store import LOCK_STRIPES
+
+# Threads sending requests at once, and attempts made at each username
+THREADS: int = 16
+ATTEMPTS: int = 8
+
+class SlowInsertUserStore(UserStore):
+  """Store which pauses between checking users and inserting them, so
+  registrations racing each other overlap"""
+
+  def _insert(self, user: User) -> None:
+    time.sleep(0.001)
+    super()._insert(user)
+
+class MeetingInsertUserStore(UserStore):
+  """Store whose inserts each wait for another insert to be in progress at
+  the same time, failing (after a timeout) if none ever is"""
+
+  def __init__(self) -> None:
+    super().__init__()
+    self.barrier: threading.Barrier = threading.Barrier(2, timeout=5)
+
+  def _insert(self, user: User) -> None:
+    self.barrier.wait()
+    super()._insert(user)
+
+class ConcurrentRegistrationTest(unittest.TestCase):
+  """Tests registrations racing each other are each accepted once"""
+
+  def test_register_same_usernames(self):
+    """Tests each username is only registered once when sent by several
+    threads at once"""
+
+    store: UserStore = SlowInsertUserStore()
+
+    def register(number: int) -> int:
+      response = app.test_client().post('/users', json={
+        "username": f"user{number % 50}",
+        "password": "Pass1234",
+        "email": "user@example.com",
+        "dob": "2000-01-01"
+      })
+      return response.status_code
+
+    # Mocks the users list, and sends every attempt from a thread pool
+    with patch('registration_payment_service.users', store), \
+        ThreadPoolExecutor(max_workers=THREADS) as pool:
+      statuses: list[int] = list(pool.map(register, range(50 * ATTEMPTS)))
+
+    self.assertEqual(statuses.count(201), 50)
+    self.assertEqual(statuses.count(409), 50 * (ATTEMPTS - 1))
+    self.assertEqual(len(store), 50)
+
+  def test_add_same_ccns(self):
+    """Tests each ccn is only added once when added by several threads at
+    once under different usernames"""
+
+    store: UserStore = SlowInsertUserStore()
+
+    def add(number: int) -> bool:
+      try:
+        store.add(User(username=f"user{number}",
+                       credit_card_number=f"{number % 50:016d}"))
+        return True
+      except UserConflictError:
+        return False
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+      added: list[bool] = list(pool.map(add, range(50 * ATTEMPTS)))
+
+    self.assertEqual(added.count(True), 50)
+    self.assertEqual(store.count(has_ccn=True), 50)
+
+  def test_different_usernames_not_serialized(self):
+    """Tests registrations of different usernames run alongside each other
+    rather than one at a time"""
+
+    store: MeetingInsertUserStore = MeetingInsertUserStore()
+
+    # Usernames covered by different lock stripes
+    usernames: list[str] = ["user0"]
+    number: int = 1
+    while hash(f"user{number}") % LOCK_STRIPES == \
+        hash("user0") % LOCK_STRIPES:
+      number += 1
+    usernames.append(f"user{number}")
+
+    # Each insert only finishes once both are in progress at once, which
+    # would time out if the first held a lock the second was waiting on
+    with ThreadPoolExecutor(max_workers=2) as pool:
+      list(pool.map(lambda username: store.add(User(username=username)),
+                    usernames))
+
+    self.assertEqual(len(store), 2)
+    self.assertFalse(store.barrier.broken)
+
+if __name__ == "__main__":
+  unittest.main()
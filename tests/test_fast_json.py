@@ -0,0 +1,71 @@
+"""
+Name: test_fast_json.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the JSON encoding helpers and Flask JSON provider in
+fast_json.py, with and without a faster encoder installed.
+"""
+
+import json
+import unittest
+from unittest.mock import patch
+# Local imports
+from registration_payment_service import app
+from utils import FastJSONProvider, error_body
+from utils import fast_json
+
+class FastJSONTest(unittest.TestCase):
+  """Tests encode(), loads(), error_body() and FastJSONProvider"""
+
+  def setUp(self):
+    """Sets up a body using every JSON type"""
+
+    self.body: dict = {"b": [1, 2.5, None, True], "a": "café"}
+
+  def test_round_trip(self):
+    """Tests a body decodes back to itself, with keys sorted on request,
+    through whichever encoder is installed and the standard library"""
+
+    for backend in (fast_json.orjson, None):
+      with patch.object(fast_json, 'orjson', backend), \
+          patch.object(fast_json, 'msgspec', None):
+        encoded: bytes = fast_json.encode(self.body, sort_keys=True)
+
+        self.assertEqual(fast_json.loads(encoded), self.body)
+        self.assertTrue(encoded.startswith(b'{"a":'))
+
+  def test_invalid_json(self):
+    """Tests invalid JSON raises ValueError, as the standard library does"""
+
+    with self.assertRaises(ValueError):
+      fast_json.loads(b"{")
+
+  def test_error_body_encoded_once(self):
+    """Tests an error message's body is only encoded once"""
+
+    body: bytes = error_body("Username already taken.")
+
+    self.assertEqual(json.loads(body), {"error": "Username already taken."})
+    self.assertIs(error_body("Username already taken."), body)
+
+  def test_app_provider(self):
+    """Tests the app encodes with the provider, which hands calls with the
+    standard library's options over to it"""
+
+    self.assertIsInstance(app.json, FastJSONProvider)
+
+    with app.app_context():
+      self.assertEqual(json.loads(app.json.dumps(self.body)), self.body)
+      self.assertIn("\n  ", app.json.dumps(self.body, indent=2))
+
+  def test_invalid_request_body(self):
+    """Tests a request body which isn't valid JSON is still rejected with
+    400 Bad Request"""
+
+    response = app.test_client().post('/users', data=b"{",
+                                      content_type="application/json")
+    self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,94 @@
+"""
+Name: test_journal.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the journaled user store in journal.py.
+"""
+
+import tempfile
+import unittest
+# Local imports
+from storage import JournaledUserStore, User
+
+class JournaledUserStoreTest(unittest.TestCase):
+  """Tests the JournaledUserStore class"""
+
+  def setUp(self):
+    """Creates a store in a temporary directory"""
+
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.store: JournaledUserStore = JournaledUserStore(
+      directory=self.temp_dir.name, snapshot_every=3)
+
+  def tearDown(self):
+    """Closes the store and removes its files"""
+
+    self.store.close()
+    self.temp_dir.cleanup()
+
+  def reopen(self) -> JournaledUserStore:
+    """Closes the store and recovers a new one from its files"""
+
+    self.store.close()
+    self.store = JournaledUserStore(directory=self.temp_dir.name,
+                                    snapshot_every=3)
+    return self.store
+
+  def test_recover_from_journal(self):
+    """Tests users only in the journal are recovered"""
+
+    self.store.add(User(username="user1"))
+    self.store.add(User(username="user2", credit_card_number="1234"))
+
+    store: JournaledUserStore = self.reopen()
+    self.assertEqual(list(store), [User(username="user1"),
+                                   User(username="user2",
+                                        credit_card_number="1234")])
+    self.assertIsNotNone(store.get_by_ccn("1234"))
+
+  def test_recover_from_snapshot_and_journal(self):
+    """Tests users in the snapshot and journal tail are recovered in
+    order"""
+
+    # The third user triggers a snapshot, leaving user4 in the journal
+    for index in range(1, 5):
+      self.store.add(User(username=f"user{index}"))
+
+    store: JournaledUserStore = self.reopen()
+    self.assertEqual([user.username for user in store],
+                     ["user1", "user2", "user3", "user4"])
+
+  def test_torn_journal_line_discarded(self):
+    """Tests a journal line torn part way through an append is dropped"""
+
+    self.store.add(User(username="user1"))
+    with open(self.store.journal_path, "ab") as journal:
+      journal.write(b'{"username": "us')
+
+    # Checks only the complete user is recovered and can be followed by
+    # new registrations
+    store: JournaledUserStore = self.reopen()
+    store.add(User(username="user2"))
+    store = self.reopen()
+    self.assertEqual([user.username for user in store],
+                     ["user1", "user2"])
+
+  def test_journal_already_in_snapshot(self):
+    """Tests journaled users already in the snapshot aren't added twice"""
+
+    self.store.add(User(username="user1"))
+
+    # Takes a snapshot, then puts the journal back as though the service
+    # stopped before emptying it
+    with open(self.store.journal_path, "rb") as journal:
+      journal_data: bytes = journal.read()
+    self.store.snapshot()
+    with open(self.store.journal_path, "ab") as journal:
+      journal.write(journal_data)
+
+    store: JournaledUserStore = self.reopen()
+    self.assertEqual(len(store), 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,93 @@
+"""
+Name: test_ledger.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the payment ledger in ledger.py.
+"""
+
+import unittest
+# Local imports
+from storage import PaymentLedger, User
+
+class PaymentLedgerTest(unittest.TestCase):
+  """Tests the PaymentLedger class"""
+
+  def setUp(self):
+    """Sets up an empty ledger on a clock the tests move forward, and the
+    owners of two cards"""
+
+    self.now: float = 0
+    self.ledger: PaymentLedger = PaymentLedger(clock=lambda: self.now)
+    self.owners: dict[str, User] = {
+      "card1": User(username="user1", credit_card_number="card1",
+                    card_mask="************1111"),
+      "card2": User(username="user2", credit_card_number="card2",
+                    card_mask="************2222")
+    }
+    self.lookups: list[str] = []
+
+  def find_user(self, ccn: str) -> User | None:
+    """Returns a card's owner, noting each lookup"""
+
+    self.lookups.append(ccn)
+    return self.owners.get(ccn)
+
+  def test_record(self):
+    """Tests payments are numbered in order and a card's owner is only
+    looked up on its first payment"""
+
+    self.assertEqual(self.ledger.record("card1", 100, self.find_user), 0)
+    self.assertEqual(self.ledger.record("card1", 200, self.find_user), 1)
+    self.assertEqual(self.ledger.record("card2", 300, self.find_user), 2)
+
+    self.assertEqual(len(self.ledger), 3)
+    self.assertEqual(self.lookups, ["card1", "card2"])
+
+  def test_page(self):
+    """Tests paging through payments with a cursor"""
+
+    for amount in (100, 200, 300):
+      self.ledger.record("card1", amount, self.find_user)
+      self.now += 60
+
+    payments, cursor = self.ledger.page(cursor=0, limit=2)
+    self.assertEqual([payment['amount'] for payment in payments], [100, 200])
+    self.assertEqual(payments[1]['made_at'], "1970-01-01T00:01:00+00:00")
+    self.assertEqual(cursor, 2)
+
+    payments, cursor = self.ledger.page(cursor=2, limit=2)
+    self.assertEqual(payments[0], {"id": 2, "username": "user1",
+                                   "credit_card_number": "************1111",
+                                   "amount": 300,
+                                   "made_at": "1970-01-01T00:02:00+00:00"})
+    self.assertIsNone(cursor)
+
+  def test_summaries(self):
+    """Tests the running totals overall and per user"""
+
+    self.assertEqual(self.ledger.summary(),
+                     {"payments": 0, "total_amount": 0, "mean_amount": None,
+                      "cards": 0})
+
+    self.ledger.record("card1", 100, self.find_user)
+    self.ledger.record("card2", 300, self.find_user)
+    self.ledger.record("card1", 200, self.find_user)
+
+    self.assertEqual(self.ledger.summary(),
+                     {"payments": 3, "total_amount": 600,
+                      "mean_amount": 200, "cards": 2})
+    self.assertEqual(self.ledger.user_summary("user1")['total_amount'], 300)
+    self.assertIsNone(self.ledger.user_summary("user3"))
+
+  def test_unknown_owner(self):
+    """Tests a card whose owner the store doesn't hold is still totalled"""
+
+    self.ledger.record("card3", 100, self.find_user)
+
+    payments, _ = self.ledger.page(cursor=0, limit=1)
+    self.assertIsNone(payments[0]['username'])
+    self.assertEqual(self.ledger.summary()['total_amount'], 100)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,104 @@
+"""
+Name: test_passwords.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests password hashing in passwords.py.
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+# Local imports
+from utils import PasswordHasher, create_password_hasher, hash_password, \
+  verify_password
+from utils.passwords import DEFAULT_ALGORITHM
+
+# Low work factors, as these tests check correctness rather than cost
+FAST_SCRYPT: dict = {"scrypt_n": 1 << 4, "scrypt_r": 8, "scrypt_p": 1}
+
+class PasswordTest(unittest.TestCase):
+  """Tests hash_password(), verify_password() and PasswordHasher"""
+
+  ## Hashing tests ##
+
+  def test_scrypt(self):
+    """Tests a scrypt hash records its work factors and only verifies the
+    password it was made from"""
+
+    password_hash: str = hash_password("Pass1234", algorithm="scrypt",
+                                       **FAST_SCRYPT)
+
+    self.assertTrue(password_hash.startswith("scrypt$16$8$1$"))
+    self.assertTrue(verify_password("Pass1234", password_hash))
+    self.assertFalse(verify_password("Pass1235", password_hash))
+
+  def test_pbkdf2(self):
+    """Tests a PBKDF2 hash verifies the password it was made from"""
+
+    password_hash: str = hash_password("Pass1234",
+                                       algorithm="pbkdf2_sha256",
+                                       pbkdf2_iterations=1000)
+
+    self.assertTrue(password_hash.startswith("pbkdf2_sha256$1000$"))
+    self.assertTrue(verify_password("Pass1234", password_hash))
+    self.assertFalse(verify_password("Pass1235", password_hash))
+
+  def test_salted(self):
+    """Tests the same password hashes differently each time"""
+
+    self.assertNotEqual(hash_password("Pass1234", **FAST_SCRYPT),
+                        hash_password("Pass1234", **FAST_SCRYPT))
+
+  def test_malformed_hash(self):
+    """Tests a stored value which isn't a hash never verifies"""
+
+    self.assertFalse(verify_password("Pass1234", "Pass1234"))
+    self.assertFalse(verify_password("Pass1234", "md5$1$abc$def"))
+
+
+  ## PasswordHasher tests ##
+
+  def test_hasher_inline(self):
+    """Tests a hasher without workers hashes on the calling thread"""
+
+    hasher: PasswordHasher = PasswordHasher(workers=0, **FAST_SCRYPT)
+
+    self.assertTrue(verify_password("Pass1234", hasher.hash("Pass1234")))
+
+  def test_hasher_pool(self):
+    """Tests a hasher with workers hashes passwords in order"""
+
+    hasher: PasswordHasher = PasswordHasher(workers=2, **FAST_SCRYPT)
+    try:
+      password_hashes: list[str] = hasher.hash_many(["Pass1234", "Word5678"])
+      self.assertTrue(verify_password("Pass1234", password_hashes[0]))
+      self.assertTrue(verify_password("Word5678", password_hashes[1]))
+      self.assertTrue(verify_password("Pass1234", hasher.hash("Pass1234")))
+    finally:
+      hasher.close()
+
+  def test_hasher_unavailable_algorithm(self):
+    """Tests a hasher can't be created for an algorithm which can't hash,
+    including scrypt where OpenSSL lacks it"""
+
+    with self.assertRaises(ValueError):
+      PasswordHasher(workers=0, algorithm="md5")
+    with patch('utils.passwords.AVAILABLE_ALGORITHMS', ("pbkdf2_sha256",)), \
+        self.assertRaises(ValueError):
+      PasswordHasher(workers=0, algorithm="scrypt")
+
+  def test_create_hasher_default_algorithm(self):
+    """Tests the hasher created without an algorithm configured uses the
+    best one available"""
+
+    settings: SimpleNamespace = SimpleNamespace(
+      PASSWORD_HASH_WORKERS=0, PASSWORD_HASH_ALGORITHM="",
+      PASSWORD_SCRYPT_N=1 << 4, PASSWORD_SCRYPT_R=8, PASSWORD_SCRYPT_P=1,
+      PASSWORD_PBKDF2_ITERATIONS=1000)
+
+    hasher: PasswordHasher = create_password_hasher(settings)
+    self.assertTrue(hasher.hash("Pass1234").startswith(DEFAULT_ALGORITHM))
+
+
+if __name__ == "__main__":
+  unittest.main()
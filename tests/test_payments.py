@@ -7,9 +7,17 @@ Purpose: Tests the functioning of the payments endpoint.
 
 import unittest
 from unittest.mock import patch
-from registration_payment_service import app
+from registration_payment_service import app, card_vault
+from storage import BloomFilter, PaymentLedger, User, UserStore
+from utils import TokenBucketLimiter, TTLCache
 import json
 
+def fresh_limiter() -> TokenBucketLimiter:
+  """Returns an empty card rate limiter, so payments made by other tests
+  don't count against a test's cards"""
+
+  return TokenBucketLimiter(rate=1, burst=5, capacity=100)
+
 ## make_payment() tests
 
 class MakePaymentTest(unittest.TestCase):
@@ -26,13 +34,23 @@ class MakePaymentTest(unittest.TestCase):
       "amount": "123"
     }
 
-    self.mock_users: list[dict] = [{
+    # Stored as registration stores them, with the ccn fingerprinted
+    self.mock_users: list[User] = [card_vault.protect({
       "username": "user123",
       "password": "Pass1234",
       "email": "user@example.com",
       "dob": "2000-01-01",
       "credit_card_number": "1234567891234567"
-    }]
+    })]
+
+    self.limiter = patch('registration_payment_service.card_limiter',
+                         fresh_limiter())
+    self.limiter.start()
+
+  def tearDown(self):
+    """Restores the card rate limiter"""
+
+    self.limiter.stop()
 
 
   ## Valid payment test ##
@@ -41,7 +59,8 @@ class MakePaymentTest(unittest.TestCase):
     """Tests a valid POST request to /payments endpoint"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', self.mock_users):
+    with patch('registration_payment_service.users',
+               UserStore(self.mock_users)):
 
       response = self.client.post('/payments', json=self.valid_data)
       self.assertEqual(response.status_code, 201)
@@ -91,7 +110,8 @@ class MakePaymentTest(unittest.TestCase):
     """Tests a payments POST request using an unregistered ccn"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', self.mock_users):
+    with patch('registration_payment_service.users',
+               UserStore(self.mock_users)):
 
       # Changes ccn to a valid but unregistered ccn
       invalid_data: dict = self.valid_data.copy()
@@ -102,6 +122,28 @@ class MakePaymentTest(unittest.TestCase):
       self.assertEqual(json.loads(response.data)['error'],
                        "Credit card number not registered with any user.")
 
+  def test_ccn_filtered(self):
+    """Tests a ccn ruled out by the store's ccn filter is turned away
+    without a lookup, while a registered ccn still pays"""
+
+    store: UserStore = UserStore(self.mock_users,
+                                 ccn_filter=BloomFilter(capacity=100))
+
+    with patch('registration_payment_service.users', store), \
+         patch.object(store, 'has_ccn', wraps=store.has_ccn) as has_ccn:
+
+      response = self.client.post(
+        '/payments', json={**self.valid_data,
+                           "credit_card_number": "1234567891234568"})
+      self.assertEqual(response.status_code, 404)
+
+      response = self.client.post('/payments', json=self.valid_data)
+      self.assertEqual(response.status_code, 201)
+
+      # Only the registered ccn was looked up in the store
+      self.assertEqual(has_ccn.call_count, 1)
+      self.assertEqual(store.ccn_filter.stats()['lookups'], 2)
+
 
   ## Amount value tests ##
 
@@ -131,7 +173,423 @@ class MakePaymentTest(unittest.TestCase):
     self.assertEqual(response.status_code, 400)
     self.assertEqual(json.loads(response.data)['error'], 
                      "amount must be provided.")
-    
+
+
+
+## make_payment_batch() tests
+
+class MakePaymentBatchTest(unittest.TestCase):
+  """Tests the make_payment_batch() mapping function"""
+
+  def setUp(self):
+    """Set up a test client and mock data"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    self.valid_data: dict = {
+      "credit_card_number": "1234567891234567",
+      "amount": "123"
+    }
+
+    # Stored as registration stores them, with the ccn fingerprinted
+    self.mock_users: list[User] = [card_vault.protect({
+      "username": "user123",
+      "credit_card_number": "1234567891234567"
+    })]
+
+    self.limiter = patch('registration_payment_service.card_limiter',
+                         fresh_limiter())
+    self.limiter.start()
+
+  def tearDown(self):
+    """Restores the card rate limiter"""
+
+    self.limiter.stop()
+
+  def test_payment_batch_mixed(self):
+    """Tests a batch containing valid, invalid and unregistered payments"""
+
+    invalid_data: dict = self.valid_data.copy()
+    invalid_data['amount'] = "12"
+    unregistered_data: dict = self.valid_data.copy()
+    unregistered_data['credit_card_number'] = "1234567891234568"
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.mock_users)):
+
+      response = self.client.post('/payments/batch', json=[
+        self.valid_data, invalid_data, unregistered_data
+      ])
+      self.assertEqual(response.status_code, 200)
+
+      # Checks each payment's outcome is reported in request order
+      self.assertEqual(json.loads(response.data)['results'], [
+        {"status": 201, "message": "Payment of 123 made."},
+        {"status": 400, "error": "Number must contain 3 numerical digits."},
+        {"status": 404,
+         "error": "Credit card number not registered with any user."}
+      ])
+
+  def test_payment_batch_empty(self):
+    """Tests a batch request with no payments"""
+
+    # Checks the response's status code is 400 Bad Request
+    response = self.client.post('/payments/batch', json=[])
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "Request body must be a list of between 1 and 1000 " \
+                     "payments.")
+
+
+
+## Idempotency-Key tests
+
+class IdempotentPaymentTest(unittest.TestCase):
+  """Tests retrying make_payment() with an Idempotency-Key"""
+
+  def setUp(self):
+    """Set up a test client, mock data and an empty response cache"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    self.valid_data: dict = {
+      "credit_card_number": "1234567891234567",
+      "amount": "123"
+    }
+    # Stored as registration stores them, with the ccn fingerprinted
+    self.mock_users: list[User] = [card_vault.protect({
+      "username": "user123",
+      "credit_card_number": "1234567891234567"
+    })]
+
+    self.cache: TTLCache = TTLCache(capacity=10, ttl=60)
+    self.patches = [
+      patch('registration_payment_service.users',
+            UserStore(self.mock_users)),
+      patch('registration_payment_service.payment_responses', self.cache),
+      patch('registration_payment_service.card_limiter', fresh_limiter())
+    ]
+    for mock in self.patches:
+      mock.start()
+
+  def tearDown(self):
+    """Restores the users list, response cache and card rate limiter"""
+
+    for mock in self.patches:
+      mock.stop()
+
+  def test_retry_replayed(self):
+    """Tests a retry gets the first response without being checked again"""
+
+    headers: dict = {"Idempotency-Key": "payment-1"}
+    first = self.client.post('/payments', json=self.valid_data,
+                             headers=headers)
+    self.assertEqual(first.status_code, 201)
+
+    # Checks the retry is answered without validating the payment
+    with patch('registration_payment_service.validate_payment') as validate:
+      retry = self.client.post('/payments', json=self.valid_data,
+                               headers=headers)
+      validate.assert_not_called()
+
+    self.assertEqual(retry.status_code, 201)
+    self.assertEqual(retry.data, first.data)
+    self.assertEqual(retry.headers['Idempotent-Replayed'], "true")
+    self.assertEqual(self.cache.stats()['hits'], 1)
+
+  def test_key_reused_for_different_payment(self):
+    """Tests a key can't be reused with a different request body"""
+
+    headers: dict = {"Idempotency-Key": "payment-1"}
+    self.client.post('/payments', json=self.valid_data, headers=headers)
+
+    response = self.client.post('/payments',
+                                json={**self.valid_data, "amount": "456"},
+                                headers=headers)
+    self.assertEqual(response.status_code, 422)
+
+  def test_key_too_long(self):
+    """Tests an Idempotency-Key over the maximum length"""
+
+    response = self.client.post('/payments', json=self.valid_data,
+                                headers={"Idempotency-Key": "k" * 256})
+    self.assertEqual(response.status_code, 400)
+
+  def test_metrics(self):
+    """Tests the cache's counters are reported by GET /metrics"""
+
+    self.client.post('/payments', json=self.valid_data,
+                     headers={"Idempotency-Key": "payment-1"})
+
+    response = self.client.get('/metrics')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(json.loads(response.data)['idempotency_cache']['size'],
+                     1)
+
+  def test_metrics_ccn_filter(self):
+    """Tests the store's ccn filter is reported by GET /metrics"""
+
+    with patch('registration_payment_service.users',
+               UserStore(self.mock_users,
+                         ccn_filter=BloomFilter(capacity=100))):
+      response = self.client.get('/metrics')
+
+    self.assertEqual(json.loads(response.data)['ccn_filter']['items'], 1)
+
+
+
+## Payment ledger tests
+
+class PaymentLedgerTest(unittest.TestCase):
+  """Tests get_payments() and get_payment_summary(), along with the
+  payments recorded by make_payment() and make_payment_batch()"""
+
+  def setUp(self):
+    """Set up a test client, mock data and an empty ledger"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    # Stored as registration stores them, with the ccns fingerprinted
+    self.mock_users: list[User] = [card_vault.protect(user) for user in [
+      {"username": "user1", "credit_card_number": "1234567812345678"},
+      {"username": "user2", "credit_card_number": "8765432187654321"}
+    ]]
+
+    self.ledger: PaymentLedger = PaymentLedger()
+    self.patches = [
+      patch('registration_payment_service.users',
+            UserStore(self.mock_users)),
+      patch('registration_payment_service.ledger', self.ledger),
+      patch('registration_payment_service.payment_responses',
+            TTLCache(capacity=10, ttl=60)),
+      patch('registration_payment_service.card_limiter', fresh_limiter())
+    ]
+    for mock in self.patches:
+      mock.start()
+
+  def tearDown(self):
+    """Restores the users list, ledger, response cache and card rate
+    limiter"""
+
+    for mock in self.patches:
+      mock.stop()
+
+  def pay(self, ccn: str, amount: str, headers: dict | None = None) -> int:
+    """Makes a payment, returning the response's status code"""
+
+    return self.client.post('/payments', headers=headers, json={
+      "credit_card_number": ccn, "amount": amount}).status_code
+
+  def test_get_payments(self):
+    """Tests payments made are listed in order a page at a time, with
+    masked card numbers"""
+
+    self.pay("1234567812345678", "100")
+    self.pay("8765432187654321", "250")
+    self.pay("1234567812345678", "005")
+
+    response = self.client.get('/payments?limit=2')
+    self.assertEqual(response.status_code, 200)
+    page: dict = json.loads(response.data)
+    self.assertEqual(
+      [(payment['username'], payment['credit_card_number'],
+        payment['amount']) for payment in page['payments']],
+      [("user1", "************5678", 100), ("user2", "************4321", 250)])
+    self.assertEqual(page['next_cursor'], "2")
+
+    page = json.loads(self.client.get('/payments?cursor=2').data)
+    self.assertEqual([payment['id'] for payment in page['payments']], [2])
+    self.assertIsNone(page['next_cursor'])
+
+  def test_get_payments_none(self):
+    """Tests no payments returns 204 No Content"""
+
+    self.assertEqual(self.client.get('/payments').status_code, 204)
+
+  def test_failed_payments_not_recorded(self):
+    """Tests invalid and unregistered payments aren't recorded"""
+
+    self.assertEqual(self.pay("1234567812345678", "1000"), 400)
+    self.assertEqual(self.pay("1111222233334444", "100"), 404)
+
+    self.assertEqual(len(self.ledger), 0)
+
+  def test_non_ascii_digit_amount(self):
+    """Tests an amount of numeric characters int() can't parse, such as
+    "½", is rejected before the payment is made"""
+
+    # Batched entries are checked the same way
+    self.assertEqual(self.pay("1234567812345678", "½½½"), 400)
+    response = self.client.post('/payments/batch', json=[
+      {"credit_card_number": "1234567812345678", "amount": "²²²"}])
+    self.assertEqual(
+      json.loads(response.data)['results'][0]['status'], 400)
+
+    self.assertEqual(len(self.ledger), 0)
+
+  def test_retry_recorded_once(self):
+    """Tests a payment retried with an Idempotency-Key is recorded once"""
+
+    headers: dict = {"Idempotency-Key": "payment-1"}
+    self.assertEqual(self.pay("1234567812345678", "100", headers), 201)
+    self.assertEqual(self.pay("1234567812345678", "100", headers), 201)
+
+    self.assertEqual(len(self.ledger), 1)
+
+  def test_batch_recorded(self):
+    """Tests each successful payment in a batch is recorded"""
+
+    self.client.post('/payments/batch', json=[
+      {"credit_card_number": "1234567812345678", "amount": "100"},
+      {"credit_card_number": "1111222233334444", "amount": "100"},
+      {"credit_card_number": "8765432187654321", "amount": "200"}
+    ])
+
+    self.assertEqual(self.ledger.summary()['total_amount'], 300)
+
+  def test_summary(self):
+    """Tests the overall and per user summaries"""
+
+    self.pay("1234567812345678", "100")
+    self.pay("8765432187654321", "250")
+    self.pay("1234567812345678", "300")
+
+    response = self.client.get('/payments/summary')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(json.loads(response.data),
+                     {"payments": 3, "total_amount": 650,
+                      "mean_amount": 650 / 3, "cards": 2})
+
+    response = self.client.get('/payments/summary?username=user1')
+    self.assertEqual(json.loads(response.data),
+                     {"username": "user1",
+                      "credit_card_number": "************5678",
+                      "payments": 2, "total_amount": 400})
+
+    # Checks a user without payments returns 204 No Content
+    response = self.client.get('/payments/summary?username=user3')
+    self.assertEqual(response.status_code, 204)
+
+
+
+## Rate limit tests
+
+class RateLimitTest(unittest.TestCase):
+  """Tests payments are rate limited by card and by client IP"""
+
+  def setUp(self):
+    """Set up a test client, mock data and limiters allowing bursts of two
+    payments"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    self.valid_data: dict = {
+      "credit_card_number": "1234567891234567",
+      "amount": "123"
+    }
+    self.mock_users: list[User] = [card_vault.protect({
+      "username": "user123",
+      "credit_card_number": "1234567891234567"
+    })]
+
+    self.patches = [
+      patch('registration_payment_service.users',
+            UserStore(self.mock_users)),
+      patch('registration_payment_service.payment_responses',
+            TTLCache(capacity=10, ttl=60)),
+      patch('registration_payment_service.card_limiter',
+            TokenBucketLimiter(rate=0.1, burst=2, capacity=100)),
+      patch('registration_payment_service.ip_limiter', None)
+    ]
+    for mock in self.patches:
+      mock.start()
+
+  def tearDown(self):
+    """Restores the users list, response cache and rate limiters"""
+
+    for mock in self.patches:
+      mock.stop()
+
+  def test_card_limited(self):
+    """Tests a card's payments past its burst get 429 Too Many Requests
+    with Retry-After, while other cards carry on"""
+
+    for _ in range(2):
+      response = self.client.post('/payments', json=self.valid_data)
+      self.assertEqual(response.status_code, 201)
+
+    response = self.client.post('/payments', json=self.valid_data)
+    self.assertEqual(response.status_code, 429)
+    self.assertEqual(response.headers['Retry-After'], "10")
+    self.assertEqual(json.loads(response.data)['error'],
+                     "Too many payment attempts, try again later.")
+
+    response = self.client.post('/payments', json={
+      **self.valid_data, "credit_card_number": "1234567891234568"})
+    self.assertEqual(response.status_code, 404)
+
+  def test_limited_before_checks(self):
+    """Tests invalid payments count against their card, and are limited
+    before being checked"""
+
+    invalid_data: dict = {**self.valid_data, "amount": "1000"}
+    for _ in range(2):
+      response = self.client.post('/payments', json=invalid_data)
+      self.assertEqual(response.status_code, 400)
+
+    with patch('registration_payment_service.validate_payment') as validate:
+      response = self.client.post('/payments', json=invalid_data)
+      validate.assert_not_called()
+    self.assertEqual(response.status_code, 429)
+
+  def test_limited_not_replayed(self):
+    """Tests a rate limited payment isn't replayed to retries with its
+    Idempotency-Key"""
+
+    for _ in range(2):
+      self.client.post('/payments', json=self.valid_data)
+
+    headers: dict = {"Idempotency-Key": "payment-1"}
+    response = self.client.post('/payments', json=self.valid_data,
+                                headers=headers)
+    self.assertEqual(response.status_code, 429)
+
+    # Checks the retry is checked again once the card's bucket refills
+    with patch('registration_payment_service.card_limiter', None):
+      response = self.client.post('/payments', json=self.valid_data,
+                                  headers=headers)
+    self.assertEqual(response.status_code, 201)
+
+  def test_batch_limited(self):
+    """Tests each payment in a batch counts against its card"""
+
+    response = self.client.post('/payments/batch',
+                                json=[self.valid_data] * 3)
+
+    self.assertEqual(
+      [result['status'] for result in json.loads(response.data)['results']],
+      [201, 201, 429])
+
+  def test_ip_limited(self):
+    """Tests a client's requests past its burst are limited, whichever card
+    they use"""
+
+    with patch('registration_payment_service.card_limiter', None), \
+        patch('registration_payment_service.ip_limiter',
+              TokenBucketLimiter(rate=1, burst=1, capacity=100)):
+      response = self.client.post('/payments', json=self.valid_data)
+      self.assertEqual(response.status_code, 201)
+
+      response = self.client.post('/payments/batch', json=[{
+        **self.valid_data, "credit_card_number": "1234567891234568"}])
+      self.assertEqual(response.status_code, 429)
+      self.assertEqual(response.headers['Retry-After'], "1")
+
 
 if __name__ == "__main__":
   unittest.main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Name: test_rate_limit.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the token bucket rate limiter in rate_limit.py.
+"""
+
+import unittest
+# Local imports
+from utils import TokenBucketLimiter
+
+class TokenBucketLimiterTest(unittest.TestCase):
+  """Tests the TokenBucketLimiter class"""
+
+  def setUp(self):
+    """Sets up a limiter allowing bursts of 2 refilled at 1 per second,
+    with room for two buckets, on a clock the tests move forward"""
+
+    self.now: float = 0
+    self.limiter: TokenBucketLimiter = TokenBucketLimiter(
+      rate=1, burst=2, capacity=2, clock=lambda: self.now)
+
+  def test_burst_then_wait(self):
+    """Tests a burst is allowed, after which requests wait for a refill"""
+
+    self.assertEqual(self.limiter.acquire("a"), 0)
+    self.assertEqual(self.limiter.acquire("a"), 0)
+    self.assertEqual(self.limiter.acquire("a"), 1)
+
+    # Other keys have their own buckets
+    self.assertEqual(self.limiter.acquire("b"), 0)
+
+    self.now = 0.5
+    self.assertAlmostEqual(self.limiter.acquire("a"), 0.5)
+    self.now = 1
+    self.assertEqual(self.limiter.acquire("a"), 0)
+
+    self.assertEqual(self.limiter.stats()['allowed'], 4)
+    self.assertEqual(self.limiter.stats()['limited'], 2)
+
+  def test_idle_bucket_dropped(self):
+    """Tests the oldest bucket is dropped once idle long enough to refill"""
+
+    self.limiter.acquire("a")
+    self.now = 2
+    self.limiter.acquire("b")
+
+    self.assertEqual(len(self.limiter), 1)
+    self.assertEqual(self.limiter.stats()['expirations'], 1)
+
+  def test_full_table_evicts(self):
+    """Tests a full table evicts its least recently used bucket"""
+
+    self.limiter.acquire("a")
+    self.limiter.acquire("b")
+    self.limiter.acquire("a")
+    self.limiter.acquire("c")
+
+    self.assertEqual(len(self.limiter), 2)
+    self.assertEqual(self.limiter.stats()['evictions'], 1)
+    # "a" kept its bucket, with no tokens left
+    self.assertEqual(self.limiter.acquire("a"), 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
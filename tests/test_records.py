@@ -0,0 +1,48 @@
+"""
+Name: test_records.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the user record in records.py.
+"""
+
+import unittest
+# Local imports
+from storage import User
+
+class UserRecordTest(unittest.TestCase):
+  """Tests the User record"""
+
+  def test_from_dict_round_trip(self):
+    """Tests a user created from a dict serializes back to the same dict"""
+
+    details: dict = {"username": "user1", "password": "Pass1234",
+                     "email": "user@example.com", "dob": "2000-01-01",
+                     "credit_card_number": "1234567812345678"}
+    user: User = User.from_dict(details)
+
+    self.assertTrue(user.has_ccn)
+    self.assertEqual(user.to_dict(), details)
+
+  def test_to_dict_leaves_out_absent_details(self):
+    """Tests details which weren't given are left out of the dict"""
+
+    user: User = User(username="user1", password="Pass1234")
+    self.assertEqual(user.to_dict(),
+                     {"username": "user1", "password": "Pass1234"})
+
+  def test_empty_ccn(self):
+    """Tests an empty ccn is treated as no ccn"""
+
+    user: User = User(username="user1", credit_card_number="")
+
+    self.assertFalse(user.has_ccn)
+    self.assertIsNone(user.credit_card_number)
+
+  def test_no_attribute_dict(self):
+    """Tests users are slotted rather than holding an attribute dict"""
+
+    self.assertFalse(hasattr(User(username="user1"), "__dict__"))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,39 @@
+"""
+Name: test_response_cache.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the response cache in response_cache.py.
+"""
+
+import unittest
+# Local imports
+from utils import ResponseCache
+
+class ResponseCacheTest(unittest.TestCase):
+  """Tests the ResponseCache class"""
+
+  def setUp(self):
+    """Sets up a cache holding one body"""
+
+    self.cache: ResponseCache = ResponseCache()
+    self.cache.set(key="Yes", etag="1-Yes", body=b'[]')
+
+  def test_get_matching_etag(self):
+    """Tests getting a body cached under the same ETag"""
+
+    self.assertEqual(self.cache.get(key="Yes", etag="1-Yes"), b'[]')
+
+  def test_get_stale_etag(self):
+    """Tests getting a body cached under an older ETag"""
+
+    self.assertIsNone(self.cache.get(key="Yes", etag="2-Yes"))
+
+  def test_invalidate(self):
+    """Tests invalidating removes cached bodies"""
+
+    self.cache.invalidate()
+    self.assertIsNone(self.cache.get(key="Yes", etag="1-Yes"))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,95 @@
+"""
+Name: test_schema.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the schema compiler in schema.py and the request schemas in
+request_schemas.py.
+"""
+
+import re
+import unittest
+# Local imports
+from utils import Field, compile_schema, ValidationResult, VALID, \
+  validate_user, validate_payment
+
+class CompileSchemaTest(unittest.TestCase):
+  """Tests functions compiled by compile_schema()"""
+
+  def setUp(self):
+    """Compiles a test schema"""
+
+    self.too_short: ValidationResult = ValidationResult(status_code=400,
+                                                        error="Too short.")
+
+    self.validate = compile_schema([
+      Field(name="name", min_length=3, error=self.too_short),
+      Field(name="code", pattern=re.compile(r'^[A-Z]+$')),
+      Field(name="note", required=False, max_length=5)
+    ])
+
+  def test_valid(self):
+    """Tests a body passing every check, with the optional detail absent"""
+
+    self.assertIs(self.validate({"name": "abc", "code": "XY"}), VALID)
+
+  def test_not_object(self):
+    """Tests a body which is not a JSON object"""
+
+    self.assertEqual(self.validate(["abc"]).error,
+                     "Request body must be a JSON object.")
+
+  def test_missing_checked_first(self):
+    """Tests absent details are reported before invalid values"""
+
+    self.assertEqual(self.validate({"name": "a"}).error,
+                     "code must be provided.")
+
+  def test_wrong_type(self):
+    """Tests a detail of the wrong type"""
+
+    self.assertEqual(self.validate({"name": 123, "code": "XY"}).error,
+                     "name must be a string.")
+
+  def test_length_error(self):
+    """Tests a failed length check returns the field's error"""
+
+    self.assertIs(self.validate({"name": "ab", "code": "XY"}),
+                  self.too_short)
+
+  def test_default_error(self):
+    """Tests a failed pattern check on a field without its own error"""
+
+    result: ValidationResult = self.validate({"name": "abc", "code": "xy"})
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, "code is invalid.")
+
+  def test_optional_null(self):
+    """Tests a null optional detail is treated as absent"""
+
+    self.assertIs(self.validate({"name": "abc", "code": "XY", "note": None}),
+                  VALID)
+
+
+class RequestSchemasTest(unittest.TestCase):
+  """Tests the compiled /users and /payments schemas"""
+
+  def test_validate_user_error_order(self):
+    """Tests user details are checked in the same order as before"""
+
+    result: ValidationResult = validate_user({
+      "username": "user123", "password": "Pass", "email": "user@example",
+      "dob": "2000-01-01"})
+    self.assertEqual(result.error,
+                     "Password must contain a minimum of 8 characters.")
+
+  def test_validate_payment_amount_type(self):
+    """Tests a payment amount which is not a string"""
+
+    result: ValidationResult = validate_payment({
+      "credit_card_number": "1234567891234567", "amount": 123})
+    self.assertEqual(result.status_code, 400)
+    self.assertEqual(result.error, "amount must be a string.")
+
+
+if __name__ == "__main__":
+  unittest.main()
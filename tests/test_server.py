@@ -0,0 +1,163 @@
+"""
+Name: test_server.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the serve command and pooled WSGI server in server.py.
+"""
+
+import io
+import os
+import signal
+import threading
+import unittest
+import urllib.request
+from contextlib import redirect_stderr
+from unittest.mock import patch
+# Local imports
+import config
+from registration_payment_service import app
+from server import PooledWSGIServer, parse_args, record_workers, \
+  share_hash_workers, stop_serving
+from storage import UserStore
+
+class ServerTest(unittest.TestCase):
+  """Tests the serve command"""
+
+  ## parse_args() Tests ##
+
+  def test_parse_args(self):
+    """Tests the serve command's options"""
+
+    args = parse_args(["serve", "--port", "8000", "--threads", "4"])
+
+    self.assertEqual(args.command, "serve")
+    self.assertEqual(args.port, 8000)
+    self.assertEqual(args.threads, 4)
+    self.assertEqual(args.workers, 1)
+
+  def test_parse_args_workers_shared_store(self):
+    """Tests several workers are allowed with a shared store backend"""
+
+    with patch('config.STORE_BACKEND', 'sqlite'):
+      args = parse_args(["serve", "--workers", "4"])
+    self.assertEqual(args.workers, 4)
+
+  def test_parse_args_workers_memory_store(self):
+    """Tests several workers are refused when each would hold its own
+    users"""
+
+    with patch('config.STORE_BACKEND', 'memory'), \
+        redirect_stderr(io.StringIO()) as stderr, \
+        self.assertRaises(SystemExit):
+      parse_args(["serve", "--workers", "4"])
+    self.assertIn("STORE_BACKEND=memory", stderr.getvalue())
+
+  def test_parse_args_invalid_threads(self):
+    """Tests a thread pool must have at least one thread"""
+
+    with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+      parse_args(["serve", "--threads", "0"])
+
+  ## record_workers() Tests ##
+
+  def test_record_workers(self):
+    """Tests the number of workers is passed on to the service"""
+
+    with patch.dict('os.environ'), patch('config.SERVER_WORKERS', 1):
+      record_workers(4)
+      self.assertEqual(config.SERVER_WORKERS, 4)
+      self.assertEqual(os.environ["SERVER_WORKERS"], "4")
+
+  ## share_hash_workers() Tests ##
+
+  def test_share_hash_workers(self):
+    """Tests the password hashing processes are divided between workers,
+    unless set in the environment"""
+
+    with patch.dict('os.environ', clear=True), \
+        patch('config.PASSWORD_HASH_WORKERS', 8):
+      share_hash_workers(3)
+      self.assertEqual(config.PASSWORD_HASH_WORKERS, 2)
+      # Passed on to workers which import config afresh
+      self.assertEqual(os.environ["PASSWORD_HASH_WORKERS"], "2")
+
+    with patch.dict('os.environ', {"PASSWORD_HASH_WORKERS": "8"}), \
+        patch('config.PASSWORD_HASH_WORKERS', 8):
+      share_hash_workers(4)
+      self.assertEqual(config.PASSWORD_HASH_WORKERS, 8)
+
+  ## PooledWSGIServer Tests ##
+
+  def test_pooled_server(self):
+    """Tests the pooled server serves requests through the app"""
+
+    server: PooledWSGIServer = PooledWSGIServer("localhost", 0, app,
+                                                threads=2)
+    thread: threading.Thread = threading.Thread(target=server.serve_forever)
+
+    # Mocks the users list, and starts serving on a free port
+    with patch('registration_payment_service.users', UserStore()):
+      thread.start()
+      try:
+        with urllib.request.urlopen(
+            f"http://localhost:{server.port}/users") as response:
+          self.assertEqual(response.status, 204)
+      finally:
+        server.shutdown()
+        thread.join()
+
+  def test_pooled_server_finishes_in_flight(self):
+    """Tests shutting the server down waits for requests being handled"""
+
+    started: threading.Event = threading.Event()
+    release: threading.Event = threading.Event()
+
+    def slow_app(environ: dict, start_response) -> list[bytes]:
+      started.set()
+      release.wait(5)
+      start_response("200 OK", [("Content-Type", "text/plain")])
+      return [b"done"]
+
+    server: PooledWSGIServer = PooledWSGIServer("localhost", 0, slow_app,
+                                                threads=2)
+    serving: threading.Thread = threading.Thread(target=server.serve_forever)
+    serving.start()
+
+    bodies: list[bytes] = []
+    def fetch() -> None:
+      with urllib.request.urlopen(f"http://localhost:{server.port}/") \
+          as response:
+        bodies.append(response.read())
+    client: threading.Thread = threading.Thread(target=fetch)
+    client.start()
+
+    # Stops serving while the request is in flight, which keeps
+    # serve_forever() waiting until it finishes
+    self.assertTrue(started.wait(5))
+    server.shutdown()
+    self.assertTrue(serving.is_alive())
+
+    release.set()
+    serving.join(5)
+    client.join(5)
+    self.assertFalse(serving.is_alive())
+    self.assertEqual(bodies, [b"done"])
+
+  def test_stop_serving_ignores_further_signals(self):
+    """Tests a worker's first SIGTERM interrupts it, and later ones are
+    ignored so they can't cut short its in-flight requests"""
+
+    handlers: dict = {signum: signal.getsignal(signum)
+                      for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+      with self.assertRaises(KeyboardInterrupt):
+        stop_serving(signal.SIGTERM, None)
+      self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_IGN)
+      self.assertIs(signal.getsignal(signal.SIGINT), signal.SIG_IGN)
+    finally:
+      for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+if __name__ == "__main__":
+  unittest.main()
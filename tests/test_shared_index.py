@@ -0,0 +1,154 @@
+"""
+Name: test_shared_index.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the shared user index and store in shared_index.py.
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+# Local imports
+import asgi_service
+from registration_payment_service import app, card_vault
+from storage import AsyncUserStore, SharedUserIndex, SharedIndexUserStore, \
+  SharedIndexFullError, UserConflictError, User
+
+class SharedIndexTest(unittest.TestCase):
+  """Tests the SharedUserIndex and SharedIndexUserStore classes"""
+
+  def setUp(self):
+    """Creates an index file and two stores mapping it, standing in for two
+    worker processes"""
+
+    self.directory = tempfile.TemporaryDirectory()
+    self.path: str = os.path.join(self.directory.name, "users.index")
+    SharedUserIndex.create(self.path, capacity=64)
+
+    self.indexes: list[SharedUserIndex] = [SharedUserIndex(self.path),
+                                           SharedUserIndex(self.path)]
+    self.worker_a: SharedIndexUserStore = SharedIndexUserStore(
+      self.indexes[0], workers=2)
+    self.worker_b: SharedIndexUserStore = SharedIndexUserStore(
+      self.indexes[1], workers=2)
+
+    self.user: User = User(username="user1", password="Pass1234",
+                           email="user@example.com", dob="2000-01-01",
+                           credit_card_number="1234567812345678")
+
+  def tearDown(self):
+    """Unmaps and removes the index file"""
+
+    for index in self.indexes:
+      index.close()
+    self.directory.cleanup()
+
+  ## SharedUserIndex Tests ##
+
+  def test_index_add(self):
+    """Tests keys are found once added, and counted"""
+
+    index: SharedUserIndex = self.indexes[0]
+    with index.write_lock():
+      index.add(usernames=["user1", "user2"], ccns=["1234567812345678"])
+
+    self.assertTrue(index.has_username("user2"))
+    self.assertFalse(index.has_username("user3"))
+    # Usernames and ccns are kept in separate tables
+    self.assertFalse(index.has_ccn("user1"))
+    self.assertEqual(index.counts(), (2, 1))
+
+  def test_index_full(self):
+    """Tests adding more keys than the index has room for"""
+
+    index: SharedUserIndex = self.indexes[0]
+    with index.write_lock(), self.assertRaises(SharedIndexFullError):
+      index.add(usernames=[f"user{number}" for number in range(60)],
+                ccns=[])
+
+  ## SharedIndexUserStore Tests ##
+
+  def test_registration_seen_by_other_worker(self):
+    """Tests a user registered with one worker is a duplicate for, and can
+    pay through, the other"""
+
+    self.worker_a.add(self.user)
+
+    self.assertTrue(self.worker_b.has_username("user1"))
+    self.assertTrue(self.worker_b.has_ccn("1234567812345678"))
+    with self.assertRaises(UserConflictError):
+      self.worker_b.add(User(username="user1"))
+
+    # Users are only listed by the worker which registered them
+    self.assertEqual(len(self.worker_a), 1)
+    self.assertEqual(len(self.worker_b), 0)
+
+  def test_concurrent_registrations(self):
+    """Tests only one of the workers can claim each username"""
+
+    results: list[bool] = []
+
+    def register(store: SharedIndexUserStore) -> None:
+      for number in range(20):
+        try:
+          store.add(User(username=f"user{number}"))
+          results.append(True)
+        except UserConflictError:
+          results.append(False)
+
+    threads: list[threading.Thread] = [
+      threading.Thread(target=register, args=(store,))
+      for store in (self.worker_a, self.worker_b)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(results.count(True), 20)
+    self.assertEqual(len(self.worker_a) + len(self.worker_b), 20)
+
+  def test_payment_on_other_worker(self):
+    """Tests POST /payments on a worker which didn't register the card"""
+
+    self.worker_a.add(card_vault.protect(self.user))
+
+    # Mocks the users list as the second worker's store, without rate
+    # limits
+    with patch('registration_payment_service.users', self.worker_b), \
+        patch('registration_payment_service.card_limiter', None):
+      response = app.test_client().post(
+        '/payments', json={"credit_card_number": "1234567812345678",
+                           "amount": "100"})
+      self.assertEqual(response.status_code, 201)
+
+  def test_listing_refused_with_several_workers(self):
+    """Tests users aren't listed or summarised when there are other workers
+    holding users of their own, but are with only one worker"""
+
+    self.worker_a.add(card_vault.protect(self.user))
+
+    # Mocks the users list as the first worker's store
+    with patch('registration_payment_service.users', self.worker_a):
+      for path in ('/users', '/users?limit=10', '/users/stats'):
+        response = app.test_client().get(path)
+        self.assertEqual(response.status_code, 501)
+
+    # Checks the asyncio service refuses too
+    with patch('asgi_service.users', AsyncUserStore(self.worker_a)):
+      response: asgi_service.Response = asyncio.run(asgi_service.get_users(
+        asgi_service.Request(query={}, body=b"")))
+      self.assertEqual(response.status, 501)
+
+    # Checks a sole worker's store, which holds every user, is listed
+    only_worker: SharedIndexUserStore = SharedIndexUserStore(
+      self.indexes[0])
+    self.assertTrue(only_worker.lists_every_user)
+    with patch('registration_payment_service.users', only_worker):
+      self.assertEqual(app.test_client().get('/users').status_code, 204)
+
+
+if __name__ == "__main__":
+  unittest.main()
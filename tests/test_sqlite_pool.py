@@ -0,0 +1,127 @@
+"""
+Name: test_sqlite_pool.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the connection pool and group-commit writer in
+sqlite_pool.py.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+# Local imports
+from storage import ConnectionPool, GroupCommitWriter, SQLiteUserStore, \
+  UserConflictError, User
+from storage.sqlite_store import SCHEMA, INSERT_USER, conflict_error
+
+class SQLitePoolTest(unittest.TestCase):
+  """Tests the ConnectionPool and GroupCommitWriter classes"""
+
+  def setUp(self):
+    """Creates an empty users database in a temporary directory"""
+
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.path: str = os.path.join(self.temp_dir.name, "users.db")
+
+    self.pool: ConnectionPool = ConnectionPool(path=self.path)
+    self.pool.get().executescript(SCHEMA)
+
+  def tearDown(self):
+    """Closes the pool and removes the database"""
+
+    self.pool.close()
+    self.temp_dir.cleanup()
+
+  def make_row(self, username: str) -> tuple:
+    """Returns a users row for username"""
+
+    return (username, "Pass1234", "user@example.com", "2000-01-01", None,
+            None, False)
+
+
+  ## ConnectionPool Tests ##
+
+  def test_connection_per_thread(self):
+    """Tests each thread reuses its own connection"""
+
+    other_thread_connections: list = []
+    thread = threading.Thread(
+      target=lambda: other_thread_connections.append(self.pool.get()))
+    thread.start()
+    thread.join()
+
+    self.assertIs(self.pool.get(), self.pool.get())
+    self.assertIsNot(self.pool.get(), other_thread_connections[0])
+
+
+  ## GroupCommitWriter Tests ##
+
+  def test_concurrent_submissions_grouped(self):
+    """Tests submissions arriving together share transactions"""
+
+    writer: GroupCommitWriter = GroupCommitWriter(
+      path=self.path, statement=INSERT_USER, window_ms=50)
+
+    # Submits 20 registrations at once from a thread pool
+    with ThreadPoolExecutor(max_workers=20) as executor:
+      futures: list[Future] = list(executor.map(
+        lambda index: writer.submit([self.make_row(f"user{index}")]),
+        range(20)))
+    for future in futures:
+      future.result()
+    writer.close()
+
+    # Checks every registration was committed in fewer transactions
+    self.assertEqual(writer.submissions, 20)
+    self.assertLess(writer.commits, 20)
+    self.assertEqual(
+      self.pool.get().execute("SELECT COUNT(*) FROM users").fetchone()[0],
+      20)
+
+  def test_conflict_isolated(self):
+    """Tests a failing submission doesn't affect others in its group"""
+
+    writer: GroupCommitWriter = GroupCommitWriter(
+      path=self.path, statement=INSERT_USER, window_ms=50,
+      on_error=conflict_error)
+
+    first: Future = writer.submit([self.make_row("user1")])
+    duplicate: Future = writer.submit([self.make_row("user1")])
+    second: Future = writer.submit([self.make_row("user2")])
+
+    # Checks only the duplicate failed, with a UserConflictError
+    self.assertIsNone(first.result())
+    self.assertIsNone(second.result())
+    with self.assertRaises(UserConflictError):
+      duplicate.result()
+    writer.close()
+
+    self.assertEqual(
+      self.pool.get().execute("SELECT COUNT(*) FROM users").fetchone()[0], 2)
+
+
+  ## Read cache Tests ##
+
+  def test_read_cache(self):
+    """Tests looked up users are served from the read cache"""
+
+    store: SQLiteUserStore = SQLiteUserStore(path=self.path, read_cache=True)
+    store.add(User(username="user1", password="Pass1234",
+                   email="user@example.com", dob="2000-01-01",
+                   credit_card_number="1234567812345678"))
+
+    # Looks the user up, then empties the table underneath the cache
+    self.assertTrue(store.has_username("user1"))
+    self.assertIsNotNone(store.get_by_ccn("1234567812345678"))
+    self.pool.get().execute("DELETE FROM users")
+
+    # Checks the cached lookups still find the user
+    self.assertTrue(store.has_username("user1"))
+    self.assertIsNotNone(store.get_by_ccn("1234567812345678"))
+    store.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
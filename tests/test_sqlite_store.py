@@ -0,0 +1,166 @@
+"""
+Name: test_sqlite_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the SQLite user store in sqlite_store.py.
+"""
+
+import os
+import tempfile
+from dataclasses import replace
+import unittest
+from unittest.mock import patch
+import json
+# Local imports
+from registration_payment_service import app
+from storage import SQLiteUserStore, UserConflictError, User
+
+class SQLiteUserStoreTest(unittest.TestCase):
+  """Tests the SQLiteUserStore class"""
+
+  def setUp(self):
+    """Creates a store in a temporary directory holding test users"""
+
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.path: str = os.path.join(self.temp_dir.name, "users.db")
+
+    self.users: list[User] = [
+      User(username="user1", password="Pass1234", email="a@example.com",
+           dob="2000-01-01", credit_card_number="1234567812345678"),
+      User(username="user2", password="Pass1234", email="b@example.com",
+           dob="2000-01-01"),
+      User(username="user3", password="Pass1234", email="c@example.com",
+           dob="2000-01-01", credit_card_number="8765432187654321")
+    ]
+
+    self.store: SQLiteUserStore = SQLiteUserStore(path=self.path)
+    self.store.add_many(self.users)
+
+  def tearDown(self):
+    """Closes the store and removes its database"""
+
+    self.store.close()
+    self.temp_dir.cleanup()
+
+
+  ## Lookup Tests ##
+
+  def test_lookups(self):
+    """Tests looking up usernames and ccns"""
+
+    self.assertTrue(self.store.has_username("user2"))
+    self.assertFalse(self.store.has_username("user4"))
+    self.assertEqual(self.store.get_by_ccn("8765432187654321"), self.users[2])
+    self.assertIsNone(self.store.get_by_ccn("1111222233334444"))
+    self.assertEqual(
+      self.store.registered_ccns(["1234567812345678", "1111222233334444"]),
+      {"1234567812345678"})
+
+  def test_count(self):
+    """Tests counting users with each ccn filter"""
+
+    self.assertEqual(self.store.count(), 3)
+    self.assertEqual(self.store.count(has_ccn=True), 2)
+    self.assertEqual(self.store.count(has_ccn=False), 1)
+
+
+  ## Constraint Tests ##
+
+  def test_add_username_conflict(self):
+    """Tests the unique index rejects a taken username"""
+
+    with self.assertRaises(UserConflictError) as context:
+      self.store.add(replace(self.users[1], email="d@example.com"))
+    self.assertEqual(context.exception.field, "username")
+
+  def test_add_many_rolled_back(self):
+    """Tests no users in a batch are added if one has a taken ccn"""
+
+    with self.assertRaises(UserConflictError) as context:
+      self.store.add_many([
+        replace(self.users[1], username="user4"),
+        replace(self.users[0], username="user5")
+      ])
+    self.assertEqual(context.exception.field, "credit_card_number")
+    self.assertFalse(self.store.has_username("user4"))
+
+
+  ## Pagination Tests ##
+
+  def test_page(self):
+    """Tests reading users a page at a time"""
+
+    page, cursor = self.store.page(has_ccn=None, cursor=0, limit=2)
+    self.assertEqual(page, self.users[:2])
+
+    page, cursor = self.store.page(has_ccn=None, cursor=cursor, limit=2)
+    self.assertEqual(page, self.users[2:])
+    self.assertIsNone(cursor)
+
+  def test_iter_users_filtered(self):
+    """Tests iterating over users without a ccn"""
+
+    self.assertEqual(list(self.store.iter_users(has_ccn=False)),
+                     [self.users[1]])
+
+  def test_table_catches_up(self):
+    """Tests the columnar table copies in users added since it was read"""
+
+    self.assertEqual(self.store.table().select(has_ccn=True),
+                     [self.users[0], self.users[2]])
+
+    new_user: User = replace(self.users[1], username="user4")
+    self.store.add(new_user)
+    self.assertEqual(self.store.table().select(has_ccn=False),
+                     [self.users[1], new_user])
+
+
+  ## Persistence Tests ##
+
+  def test_persists_across_reopen(self):
+    """Tests users are still registered once the database is reopened"""
+
+    self.store.close()
+    self.store = SQLiteUserStore(path=self.path)
+
+    self.assertEqual(list(self.store), self.users)
+
+  def test_service_with_sqlite_store(self):
+    """Tests registering and paying through the service with the store"""
+
+    app.testing = True
+    client = app.test_client()
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users', self.store):
+
+      response = client.post('/users', json={
+        "username": "user4", "password": "Pass1234",
+        "email": "d@example.com", "dob": "2000-01-01",
+        "credit_card_number": "1111222233334444"})
+      self.assertEqual(response.status_code, 201)
+
+      response = client.post('/payments', json={
+        "credit_card_number": "1111222233334444", "amount": "100"})
+      self.assertEqual(response.status_code, 201)
+
+      response = client.get('/users?CreditCard=Yes')
+      self.assertEqual(len(json.loads(response.data)), 3)
+
+  def test_service_cursor_out_of_range(self):
+    """Tests a cursor larger than SQLite can store is rejected rather than
+    failing to page"""
+
+    app.testing = True
+    client = app.test_client()
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users', self.store):
+      response = client.get('/users?cursor=99999999999999999999999')
+      self.assertEqual(response.status_code, 400)
+      self.assertEqual(json.loads(response.data)['error'],
+                       "cursor must be a value returned as next_cursor.")
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,58 @@
+"""
+Name: test_ttl_cache.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the bounded TTL cache in ttl_cache.py.
+"""
+
+import unittest
+# Local imports
+from utils import TTLCache
+
+class TTLCacheTest(unittest.TestCase):
+  """Tests the TTLCache class"""
+
+  def setUp(self):
+    """Sets up a cache of two entries on a clock the tests move forward"""
+
+    self.now: float = 0
+    self.cache: TTLCache = TTLCache(capacity=2, ttl=10,
+                                    clock=lambda: self.now)
+
+  def test_get_set(self):
+    """Tests getting a cached value, and a key which isn't cached"""
+
+    self.cache.set("a", 1)
+
+    self.assertEqual(self.cache.get("a"), 1)
+    self.assertIsNone(self.cache.get("b"))
+    self.assertEqual(self.cache.stats()['hits'], 1)
+    self.assertEqual(self.cache.stats()['misses'], 1)
+
+  def test_evicts_least_recently_used(self):
+    """Tests a full cache evicts the entry used longest ago"""
+
+    self.cache.set("a", 1)
+    self.cache.set("b", 2)
+    # Uses "a", leaving "b" as the least recently used
+    self.cache.get("a")
+    self.cache.set("c", 3)
+
+    self.assertIsNone(self.cache.get("b"))
+    self.assertEqual(self.cache.get("a"), 1)
+    self.assertEqual(len(self.cache), 2)
+    self.assertEqual(self.cache.stats()['evictions'], 1)
+
+  def test_expires(self):
+    """Tests entries expire once their ttl has passed"""
+
+    self.cache.set("a", 1)
+    self.now = 10
+
+    self.assertIsNone(self.cache.get("a"))
+    self.assertEqual(len(self.cache), 0)
+    self.assertEqual(self.cache.stats()['expirations'], 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
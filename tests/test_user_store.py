@@ -0,0 +1,134 @@
+"""
+Name: test_user_store.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the in-memory user store in user_store.py.
+"""
+
+import unittest
+# Local imports
+from storage import UserStore, UserConflictError, User
+
+class UserStoreTest(unittest.TestCase):
+  """Tests the UserStore class"""
+
+  def setUp(self):
+    """Sets up test data"""
+
+    self.users: list[User] = [
+      User(username="user1", credit_card_number="1234567812345678"),
+      User(username="user2"),
+      User(username="user3", credit_card_number="8765432187654321")
+    ]
+
+    self.store: UserStore = UserStore(self.users)
+
+
+  ## add() Tests ##
+
+  def test_add_preserves_order(self):
+    """Tests users are held in the order they were added"""
+
+    self.store.add(User(username="user4"))
+
+    self.assertEqual(len(self.store), 4)
+    self.assertEqual([user.username for user in self.store],
+                     ["user1", "user2", "user3", "user4"])
+    self.assertEqual(self.store[3].username, "user4")
+
+  def test_add_many(self):
+    """Tests adding several users in one step"""
+
+    version: str = self.store.version
+    self.store.add_many([User(username="user4"), User(username="user5")])
+
+    self.assertEqual(len(self.store), 5)
+    self.assertTrue(self.store.has_username("user5"))
+    self.assertNotEqual(self.store.version, version)
+
+  def test_version_differs_between_stores(self):
+    """Tests stores holding different users never share a version, even
+    with the same number of users (as after a restart)"""
+
+    other: UserStore = UserStore([User(username="other1"),
+                                  User(username="other2"),
+                                  User(username="other3")])
+
+    self.assertEqual(len(other), len(self.store))
+    self.assertNotEqual(other.version, self.store.version)
+
+  def test_add_many_conflict(self):
+    """Tests no users are added if one has a taken ccn"""
+
+    with self.assertRaises(UserConflictError) as context:
+      self.store.add_many([
+        User(username="user4"),
+        User(username="user5", credit_card_number="1234567812345678")
+      ])
+
+    # Checks the clashing detail is reported and user4 wasn't added
+    self.assertEqual(context.exception.field, "credit_card_number")
+    self.assertFalse(self.store.has_username("user4"))
+
+
+  ## has_username() Tests ##
+
+  def test_has_username_registered(self):
+    """Tests looking up a registered username"""
+
+    self.assertTrue(self.store.has_username("user2"))
+
+  def test_has_username_unregistered(self):
+    """Tests looking up an unregistered username"""
+
+    self.assertFalse(self.store.has_username("user4"))
+
+
+  ## get_by_ccn() Tests ##
+
+  def test_get_by_ccn_registered(self):
+    """Tests looking up a registered ccn returns its user"""
+
+    self.assertEqual(self.store.get_by_ccn("8765432187654321"), self.users[2])
+
+  def test_get_by_ccn_unregistered(self):
+    """Tests looking up an unregistered ccn returns None"""
+
+    self.assertIsNone(self.store.get_by_ccn("1111222233334444"))
+
+  def test_registered_ccns(self):
+    """Tests finding which of several ccns are registered"""
+
+    self.assertEqual(
+      self.store.registered_ccns(["1234567812345678", "1111222233334444"]),
+      {"1234567812345678"})
+
+
+  ## ccn Partition Tests ##
+
+  def test_ccn_partitions(self):
+    """Tests users are split by ccn presence as they are added"""
+
+    # Adds a user with an empty ccn, which counts as no ccn
+    new_user: User = User(username="user4", credit_card_number="")
+    self.store.add(new_user)
+
+    self.assertEqual(list(self.store.iter_users(has_ccn=True)),
+                     [self.users[0], self.users[2]])
+    self.assertEqual(list(self.store.iter_users(has_ccn=False)),
+                     [self.users[1], new_user])
+
+
+  ## page() Tests ##
+
+  def test_page(self):
+    """Tests reading a partition a page at a time"""
+
+    self.assertEqual(self.store.page(has_ccn=True, cursor=0, limit=1),
+                     ([self.users[0]], 1))
+    self.assertEqual(self.store.page(has_ccn=True, cursor=1, limit=1),
+                     ([self.users[2]], None))
+
+
+if __name__ == "__main__":
+  unittest.main()
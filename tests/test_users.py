@@ -7,7 +7,9 @@ Purpose: Tests the functioning of the users endpoint.
 
 import unittest
 from unittest.mock import patch
-from registration_payment_service import app
+from registration_payment_service import app, card_vault
+from storage import User, UserStore
+from utils import verify_password
 from datetime import date
 import json
 
@@ -38,7 +40,8 @@ class RegistrationTest(unittest.TestCase):
     """Tests a completely valid POST request with expected data."""
 
     # Mocks the users list
-    with patch('registration_payment_service.users', new=[]) as mock_users:
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
 
       # Sends a POST request
       response = self.client.post('/users', json=self.valid_data)
@@ -46,8 +49,19 @@ class RegistrationTest(unittest.TestCase):
       # Checks if the status code is 201 Created
       self.assertEqual(response.status_code, 201)
       # Checks the data of the user created and saved matches with the
-      # data sent in request
-      self.assertEqual(json.loads(response.data)['user'], self.valid_data)
+      # data sent in request, other than the password which is never
+      # returned and is stored hashed, and the ccn which is returned masked
+      # and stored as its fingerprint
+      expected: dict = self.valid_data.copy()
+      password: str = expected.pop('password')
+      expected['credit_card_number'] = "************4567"
+      self.assertEqual(json.loads(response.data)['user'], expected)
+
+      stored: User = mock_users.get_by_ccn(
+        card_vault.fingerprint(self.valid_data['credit_card_number']))
+      self.assertNotEqual(stored.password, password)
+      self.assertTrue(verify_password(password, stored.password))
+      self.assertEqual(stored.card_mask, "************4567")
 
 
   ## Username tests ##
@@ -79,7 +93,8 @@ class RegistrationTest(unittest.TestCase):
     user"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', new=[]) as mock_users:
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
 
       # Checks the response's status code is 201 Created for the first
       # creation and 409 Conflict when the same user is attempted to be
@@ -92,7 +107,29 @@ class RegistrationTest(unittest.TestCase):
       # Checks that only 1 instance of the user was added to the mocked
       # users list.
       self.assertEqual(len(mock_users), 1)
-      self.assertEqual(mock_users[0]["username"], self.valid_data["username"])
+      self.assertEqual(mock_users[0].username, self.valid_data["username"])
+
+
+  def test_invalid_ccn_taken(self):
+    """Tests registering a ccn that is already registered to another
+    user"""
+
+    second_valid_data: dict = self.valid_data.copy()
+    second_valid_data['username'] = 'user456'
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
+
+      # Checks the response's status code is 409 Conflict for the second
+      # user with the same ccn
+      response = self.client.post('/users', json=self.valid_data)
+      self.assertEqual(response.status_code, 201)
+      response = self.client.post('/users', json=second_valid_data)
+      self.assertEqual(response.status_code, 409)
+      self.assertEqual(json.loads(response.data)['error'],
+                       "Credit card number already registered.")
+      self.assertEqual(len(mock_users), 1)
 
 
   ## Password tests ##
@@ -228,7 +265,8 @@ class RegistrationTest(unittest.TestCase):
     """Tests the creation of a user during valid registration"""
 
     # Mocks the users list
-    with patch('registration_payment_service.users', new=[]) as mock_users:
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
 
       # Checks the response's status code is as expected (201 Created)
       response = self.client.post('/users', json=self.valid_data)
@@ -236,16 +274,18 @@ class RegistrationTest(unittest.TestCase):
 
       # Checks if the user was added to the mocked users list
       self.assertEqual(len(mock_users), 1)
-      self.assertEqual(mock_users[0]["username"], self.valid_data["username"])
+      self.assertEqual(mock_users[0].username, self.valid_data["username"])
 
   def test_user_creation_multiple(self):
     """Tests the creation of 2 users with valid registrations"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', new=[]) as mock_users:
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
 
       second_valid_data: dict = self.valid_data.copy()
       second_valid_data['username'] = 'user456'
+      second_valid_data['credit_card_number'] = '1234567891234568'
 
       # Checks the response's status code is as expected for both user
       # creations (201 Created).
@@ -256,8 +296,8 @@ class RegistrationTest(unittest.TestCase):
 
       # Checks if both users were added to the mocked users list
       self.assertEqual(len(mock_users), 2)
-      self.assertEqual(mock_users[0]["username"], self.valid_data["username"])
-      self.assertEqual(mock_users[1]["username"],
+      self.assertEqual(mock_users[0].username, self.valid_data["username"])
+      self.assertEqual(mock_users[1].username,
                        second_valid_data["username"])
 
 
@@ -278,6 +318,76 @@ class RegistrationTest(unittest.TestCase):
 
 
 
+### register_batch() tests
+
+class RegisterBatchTest(unittest.TestCase):
+  """Tests the register_batch() mapping function"""
+
+  def setUp(self):
+    """Set up a test client and mock data"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    self.valid_data: dict = {
+      "username": "user123",
+      "password": "Pass1234",
+      "email": "user@example.com",
+      "dob": "2000-01-01"
+    }
+
+  def test_register_batch_mixed(self):
+    """Tests a batch containing valid, invalid and duplicate users"""
+
+    second_valid_data: dict = self.valid_data.copy()
+    second_valid_data['username'] = 'user456'
+    invalid_data: dict = self.valid_data.copy()
+    invalid_data['password'] = 'pass'
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               new=UserStore()) as mock_users:
+
+      response = self.client.post('/users/batch', json=[
+        self.valid_data, invalid_data, self.valid_data, second_valid_data
+      ])
+      self.assertEqual(response.status_code, 200)
+      body: dict = json.loads(response.data)
+
+      # Checks each user's outcome is reported in request order
+      self.assertEqual(body['created'], 2)
+      self.assertEqual([result['status'] for result in body['results']],
+                       [201, 400, 409, 201])
+      self.assertEqual(body['results'][1]['error'],
+                       "Password must contain a minimum of 8 characters.")
+
+      # Checks only the valid users were added to the mocked users list
+      self.assertEqual([user.username for user in mock_users],
+                       ['user123', 'user456'])
+
+  def test_register_batch_existing_username(self):
+    """Tests a batch containing a user which is already registered"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               new=UserStore([self.valid_data])):
+
+      response = self.client.post('/users/batch', json=[self.valid_data])
+      self.assertEqual(json.loads(response.data)['results'][0],
+                       {"status": 409, "error": "Username already taken."})
+
+  def test_register_batch_not_list(self):
+    """Tests a batch request whose body is not a list"""
+
+    # Checks the response's status code is 400 Bad Request
+    response = self.client.post('/users/batch', json=self.valid_data)
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "Request body must be a list of between 1 and 1000 " \
+                     "users.")
+
+
+
 ### get_users() tests
 
 class GetUsersTest(unittest.TestCase):
@@ -289,17 +399,26 @@ class GetUsersTest(unittest.TestCase):
     app.testing = True
     self.client = app.test_client()
 
-    self.users = [
+    # Users as stored by registration, with each ccn fingerprinted
+    self.stored_users: list[User] = [card_vault.protect(user) for user in [
       {"username": "user1", "credit_card_number": "1234567812345678"},
       {"username": "user2"},
       {"username": "user3", "credit_card_number": "8765432187654321"}
+    ]]
+
+    # The same users as returned in responses, with ccns masked
+    self.users = [
+      {"username": "user1", "credit_card_number": "************5678"},
+      {"username": "user2"},
+      {"username": "user3", "credit_card_number": "************4321"}
     ]
 
   def test_get_users_cc_filter_yes(self):
     """Tests the GET /users endpoint with cc filter of 'Yes' """
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', self.users):
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
 
       # Send GET request with a CreditCard=Yes query
       response = self.client.get('/users?CreditCard=Yes')
@@ -311,17 +430,34 @@ class GetUsersTest(unittest.TestCase):
       # Check that only the two users without a ccn are returned
       self.assertEqual(len(filtered_users), 2)
       self.assertIn(
-        {"username": "user1", "credit_card_number": "1234567812345678"},
+        {"username": "user1", "credit_card_number": "************5678"},
         filtered_users)
       self.assertIn(
-        {"username": "user3", "credit_card_number": "8765432187654321"},
+        {"username": "user3", "credit_card_number": "************4321"},
         filtered_users)
 
+  def test_get_users_streamed_key_order(self):
+    """Tests streamed (and cached) user lists encode keys in the same order
+    as paginated ones, which go through the app's JSON provider"""
+
+    with patch('registration_payment_service.users',
+               UserStore([card_vault.protect({
+                 "username": "user1", "email": "user@example.com",
+                 "dob": "2000-01-01",
+                 "credit_card_number": "1234567812345678"})])):
+      streamed: list[dict] = json.loads(self.client.get('/users').data)
+      cached: list[dict] = json.loads(self.client.get('/users').data)
+      paged: dict = json.loads(self.client.get('/users?limit=1').data)
+
+    self.assertEqual(list(streamed[0]), list(paged['users'][0]))
+    self.assertEqual(list(cached[0]), list(paged['users'][0]))
+
   def test_get_users_cc_filter_no(self):
     """Tests the GET /users endpoint with cc filter of 'No' """
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', self.users):
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
 
       # Send GET request with a CreditCard=Yes query
       response = self.client.get('/users?CreditCard=No')
@@ -338,7 +474,8 @@ class GetUsersTest(unittest.TestCase):
     """Tests the GET /users endpoint with no cc filter"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', self.users):
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
 
       # Send GET request with a CreditCard=Yes query
       response = self.client.get('/users')
@@ -355,7 +492,8 @@ class GetUsersTest(unittest.TestCase):
     """Tests the GET /users endpoint with no cc filter"""
 
     # Mocks the users list (exists within this test case only)
-    with patch('registration_payment_service.users', new=[]):
+    with patch('registration_payment_service.users',
+               new=UserStore()):
 
       # Send GET request with a CreditCard=Yes query
       response = self.client.get('/users')
@@ -364,6 +502,263 @@ class GetUsersTest(unittest.TestCase):
       # Checks the response body is an empty byte string
       self.assertEqual(response.data, b'')
 
+  def test_get_users_streamed(self):
+    """Tests an unpaginated GET /users response is streamed"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      response = self.client.get('/users')
+      # Checks the body is streamed (sent without a content length)
+      self.assertEqual(response.status_code, 200)
+      self.assertNotIn('Content-Length', response.headers)
+      self.assertEqual(json.loads(response.data), self.users)
+
+
+  ## Caching tests ##
+
+  def test_get_users_cached(self):
+    """Tests a repeat GET /users is served from the response cache"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      # Reads the whole first response so that it gets cached
+      first_response = self.client.get('/users?CreditCard=Yes')
+      first_response.get_data()
+
+      # Checks the second response is served whole rather than streamed
+      second_response = self.client.get('/users?CreditCard=Yes')
+      self.assertIn('Content-Length', second_response.headers)
+      self.assertEqual(second_response.data, first_response.data)
+      self.assertEqual(second_response.headers['ETag'],
+                       first_response.headers['ETag'])
+
+  def test_get_users_cache_invalidated(self):
+    """Tests a registration invalidates the cached user list"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      first_response = self.client.get('/users')
+      self.client.post('/users', json={
+        "username": "user4",
+        "password": "Pass1234",
+        "email": "user@example.com",
+        "dob": "2000-01-01"
+      })
+
+      # Checks the new user is included under a new ETag
+      second_response = self.client.get('/users')
+      self.assertEqual(len(json.loads(second_response.data)), 4)
+      self.assertNotEqual(second_response.headers['ETag'],
+                          first_response.headers['ETag'])
+
+  def test_get_users_not_modified(self):
+    """Tests a GET /users with a matching If-None-Match header"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      response = self.client.get('/users')
+      etag: str = response.headers['ETag']
+
+      # Checks the response is 304 Not Modified with no body
+      response = self.client.get('/users', headers={'If-None-Match': etag})
+      self.assertEqual(response.status_code, 304)
+      self.assertEqual(response.data, b'')
+
+
+  ## Pagination tests ##
+
+  def test_get_users_paginated(self):
+    """Tests walking through all users a page at a time"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      # Checks the first page holds the first 2 users and a cursor
+      response = self.client.get('/users?limit=2')
+      self.assertEqual(response.status_code, 200)
+      page: dict = json.loads(response.data)
+      self.assertEqual(page['users'], self.users[:2])
+      self.assertIsNotNone(page['next_cursor'])
+
+      # Checks the last page holds the remaining user and no cursor
+      response = self.client.get(
+        f"/users?limit=2&cursor={page['next_cursor']}")
+      self.assertEqual(response.status_code, 200)
+      page = json.loads(response.data)
+      self.assertEqual(page['users'], self.users[2:])
+      self.assertIsNone(page['next_cursor'])
+
+  def test_get_users_paginated_cc_filter(self):
+    """Tests paginating users filtered by cc presence"""
+
+    # Mocks the users list (exists within this test case only)
+    with patch('registration_payment_service.users',
+               UserStore(self.stored_users)):
+
+      response = self.client.get('/users?CreditCard=Yes&limit=1&cursor=1')
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual(json.loads(response.data),
+                       {"users": [self.users[2]], "next_cursor": None})
+
+  def test_get_users_invalid_limit(self):
+    """Tests a limit which is not a positive whole number"""
+
+    response = self.client.get('/users?limit=0')
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "limit must be a whole number between 1 and 1000.")
+
+    # Numeric characters other than the ASCII digits are invalid too
+    response = self.client.get('/users?limit=²')
+    self.assertEqual(response.status_code, 400)
+
+  def test_get_users_age_filter(self):
+    """Tests filtering users by age range and cc presence"""
+
+    aged_users: list[dict] = [
+      {"username": "user1", "dob": "2000-06-01",
+       "credit_card_number": "************5678"},
+      {"username": "user2", "dob": "1980-01-01"},
+      {"username": "user3", "dob": "1990-06-02",
+       "credit_card_number": "************4321"}
+    ]
+
+    # Mocks the users list and today's date, on which user1 is 24 and user3
+    # is still 33
+    with patch('registration_payment_service.users',
+               UserStore([card_vault.protect(user) for user in [
+                 {**aged_users[0], "credit_card_number": "1234567812345678"},
+                 aged_users[1],
+                 {**aged_users[2], "credit_card_number": "8765432187654321"}
+               ]])), \
+        patch('registration_payment_service.date') as mock_date:
+      mock_date.today.return_value = date(2024, 6, 1)
+
+      response = self.client.get('/users?MinAge=24&MaxAge=40')
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual(json.loads(response.data),
+                       [aged_users[0], aged_users[2]])
+
+      response = self.client.get('/users?MaxAge=33&CreditCard=Yes&limit=1')
+      self.assertEqual(json.loads(response.data),
+                       {"users": [aged_users[0]], "next_cursor": "1"})
+
+      # Checks no users match returns 204 No Content
+      response = self.client.get('/users?MinAge=50')
+      self.assertEqual(response.status_code, 204)
+
+  def test_get_users_age_filter_unpadded_dob(self):
+    """Tests a user registered with a date of birth without zero padding
+    is found by the age filters"""
+
+    with patch('registration_payment_service.users', UserStore()):
+      response = self.client.post('/users', json={
+        "username": "user1", "password": "Pass1234",
+        "email": "user@example.com", "dob": "1998-1-1"})
+      self.assertEqual(response.status_code, 201)
+
+      response = self.client.get('/users?MinAge=18')
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual([user['username'] for user
+                        in json.loads(response.data)], ["user1"])
+
+  def test_get_users_invalid_age(self):
+    """Tests an age filter which is not a whole number"""
+
+    response = self.client.get('/users?MinAge=old')
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "MinAge and MaxAge must be whole numbers.")
+
+  def test_get_users_age_too_large(self):
+    """Tests age filters which are too large or use non-ASCII digits are
+    rejected rather than failing to convert to a date of birth"""
+
+    response = self.client.get('/users?MaxAge=5000')
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "MinAge and MaxAge cannot be greater than 150.")
+    response = self.client.get('/users?MinAge=²')
+    self.assertEqual(response.status_code, 400)
+
+
+class GetUserStatsTest(unittest.TestCase):
+  """Tests the get_user_stats() mapping function"""
+
+  def setUp(self):
+    """Set up a test client and mock data"""
+
+    app.testing = True
+    self.client = app.test_client()
+
+    self.users = [
+      {"username": "user1", "dob": "2000-06-01",
+       "credit_card_number": "1234567812345678"},
+      {"username": "user2", "dob": "1980-01-01"},
+      {"username": "user3", "dob": "1990-06-02",
+       "credit_card_number": "8765432187654321"}
+    ]
+
+  def test_get_user_stats(self):
+    """Tests summarising every user"""
+
+    # Mocks the users list and today's date
+    with patch('registration_payment_service.users', UserStore(self.users)), \
+        patch('registration_payment_service.date') as mock_date:
+      mock_date.today.return_value = date(2024, 6, 1)
+
+      response = self.client.get('/users/stats')
+      self.assertEqual(response.status_code, 200)
+      stats: dict = json.loads(response.data)
+
+      self.assertEqual(stats['users'], 3)
+      self.assertEqual(stats['with_credit_card'], 2)
+      self.assertEqual(stats['without_credit_card'], 1)
+      self.assertEqual(stats['youngest_age'], 24)
+      self.assertEqual(stats['oldest_age'], 44)
+
+  def test_get_user_stats_filtered(self):
+    """Tests summarising users filtered by cc presence and age"""
+
+    # Mocks the users list and today's date
+    with patch('registration_payment_service.users', UserStore(self.users)), \
+        patch('registration_payment_service.date') as mock_date:
+      mock_date.today.return_value = date(2024, 6, 1)
+
+      response = self.client.get('/users/stats?CreditCard=Yes&MinAge=30')
+      stats: dict = json.loads(response.data)
+
+      self.assertEqual(stats['users'], 1)
+      self.assertEqual(stats['youngest_age'], 33)
+      self.assertEqual(stats['oldest_age'], 33)
+
+  def test_get_user_stats_age_too_large(self):
+    """Tests an age filter above the maximum age is rejected"""
+
+    response = self.client.get('/users/stats?MinAge=3000')
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(json.loads(response.data)['error'],
+                     "MinAge and MaxAge cannot be greater than 150.")
+
+  def test_get_user_stats_no_users(self):
+    """Tests summarising an empty store"""
+
+    # Mocks the users list
+    with patch('registration_payment_service.users', UserStore()):
+      response = self.client.get('/users/stats')
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual(json.loads(response.data)['users'], 0)
+      self.assertIsNone(json.loads(response.data)['mean_age'])
+
 
 if __name__ == "__main__":
   unittest.main()
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Name: test_validation.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Tests the validation result type and adapter in validation.py.
+"""
+
+import unittest
+from flask import Response
+import json
+# Local imports
+from utils import ValidationResult, VALID, to_response, check_password
+
+class ValidationTest(unittest.TestCase):
+  """Tests the ValidationResult type and to_response()"""
+
+  def test_passing_checks_share_result(self):
+    """Tests passing checks return the shared VALID result"""
+
+    self.assertIs(check_password(password="Pass1234"), VALID)
+
+  def test_to_response(self):
+    """Tests converting a failed result into a JSON error response"""
+
+    response: Response = to_response(ValidationResult(status_code=409,
+                                                      error="Conflict."))
+
+    # Checks the response carries the result's status and error
+    self.assertEqual(response.status_code, 409)
+    self.assertEqual(response.content_type, "application/json")
+    self.assertEqual(json.loads(response.data)['error'], "Conflict.")
+
+
+if __name__ == "__main__":
+  unittest.main()
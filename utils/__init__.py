@@ -1,7 +1,19 @@
 from .check_user_input import check_username, check_password, check_email, \
-  check_dob, check_number, check_input_present
+  check_dob, check_number, check_input_present, check_page_params, \
+  check_age_params, check_username_format, check_password_strength, \
+  ValidatorRegistry, validators, USERNAME_TAKEN, CCN_TAKEN, USERS_NOT_LISTED
 from .check_payments import check_ccn_registered
 from .utils import check_contains_upper_and_num
+from .response_cache import ResponseCache
+from .ttl_cache import TTLCache
+from .rate_limit import TokenBucketLimiter, create_limiter
+from .passwords import PasswordHasher, hash_password, verify_password, \
+  create_password_hasher
+from .validation import ValidationResult, VALID, to_response
+from .fast_json import FastJSONProvider, error_body
+from .schema import Field, compile_schema
+from .request_schemas import USER_SCHEMA, PAYMENT_SCHEMA, validate_user, \
+  validate_payment
 
 if __name__ == "__main__":
   pass
\ No newline at end of file
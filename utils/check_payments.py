@@ -6,22 +6,27 @@ Purpose: Contains functions which check payment information.
 """
 
 from flask import Response
-import json
+# Local Imports
+from storage import BaseUserStore
+from .fast_json import dumps, error_body
 
-def check_ccn_registered(ccn: str, users: list[dict], amount: str) -> Response:
-  """Checks a ccn is registered to a user"""
+# Body of the response to a payment with an unregistered ccn
+CCN_NOT_REGISTERED_BODY: bytes = error_body(
+  "Credit card number not registered with any user.")
+
+def check_ccn_registered(ccn: str, users: BaseUserStore,
+                         amount: str) -> Response:
+  """Checks a ccn (given as its vault fingerprint) is registered to a
+  user"""
 
   # If the ccn is registered to a user return 201 Created for successful
-  # payment.
-  for user in users:
-    if user.get('credit_card_number') == ccn:
-      return Response(response=json.dumps({"message": f"Payment of {amount} " \
-                        "made."}),
-                      status=201,
-                      content_type="application/json")
+  # payment. Ccns the store's filter rules out skip the lookup.
+  if users.may_have_ccn(ccn) and users.has_ccn(ccn):
+    return Response(response=dumps({"message": f"Payment of {amount} made."}),
+                    status=201,
+                    content_type="application/json")
 
   # If ccn is not registered to any user return 404 Not Found
-  return Response(response=json.dumps({"error": "Credit card number not " \
-                    "registered with any user."}),
+  return Response(response=CCN_NOT_REGISTERED_BODY,
                   status=404,
                   content_type="application/json")
\ No newline at end of file
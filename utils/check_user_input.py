@@ -5,15 +5,115 @@ Author: Ryan Gascoigne-Jones
 Purpose: Contains functions which check a request's json body.
 """
 
-from flask import Response
-import json
 import re
 from datetime import datetime, date
+from functools import lru_cache
 from dateutil.relativedelta import relativedelta
 # Local Imports
 from .utils import check_contains_upper_and_num
+from .validation import ValidationResult, VALID
+from storage import BaseUserStore
 
-def check_input_present(user_input: dict, expected: list[str]) -> Response:
+# Oldest age which can be filtered by, keeping the dates of birth the
+# filters are converted to within the range dates can hold
+MAX_AGE: int = 150
+
+# Largest cursor which can be paged from, as the largest integer SQLite can
+# store
+MAX_CURSOR: int = 2**63 - 1
+
+# Results for checks whose error never changes, created once so failing
+# checks don't allocate either
+USERNAME_SPACES: ValidationResult = ValidationResult(
+  status_code=400, error="Username cannot contain spaces.")
+USERNAME_NOT_ALPHANUMERIC: ValidationResult = ValidationResult(
+  status_code=400, error="Username must contain only letters and numbers.")
+USERNAME_TAKEN: ValidationResult = ValidationResult(
+  status_code=409, error="Username already taken.")
+CCN_TAKEN: ValidationResult = ValidationResult(
+  status_code=409, error="Credit card number already registered.")
+USERS_NOT_LISTED: ValidationResult = ValidationResult(
+  status_code=501, error="Users can't be listed while each worker holds " \
+  "only the users registered with it (STORE_BACKEND=shared with more " \
+  "than one worker).")
+PASSWORD_TOO_SHORT: ValidationResult = ValidationResult(
+  status_code=400, error="Password must contain a minimum of 8 characters.")
+PASSWORD_MISSING_UPPER_OR_NUM: ValidationResult = ValidationResult(
+  status_code=400, error="Password must contain at least one of both " \
+  "uppercase characters and numbers.")
+EMAIL_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="Email must be in correct email format. e.g. " \
+  "user@example.com")
+DOB_UNDERAGE: ValidationResult = ValidationResult(
+  status_code=403, error="User must be at least 18 years old")
+DOB_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="Date of Birth must be in format: YYYY-MM-DD")
+CURSOR_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="cursor must be a value returned as next_cursor.")
+AGE_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="MinAge and MaxAge must be whole numbers.")
+AGE_TOO_LARGE: ValidationResult = ValidationResult(
+  status_code=400, error="MinAge and MaxAge cannot be greater than 150.")
+AGE_RANGE_INVALID: ValidationResult = ValidationResult(
+  status_code=400, error="MinAge cannot be greater than MaxAge.")
+
+class ValidatorRegistry:
+  """Holds values the checks rely on which are costly to rebuild on every
+  call"""
+
+  def __init__(self) -> None:
+    """Compiles regular expressions used by the checks"""
+
+    # Regular expression used for email format
+    self.email_regex: re.Pattern = re.compile(
+      r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+    # Day the adult cutoff was calculated on, along with the cutoff
+    self._adult_cutoff: tuple[date | None, date | None] = (None, None)
+
+  def adult_cutoff(self) -> date:
+    """Returns the latest date of birth of someone who is 18 today,
+    calculated once per calendar day"""
+
+    today: date = date.today()
+    calculated_on, cutoff = self._adult_cutoff
+
+    if calculated_on != today:
+      cutoff = today - relativedelta(years=18)
+      # Day and cutoff are swapped in together so they always match
+      self._adult_cutoff = (today, cutoff)
+
+    return cutoff
+
+# Registry shared by all checks
+validators: ValidatorRegistry = ValidatorRegistry()
+
+@lru_cache
+def missing_detail(detail: str) -> ValidationResult:
+  """Returns the result for a missing detail, created once per detail"""
+
+  return ValidationResult(status_code=400,
+                          error=f"{detail} must be provided.")
+
+@lru_cache
+def invalid_number(digits: int) -> ValidationResult:
+  """Returns the result for an invalid number, created once per length"""
+
+  return ValidationResult(status_code=400,
+                          error=f"Number must contain {digits} numerical " \
+                          "digits.")
+
+@lru_cache
+def invalid_limit(max_limit: int) -> ValidationResult:
+  """Returns the result for an invalid page limit, created once per
+  maximum"""
+
+  return ValidationResult(status_code=400,
+                          error="limit must be a whole number between 1 " \
+                          f"and {max_limit}.")
+
+def check_input_present(user_input: dict,
+                        expected: list[str]) -> ValidationResult:
   """Checks user_input (json body) against list of expected details to check
   if any are missing"""
 
@@ -23,83 +123,75 @@ def check_input_present(user_input: dict, expected: list[str]) -> Response:
     try:
       user_input[detail]
     except KeyError:
-      return Response(response=json.dumps({"error": f"{detail} must be " \
-                      "provided."}),
-                    status=400,
-                    content_type="application/json")
+      return missing_detail(detail)
 
   # If there is none missing
-  return Response(status=200)
+  return VALID
 
-def check_username(username: str, existing_users: list[dict]) -> Response:
-  """Checks username is valid"""
+def check_username_format(username: str) -> ValidationResult:
+  """Checks username is made up of valid characters"""
   
   # Checks username doesn't contain spaces
   if " " in username:
-    return Response(response=json.dumps({"error": "Username cannot contain " \
-                      "spaces."}),
-                    status=400,
-                    content_type="application/json")
+    return USERNAME_SPACES
 
   # Checks username is alphanumeric
   if not username.isalnum():
-    return Response(response=json.dumps({"error": "Username must contain " \
-                      "only letters and numbers."}),
-                    status=400,
-                    content_type="application/json")
+    return USERNAME_NOT_ALPHANUMERIC
+
+  # Username format is valid
+  return VALID
+
+def check_username(username: str,
+                   existing_users: BaseUserStore) -> ValidationResult:
+  """Checks username is valid"""
+
+  # Checks username is made up of valid characters
+  format_status: ValidationResult = check_username_format(username)
+  if format_status.status_code != 200:
+    return format_status
 
   # Checks username doesn't already exist
-  for user in existing_users:
-    if user['username'] == username:
-      return Response(response=json.dumps({"error": "Username already " \
-                        "taken."}),
-                      status=409,
-                      content_type="application/json")
+  if existing_users.has_username(username):
+    return USERNAME_TAKEN
 
   # Username is valid
-  return Response(status=200)
+  return VALID
+
+
+def check_password_strength(password: str) -> ValidationResult:
+  """Checks password contains both an upper case letter and number"""
+
+  if not check_contains_upper_and_num(password):
+    return PASSWORD_MISSING_UPPER_OR_NUM
+
+  # Password is strong enough
+  return VALID
 
 
-def check_password(password: str) -> Response:
+def check_password(password: str) -> ValidationResult:
   """Checks password is valid"""
 
   # Checks password is at least 8 characters long
   if len(password) < 8:
-    return Response(response=json.dumps({"error": "Password must contain a " \
-                      "minimum of 8 characters."}),
-                    status=400,
-                    content_type="application/json")
+    return PASSWORD_TOO_SHORT
   
   # Checks password contains both an upper case letter and number
-  if not check_contains_upper_and_num(password):
-    return Response(response=json.dumps({"error": "Password must contain " \
-                      "at least one of both uppercase characters and " \
-                      "numbers."}),
-                    status=400,
-                    content_type="application/json")
+  return check_password_strength(password)
 
-  # Password is valid
-  return Response(status=200)
 
-
-def check_email(email: str) -> Response:
+def check_email(email: str) -> ValidationResult:
   """Checks email is valid"""
 
-  # Regular expression used for email format
-  regex_email = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-
   # Checks email is in email format
-  if not re.match(regex_email, email):
-    return Response(response=json.dumps({"error": "Email must be in correct " \
-                      "email format. e.g. user@example.com"}),
-                    status=400,
-                    content_type="application/json")
+  if not validators.email_regex.match(email):
+    return EMAIL_INVALID
 
   # Email is valid
-  return Response(status=200)
+  return VALID
 
 
-def check_dob(dob: str) -> Response:
+def check_dob(dob: str) -> ValidationResult:
   """Checks date of birth is valid"""
 
   # Checks format
@@ -107,34 +199,71 @@ def check_dob(dob: str) -> Response:
     dob_obj: date = datetime.strptime(dob, "%Y-%m-%d").date()
 
     # Checks age is above 18
-    if dob_obj > (date.today() - relativedelta(years=18)):
-      return Response(response=json.dumps({"error": "User must be at least " \
-                      "18 years old"}),
-                    status=403,
-                    content_type="application/json")
+    if dob_obj > validators.adult_cutoff():
+      return DOB_UNDERAGE
 
   except ValueError:
-    return Response(response=json.dumps({"error": "Date of Birth must be in " \
-                      "format: YYYY-MM-DD"}),
-                    status=400,
-                    content_type="application/json")
+    return DOB_INVALID
 
   # DoB is valid
-  return Response(status=200)
+  return VALID
 
-def check_number(num: str, digits: int) -> Response:
+def is_whole_number(text: str) -> bool:
+  """Checks text is made up only of the ASCII digits 0-9. str.isdigit()
+  and isnumeric() also accept characters such as "²" and "½", which int()
+  can't parse."""
+
+  return text.isascii() and text.isdigit()
+
+def check_number(num: str, digits: int) -> ValidationResult:
   """Checks a numerical value is valid"""
 
   # Checks num is a number {digits} long
-  if not num.isnumeric() or len(num) != digits:
-    return Response(response=json.dumps({"error": "Number must contain " \
-                      f"{digits} numerical digits."}),
-                    status=400,
-                    content_type="application/json")
+  if not is_whole_number(num) or len(num) != digits:
+    return invalid_number(digits)
 
   # Numerical value is valid
-  return Response(status=200)
+  return VALID
+
+def check_page_params(limit: str | None, cursor: str | None,
+                      max_limit: int) -> ValidationResult:
+  """Checks pagination query parameters are valid"""
+
+  # Checks limit is a whole number between 1 and max_limit
+  if limit is not None and (not is_whole_number(limit) or
+                            not 1 <= int(limit) <= max_limit):
+    return invalid_limit(max_limit)
+
+  # Checks cursor is a whole number (as returned in next_cursor) that can
+  # be paged from
+  if cursor is not None and (not is_whole_number(cursor) or
+                             int(cursor) > MAX_CURSOR):
+    return CURSOR_INVALID
+
+  # Pagination parameters are valid
+  return VALID
+
+def check_age_params(min_age: str | None,
+                     max_age: str | None) -> ValidationResult:
+  """Checks age filter query parameters are valid"""
+
+  # Checks each given age is a whole number no greater than the maximum
+  for age in (min_age, max_age):
+    if age is None:
+      continue
+    if not is_whole_number(age):
+      return AGE_INVALID
+    if int(age) > MAX_AGE:
+      return AGE_TOO_LARGE
+
+  # Checks the range isn't empty
+  if min_age is not None and max_age is not None and \
+      int(min_age) > int(max_age):
+    return AGE_RANGE_INVALID
+
+  # Age parameters are valid
+  return VALID
 
 if __name__ == "__main__":
   pass
-      
\ No newline at end of file
+      
@@ -0,0 +1,93 @@
+"""
+Name: fast_json.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: JSON encoding and decoding through the fastest library installed
+(orjson, then msgspec, then the standard library's json), along with a
+Flask JSON provider using it for request bodies and responses.
+"""
+
+import json
+from functools import lru_cache
+from typing import Any, Callable
+from flask.json.provider import DefaultJSONProvider
+
+# Faster encoders are optional, falling back to the standard library
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import msgspec
+except ImportError:
+  msgspec = None
+
+# Name of the library in use
+BACKEND: str = "orjson" if orjson is not None else \
+  "msgspec" if msgspec is not None else "json"
+
+def encode(obj: Any, default: Callable[[Any], Any] | None = None,
+           sort_keys: bool = False) -> bytes:
+  """Encodes obj as compact UTF-8 JSON, converting types the encoder
+  doesn't support with default"""
+
+  if orjson is not None:
+    return orjson.dumps(obj, default=default,
+                        option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+  if msgspec is not None:
+    return msgspec.json.encode(obj, enc_hook=default,
+                               order="sorted" if sort_keys else None)
+
+  return json.dumps(obj, default=default, sort_keys=sort_keys,
+                    separators=(",", ":")).encode()
+
+def dumps(obj: Any) -> bytes:
+  """Encodes obj as compact UTF-8 JSON"""
+
+  return encode(obj)
+
+def loads(data: str | bytes) -> Any:
+  """Decodes JSON, raising ValueError if it isn't valid"""
+
+  if orjson is not None:
+    return orjson.loads(data)
+
+  if msgspec is not None:
+    try:
+      return msgspec.json.decode(data)
+    except msgspec.DecodeError as error:
+      raise ValueError(str(error)) from error
+
+  return json.loads(data)
+
+@lru_cache(maxsize=1024)
+def error_body(error: str) -> bytes:
+  """Returns the encoded body of an error response. Error messages are
+  almost all constants, so each one is only encoded once."""
+
+  return dumps({"error": error})
+
+class FastJSONProvider(DefaultJSONProvider):
+  """Flask JSON provider encoding and decoding with the fastest library
+  installed, so request.get_json(), flask.json and jsonify() use it.
+
+  Calls passing options of the standard library's json (e.g. indent for a
+  pretty printed response in debug mode) are handed to it."""
+
+  def dumps(self, obj: Any, **kwargs: Any) -> str:
+    """Encodes obj as JSON, sorting keys if the provider's sort_keys is set
+    as the default provider does"""
+
+    if kwargs:
+      return super().dumps(obj, **kwargs)
+    return encode(obj, default=self.default,
+                  sort_keys=self.sort_keys).decode()
+
+  def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+    """Decodes JSON, raising ValueError if it isn't valid"""
+
+    if kwargs:
+      return super().loads(s, **kwargs)
+    return loads(s)
@@ -0,0 +1,165 @@
+"""
+Name: passwords.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Password hashing with a slow key derivation function (scrypt, or
+PBKDF2 where OpenSSL lacks it), run on a pool of worker processes so the
+CPU it costs doesn't hold up request threads.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Callable
+
+# Random salt and derived key sizes
+SALT_BYTES: int = 16
+KEY_BYTES: int = 32
+
+# Hashing algorithms, stored as the first field of each hash
+ALGORITHMS: tuple[str, ...] = ("scrypt", "pbkdf2_sha256")
+DEFAULT_ALGORITHM: str = "scrypt" if hasattr(hashlib, "scrypt") \
+  else "pbkdf2_sha256"
+# Algorithms this Python's OpenSSL can hash with
+AVAILABLE_ALGORITHMS: tuple[str, ...] = tuple(
+  algorithm for algorithm in ALGORITHMS
+  if algorithm != "scrypt" or hasattr(hashlib, "scrypt"))
+
+def encode(raw: bytes) -> str:
+  """Encodes a salt or key as unpadded base64"""
+
+  return base64.b64encode(raw).decode().rstrip("=")
+
+def decode(text: str) -> bytes:
+  """Decodes a salt or key encoded by encode()"""
+
+  return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def derive(password: str, salt: bytes, algorithm: str,
+           params: tuple[int, ...]) -> bytes:
+  """Derives a password's key. Params are scrypt's (n, r, p) or PBKDF2's
+  (iterations,)."""
+
+  if algorithm == "scrypt":
+    n, r, p = params
+    # Allows for the memory scrypt needs (128 * r * n bytes) at any n
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * (n + p), dklen=KEY_BYTES)
+
+  if algorithm == "pbkdf2_sha256":
+    iterations, = params
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt,
+                               iterations, dklen=KEY_BYTES)
+
+  raise ValueError(f"unknown password hashing algorithm {algorithm}")
+
+def hash_password(password: str, algorithm: str = DEFAULT_ALGORITHM,
+                  scrypt_n: int = 1 << 14, scrypt_r: int = 8,
+                  scrypt_p: int = 1,
+                  pbkdf2_iterations: int = 600000) -> str:
+  """Hashes a password with a random salt, returning the algorithm, its
+  work factors, the salt and the key as one "$" separated string"""
+
+  params: tuple[int, ...] = (scrypt_n, scrypt_r, scrypt_p) \
+    if algorithm == "scrypt" else (pbkdf2_iterations,)
+  salt: bytes = os.urandom(SALT_BYTES)
+  key: bytes = derive(password, salt, algorithm, params)
+
+  return "$".join((algorithm, *map(str, params), encode(salt), encode(key)))
+
+def verify_password(password: str, password_hash: str) -> bool:
+  """Checks a password against a hash made by hash_password(), using the
+  work factors stored with it"""
+
+  try:
+    algorithm, *params, salt, key = password_hash.split("$")
+    if algorithm not in ALGORITHMS:
+      return False
+    derived: bytes = derive(password, decode(salt), algorithm,
+                            tuple(map(int, params)))
+  # Passwords stored before hashing, or otherwise malformed hashes
+  except ValueError:
+    return False
+
+  return hmac.compare_digest(derived, decode(key))
+
+class PasswordHasher:
+  """Hashes passwords on a pool of worker processes, or on the calling
+  thread if workers is 0.
+
+  The pool is started on first use, and again in a process forked from one
+  which had started it, as a parent's pool can't be used after a fork."""
+
+  def __init__(self, workers: int = 1, **work_factors: int | str) -> None:
+    """Creates a hasher passing work_factors (see hash_password()) to each
+    hash, raising ValueError if their algorithm isn't available"""
+
+    # Rejects an algorithm which can't hash when the hasher is created,
+    # rather than failing every registration
+    algorithm: str = work_factors.get("algorithm", DEFAULT_ALGORITHM)
+    if algorithm not in AVAILABLE_ALGORITHMS:
+      raise ValueError(f"Unavailable password hashing algorithm: {algorithm}")
+
+    self.workers: int = workers
+    self._hash: Callable[[str], str] = partial(hash_password,
+                                               **work_factors)
+
+    self._pool: ProcessPoolExecutor | None = None
+    self._pid: int | None = None
+    self._lock: threading.Lock = threading.Lock()
+
+  def _executor(self) -> ProcessPoolExecutor:
+    """Returns this process's pool, starting it if needed"""
+
+    with self._lock:
+      if self._pool is None or self._pid != os.getpid():
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._pid = os.getpid()
+      return self._pool
+
+  def submit(self, password: str) -> Future:
+    """Starts hashing a password, returning a future of its hash"""
+
+    if self.workers == 0:
+      future: Future = Future()
+      future.set_result(self._hash(password))
+      return future
+
+    return self._executor().submit(self._hash, password)
+
+  def hash(self, password: str) -> str:
+    """Hashes a password, waiting for a worker to do so"""
+
+    return self.submit(password).result()
+
+  def hash_many(self, passwords: list[str]) -> list[str]:
+    """Hashes passwords, spread over the workers, in the order given"""
+
+    if self.workers == 0:
+      return [self._hash(password) for password in passwords]
+
+    return list(self._executor().map(self._hash, passwords))
+
+  def close(self) -> None:
+    """Stops the worker processes, if started"""
+
+    with self._lock:
+      if self._pool is not None and self._pid == os.getpid():
+        self._pool.shutdown()
+      self._pool = None
+
+def create_password_hasher(settings) -> PasswordHasher:
+  """Creates the password hasher chosen by settings (normally the config
+  module)"""
+
+  return PasswordHasher(workers=settings.PASSWORD_HASH_WORKERS,
+                        algorithm=settings.PASSWORD_HASH_ALGORITHM or
+                        DEFAULT_ALGORITHM,
+                        scrypt_n=settings.PASSWORD_SCRYPT_N,
+                        scrypt_r=settings.PASSWORD_SCRYPT_R,
+                        scrypt_p=settings.PASSWORD_SCRYPT_P,
+                        pbkdf2_iterations=settings.PASSWORD_PBKDF2_ITERATIONS)
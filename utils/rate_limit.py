@@ -0,0 +1,101 @@
+"""
+Name: rate_limit.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Token bucket rate limiter with a bounded table of buckets, used to
+slow down repeated payment attempts with one card or from one client.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+class TokenBucketLimiter:
+  """Allows each key bursts of up to burst requests, refilled at rate
+  requests per second.
+
+  Buckets are kept least recently used first, in a table of at most
+  capacity buckets. A bucket left idle long enough to refill is the same as
+  no bucket, so each request drops the oldest bucket if it has refilled
+  (counted as an expiration), and a full table drops its oldest bucket
+  regardless (an eviction). Both take constant time, so the table never
+  needs a sweep."""
+
+  def __init__(self, rate: float, burst: int, capacity: int,
+               clock: Callable[[], float] = time.monotonic) -> None:
+    """Creates a limiter with no buckets, timing requests with clock"""
+
+    self.rate: float = rate
+    self.burst: int = burst
+    self.capacity: int = capacity
+    self._clock: Callable[[], float] = clock
+
+    # Seconds an idle bucket takes to refill completely
+    self._refill_time: float = burst / rate
+
+    # Tokens left in each bucket along with when they were counted, least
+    # recently used first
+    self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+    self._lock: threading.Lock = threading.Lock()
+
+    self.allowed: int = 0
+    self.limited: int = 0
+    self.evictions: int = 0
+    self.expirations: int = 0
+
+  def acquire(self, key: str) -> float:
+    """Takes a token from key's bucket, returning 0 if there was one, or
+    otherwise the seconds until there will be"""
+
+    with self._lock:
+      now: float = self._clock()
+
+      # Drops the least recently used bucket once it has refilled
+      if self._buckets:
+        oldest_key, (_, counted) = next(iter(self._buckets.items()))
+        if now - counted >= self._refill_time:
+          del self._buckets[oldest_key]
+          self.expirations += 1
+
+      bucket: tuple[float, float] | None = self._buckets.pop(key, None)
+      tokens: float = self.burst if bucket is None else \
+        min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+      wait: float = 0
+      if tokens >= 1:
+        tokens -= 1
+        self.allowed += 1
+      else:
+        wait = (1 - tokens) / self.rate
+        self.limited += 1
+
+      # Makes room for the bucket as the most recently used
+      if len(self._buckets) >= self.capacity:
+        self._buckets.popitem(last=False)
+        self.evictions += 1
+      self._buckets[key] = (tokens, now)
+
+      return wait
+
+  def __len__(self) -> int:
+    return len(self._buckets)
+
+  def stats(self) -> dict:
+    """Returns the limiter's size and counters"""
+
+    return {"buckets": len(self._buckets),
+            "capacity": self.capacity,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evictions": self.evictions,
+            "expirations": self.expirations}
+
+
+def create_limiter(rate: float, burst: int,
+                   capacity: int) -> TokenBucketLimiter | None:
+  """Creates a payment rate limiter, or None if rate is 0 (no limit)"""
+
+  if rate <= 0:
+    return None
+  return TokenBucketLimiter(rate=rate, burst=burst, capacity=capacity)
@@ -0,0 +1,38 @@
+"""
+Name: request_schemas.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Schemas for the /users and /payments request bodies, compiled
+once at import.
+"""
+
+from functools import partial
+from typing import Any, Callable
+# Local Imports
+from .schema import Field, compile_schema
+from .validation import ValidationResult
+from .check_user_input import check_username_format, check_password_strength, \
+  check_dob, check_number, validators, PASSWORD_TOO_SHORT, EMAIL_INVALID
+
+# Body of POST /users. Whether a username is taken depends on the user
+# store, so is checked separately once the body is valid.
+USER_SCHEMA: list[Field] = [
+  Field(name="username", validator=check_username_format),
+  Field(name="password", min_length=8, error=PASSWORD_TOO_SHORT,
+        validator=check_password_strength),
+  Field(name="email", pattern=validators.email_regex, error=EMAIL_INVALID),
+  Field(name="dob", validator=check_dob),
+  Field(name="credit_card_number", required=False,
+        validator=partial(check_number, digits=16))
+]
+
+# Body of POST /payments
+PAYMENT_SCHEMA: list[Field] = [
+  Field(name="credit_card_number",
+        validator=partial(check_number, digits=16)),
+  Field(name="amount", validator=partial(check_number, digits=3))
+]
+
+validate_user: Callable[[Any], ValidationResult] = compile_schema(USER_SCHEMA)
+validate_payment: Callable[[Any], ValidationResult] = compile_schema(
+  PAYMENT_SCHEMA)
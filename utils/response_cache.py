@@ -0,0 +1,44 @@
+"""
+Name: response_cache.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Caches encoded response bodies so unchanged data isn't
+re-serialized on every request.
+"""
+
+from typing import NamedTuple
+
+class CachedResponse(NamedTuple):
+  """An encoded response body along with the ETag identifying it"""
+
+  etag: str
+  body: bytes
+
+class ResponseCache:
+  """Holds encoded response bodies keyed by request variant (e.g. a query
+  filter), each tagged with the ETag of the data it was encoded from"""
+
+  def __init__(self) -> None:
+    """Creates an empty cache"""
+
+    self._entries: dict[str | None, CachedResponse] = {}
+
+  def get(self, key: str | None, etag: str) -> bytes | None:
+    """Returns the cached body for key if it was encoded from the data
+    identified by etag, otherwise None"""
+
+    entry: CachedResponse | None = self._entries.get(key)
+    if entry is None or entry.etag != etag:
+      return None
+
+    return entry.body
+
+  def set(self, key: str | None, etag: str, body: bytes) -> None:
+    """Caches an encoded body for key"""
+
+    self._entries[key] = CachedResponse(etag=etag, body=body)
+
+  def invalidate(self) -> None:
+    """Removes every cached body, e.g. once the underlying data changes"""
+
+    self._entries.clear()
@@ -0,0 +1,121 @@
+"""
+Name: schema.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Declarative schemas for request bodies, compiled into a single
+validation function per schema.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple
+# Local Imports
+from .validation import ValidationResult, VALID
+from .check_user_input import missing_detail
+
+# Names used in errors for values of the wrong type
+TYPE_NAMES: dict[type, str] = {
+  str: "a string",
+  int: "a whole number",
+  float: "a number",
+  bool: "true or false",
+  list: "a list",
+  dict: "a JSON object"
+}
+
+BODY_NOT_OBJECT: ValidationResult = ValidationResult(
+  status_code=400, error="Request body must be a JSON object.")
+
+class Field(NamedTuple):
+  """Declares one detail of a request body and the checks it must pass, in
+  the order they are run"""
+
+  name: str
+  required: bool = True
+  type: type = str
+  # Length and pattern checks, failing with error
+  min_length: int | None = None
+  max_length: int | None = None
+  pattern: re.Pattern | None = None
+  error: ValidationResult | None = None
+  # Custom check run last, e.g. check_dob
+  validator: Callable[[Any], ValidationResult] | None = None
+
+@lru_cache
+def wrong_type(name: str, field_type: type) -> ValidationResult:
+  """Returns the result for a detail of the wrong type, created once per
+  detail"""
+
+  type_name: str = TYPE_NAMES.get(field_type, field_type.__name__)
+  return ValidationResult(status_code=400,
+                          error=f"{name} must be {type_name}.")
+
+def compile_field(field: Field) -> tuple[Callable[[Any], ValidationResult],
+                                         ...]:
+  """Turns a field's declared checks into a tuple of check functions"""
+
+  checks: list[Callable[[Any], ValidationResult]] = []
+  error: ValidationResult = field.error or ValidationResult(
+    status_code=400, error=f"{field.name} is invalid.")
+
+  if field.min_length is not None:
+    min_length: int = field.min_length
+    checks.append(lambda value: error if len(value) < min_length else VALID)
+
+  if field.max_length is not None:
+    max_length: int = field.max_length
+    checks.append(lambda value: error if len(value) > max_length else VALID)
+
+  if field.pattern is not None:
+    match: Callable = field.pattern.match
+    checks.append(lambda value: VALID if match(value) else error)
+
+  if field.validator is not None:
+    checks.append(field.validator)
+
+  return tuple(checks)
+
+def compile_schema(fields: list[Field]) -> Callable[[Any], ValidationResult]:
+  """Compiles a schema into a function which checks a request body against
+  it, returning the result of the first failing check or 200 OK.
+
+  Every required detail is checked for presence before any detail's value
+  is checked. Absent (or null) optional details are skipped."""
+
+  # Everything a check could need is worked out once, here
+  required: tuple[tuple[str, ValidationResult], ...] = tuple(
+    (field.name, missing_detail(field.name))
+    for field in fields if field.required)
+  steps: tuple = tuple(
+    (field.name, field.required, field.type,
+     wrong_type(field.name, field.type), compile_field(field))
+    for field in fields)
+
+  def validate(body: Any) -> ValidationResult:
+    """Checks a request body against the compiled schema"""
+
+    if not isinstance(body, dict):
+      return BODY_NOT_OBJECT
+
+    # Checks if there are any absent values
+    for name, missing in required:
+      if name not in body:
+        return missing
+
+    # Checks each present value's type followed by its checks
+    for name, is_required, field_type, type_error, checks in steps:
+      value: Any = body.get(name)
+      if value is None and not is_required:
+        continue
+
+      if not isinstance(value, field_type):
+        return type_error
+
+      for check in checks:
+        result: ValidationResult = check(value)
+        if result.status_code != 200:
+          return result
+
+    return VALID
+
+  return validate
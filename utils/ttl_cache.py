@@ -0,0 +1,97 @@
+"""
+Name: ttl_cache.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Bounded least-recently-used cache whose entries expire, used to
+replay responses to retried requests.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+# Number of locks keys are striped over by lock_for()
+KEY_LOCK_STRIPES: int = 64
+
+class TTLCache:
+  """Holds up to capacity entries, each for at most ttl seconds. Once full,
+  adding an entry evicts the least recently used one.
+
+  Counts hits, misses, evictions (for room) and expirations, reported by
+  stats()."""
+
+  def __init__(self, capacity: int, ttl: float,
+               clock: Callable[[], float] = time.monotonic) -> None:
+    """Creates an empty cache, timing entries with clock"""
+
+    self.capacity: int = capacity
+    self.ttl: float = ttl
+    self._clock: Callable[[], float] = clock
+
+    # Values along with when they expire, least recently used first
+    self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+    self._lock: threading.Lock = threading.Lock()
+    self._key_locks: list[threading.Lock] = [
+      threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+
+    self.hits: int = 0
+    self.misses: int = 0
+    self.evictions: int = 0
+    self.expirations: int = 0
+
+  def lock_for(self, key: str) -> threading.Lock:
+    """Returns the lock for a key, held by callers computing its value so
+    requests with the same key wait for the first rather than repeat it"""
+
+    return self._key_locks[hash(key) % KEY_LOCK_STRIPES]
+
+  def get(self, key: str) -> Any | None:
+    """Returns the value cached for key, or None if there isn't one or it
+    has expired"""
+
+    with self._lock:
+      entry: tuple[float, Any] | None = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+
+      expires, value = entry
+      if expires <= self._clock():
+        del self._entries[key]
+        self.expirations += 1
+        self.misses += 1
+        return None
+
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def set(self, key: str, value: Any) -> None:
+    """Caches a value for key, evicting the least recently used entry if
+    the cache is full"""
+
+    with self._lock:
+      self._entries[key] = (self._clock() + self.ttl, value)
+      self._entries.move_to_end(key)
+
+      while len(self._entries) > self.capacity:
+        # Expired entries are counted as such rather than as evictions
+        expires, _ = self._entries.popitem(last=False)[1]
+        if expires <= self._clock():
+          self.expirations += 1
+        else:
+          self.evictions += 1
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def stats(self) -> dict:
+    """Returns the cache's size and counters"""
+
+    return {"size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations}
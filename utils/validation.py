@@ -0,0 +1,30 @@
+"""
+Name: validation.py
+Author: Ryan Gascoigne-Jones
+
+Purpose: Lightweight result type returned by the check functions, and the
+adapter turning failed results into responses at the route boundary.
+"""
+
+from flask import Response
+from typing import NamedTuple
+# Local Imports
+from .fast_json import error_body
+
+class ValidationResult(NamedTuple):
+  """Outcome of a check: the status code a request should fail with along
+  with the error message, or 200 if the check passed"""
+
+  status_code: int
+  error: str | None = None
+
+# Shared result for every passing check, so success allocates nothing
+VALID: ValidationResult = ValidationResult(status_code=200)
+
+def to_response(result: ValidationResult) -> Response:
+  """Converts a failed check's result into a JSON error response, whose
+  body is encoded once per error message"""
+
+  return Response(response=error_body(result.error),
+                  status=result.status_code,
+                  content_type="application/json")